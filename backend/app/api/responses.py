@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+from app.services.snapshots import dashboard_snapshots
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-encoded response for payloads built from trusted database rows.
+
+    Returning an instance directly from a route bypasses FastAPI's second
+    ``response_model`` validation pass; the declared model still drives the
+    OpenAPI schema. ``OPT_UTC_Z`` keeps datetimes identical to Pydantic's output.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def snapshot_response(endpoint: str, window: str) -> Optional[Response]:
+    """The pre-computed body for ``window``, with freshness headers, if one is current."""
+
+    snapshot = dashboard_snapshots.get(endpoint, window)
+    if snapshot is None:
+        return None
+    return Response(
+        snapshot.body,
+        media_type="application/json",
+        headers=dashboard_snapshots.headers(snapshot),
+    )
@@ -1,6 +1,18 @@
 from fastapi import APIRouter
 
-from app.api.routes import calls, classification, senders, sms, summary
+from app.api.routes import (
+    archive,
+    block_rules,
+    calls,
+    categories,
+    classification,
+    entities,
+    ingest,
+    profiles,
+    senders,
+    sms,
+    summary,
+)
 
 router = APIRouter()
 router.include_router(summary.router, prefix="/summary", tags=["summary"])
@@ -8,3 +20,9 @@ router.include_router(sms.router, prefix="/sms", tags=["sms"])
 router.include_router(calls.router, prefix="/calls", tags=["calls"])
 router.include_router(classification.router, prefix="/classification", tags=["classification"])
 router.include_router(senders.router)
+router.include_router(archive.router, prefix="/archive", tags=["archive"])
+router.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
+router.include_router(entities.router, prefix="/entities", tags=["entities"])
+router.include_router(categories.router, prefix="/categories", tags=["categories"])
+router.include_router(block_rules.router, prefix="/block-rules", tags=["block-rules"])
+router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.retention import iter_archive
+
+router = APIRouter()
+
+
+@router.get("/{kind}", response_class=StreamingResponse)
+async def export_archive(
+    kind: Literal["sms", "calls"],
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+) -> StreamingResponse:
+    """Stream archived events for the range as newline-delimited JSON."""
+
+    def lines() -> Iterator[bytes]:
+        for line in iter_archive(kind, start_date, end_date):
+            yield line + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
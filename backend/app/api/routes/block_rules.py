@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_read_session
+from app.models.block_rule import BlockRule
+from app.schemas.block_rule import BlockRuleCreate, BlockRuleRead
+from app.services.blocking import (
+    block_rules,
+    create_block_rule,
+    delete_block_rule,
+    normalise_prefix,
+    read_rule_set,
+    refresh_block_rules,
+)
+from app.services.write_queue import WriteQueueFullError, write_queue
+
+router = APIRouter()
+
+
+@router.get("", response_model=list[BlockRuleRead])
+async def list_block_rules(
+    session: AsyncSession = Depends(get_read_session),
+) -> list[BlockRule]:
+    return list(await session.scalars(select(BlockRule).order_by(BlockRule.prefix)))
+
+
+@router.post("", response_model=BlockRuleRead, status_code=status.HTTP_201_CREATED)
+async def add_block_rule(payload: BlockRuleCreate) -> BlockRuleRead:
+    try:
+        prefix = normalise_prefix(payload.prefix)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from exc
+
+    async def apply(session: AsyncSession) -> tuple[BlockRuleRead, tuple]:
+        rule = await create_block_rule(session, prefix, payload.note)
+        return BlockRuleRead.model_validate(rule), await read_rule_set(session)
+
+    try:
+        rule, _ = await _submit_rule_change(apply)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return rule
+
+
+@router.get("/match", response_model=BlockRuleRead)
+async def match_block_rule(
+    number: str = Query(..., min_length=1),
+    session: AsyncSession = Depends(get_read_session),
+) -> BlockRule:
+    await refresh_block_rules(session)
+    rule_id = block_rules.match(number)
+    rule = await session.get(BlockRule, rule_id) if rule_id is not None else None
+    if rule is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No block rule covers this number"
+        )
+    return rule
+
+
+@router.get("/{rule_id}", response_model=BlockRuleRead)
+async def get_block_rule(
+    rule_id: int,
+    session: AsyncSession = Depends(get_read_session),
+) -> BlockRule:
+    rule = await session.get(BlockRule, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Block rule not found")
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_block_rule(rule_id: int) -> Response:
+    async def apply(session: AsyncSession) -> tuple[None, tuple]:
+        await delete_block_rule(session, rule_id)
+        return None, await read_rule_set(session)
+
+    try:
+        await _submit_rule_change(apply)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _submit_rule_change(apply) -> tuple:
+    """Run a rule change on the write queue; the trie is reloaded once it commits.
+
+    ``apply`` returns its result and the rule set as it stands after the change.
+    """
+
+    try:
+        return await write_queue.submit(apply, publish=_publish_rule_set, wait=True)
+    except WriteQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+def _publish_rule_set(result: tuple) -> None:
+    _, rule_set = result
+    block_rules.load(*rule_set)
@@ -1,102 +1,166 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.db.session import get_session
+from app.api.responses import FastJSONResponse, snapshot_response
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.db.queries import call_rows_query
+from app.db.session import get_read_session, get_session
 from app.models.call import Call
-from app.models.sender import Sender
-from app.schemas.call import CallCategorySummary, CallListResponse, CallRead, CallStats
+from app.schemas.call import CallCategorySummary, CallerFanoutPage, CallListResponse, CallStats
+from app.services.aggregates import call_category_summaries, time_filters
+from app.services.fanout import caller_leaderboard, rebuild_fanout
+from app.services.live_events import live_calls
+from app.services.scatter import CALLS, event_totals
+from app.services.snapshots import Window, dashboard_snapshots, window_start
 
 router = APIRouter()
 
 
-@router.get("", response_model=CallListResponse)
+@router.get("", response_model=CallListResponse, response_class=FastJSONResponse)
 async def list_calls(
     start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
     end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
-    session: AsyncSession = Depends(get_session),
-) -> CallListResponse:
-    filters = _time_filters(Call.started_at, start_date, end_date)
+    window: Optional[Window] = Query(
+        None,
+        description="Standard window instead of start_date/end_date; paged, served pre-computed",
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Only the newest rows of the range in recent_calls"
+    ),
+    session: AsyncSession = Depends(get_read_session),
+) -> FastJSONResponse:
+    if window is not None:
+        if start_date or end_date:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="window cannot be combined with start_date or end_date",
+            )
+        # Windows are always paged; snapshots hold the default page.
+        limit = limit or get_settings().precompute_page_rows
+        if limit == get_settings().precompute_page_rows:
+            cached = snapshot_response("calls", window)
+            if cached is not None:
+                return cached
+        start_date = window_start(window)
+    if limit is not None:
+        return await _calls_page(session, start_date, end_date, limit)
+    return await _calls_listing(session, time_filters(Call.started_at, start_date, end_date))
+
+
+async def _calls_page(
+    session: AsyncSession,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: int,
+) -> FastJSONResponse:
+    """Like ``_calls_listing``, but the rows are only the newest ``limit``.
+
+    The rows come from the in-memory ring when it holds the whole page; the
+    categories are aggregated in SQL since the page no longer covers the range.
+    """
+
+    filters = time_filters(Call.started_at, start_date, end_date)
+    await live_calls.catch_up(session)
+    rows = live_calls.newest(start_date, end_date, limit)
+    if rows is None:
+        result = await session.execute(
+            call_rows_query()
+            .where(*filters)
+            .order_by(Call.started_at.desc(), Call.id.desc())
+            .limit(limit)
+        )
+        # Aware UTC like the ring's rows; SQLite hands back naive datetimes.
+        rows = [{**row._asdict(), "started_at": as_utc(row.started_at)} for row in result]
+
+    stats = await _call_stats(session, filters)
+    categories = await call_category_summaries(session, filters)
+    return FastJSONResponse(
+        {
+            "stats": stats.model_dump(),
+            "categories": [category.model_dump() for category in categories],
+            "recent_calls": rows,
+        }
+    )
+
 
+async def _calls_listing(session: AsyncSession, filters: tuple) -> FastJSONResponse:
     calls_result = await session.execute(
-        select(Call)
-        .options(selectinload(Call.caller))
-        .where(*filters)
-        .order_by(Call.started_at.desc())
+        call_rows_query().where(*filters).order_by(Call.started_at.desc())
     )
-    calls = list(calls_result.scalars())
+    calls = calls_result.all()
 
     stats = await _call_stats(session, filters)
     categories = _categorise_calls(calls)
 
-    recent_calls = [
-        CallRead(
-            id=call.id,
-            caller_id=call.caller_id,
-            caller_number=call.caller.phone_number if call.caller else None,
-            callee_number=call.callee_number,
-            started_at=call.started_at,
-            duration_seconds=call.duration_seconds,
-            category=call.category,
-            is_spam=call.is_spam,
-            confidence=call.confidence,
-            blocked=call.blocked,
-            caller_is_blocked=call.caller.is_blocked if call.caller else False,
-        )
-        for call in calls
-    ]
+    # Rows come straight from the database, so they are emitted as plain dicts
+    # in CallRead's field order rather than validated a second time.
+    recent_calls = [call._asdict() for call in calls]
 
-    return CallListResponse(
-        stats=stats,
-        categories=categories,
-        recent_calls=recent_calls,
+    return FastJSONResponse(
+        {
+            "stats": stats.model_dump(),
+            "categories": [category.model_dump() for category in categories],
+            "recent_calls": recent_calls,
+        }
     )
 
 
-async def _call_stats(session: AsyncSession, filters: tuple) -> CallStats:
-    total_calls = await session.scalar(
-        select(func.count(Call.id)).where(*filters)
-    ) or 0
-    blocked_calls = await session.scalar(
-        select(func.count()).where(Call.blocked.is_(True), *filters)
-    ) or 0
-    unique_callers = await session.scalar(
-        select(func.count(func.distinct(Call.caller_id))).where(
-            Call.caller_id.is_not(None), *filters
-        )
-    ) or 0
-
-    top_caller_number_result = await session.execute(
-        select(Sender.phone_number)
-        .join(Call, Sender.id == Call.caller_id)
-        .where(*filters)
-        .group_by(Sender.id)
-        .order_by(func.count(Call.id).desc())
-        .limit(1)
+async def _calls_snapshot(session: AsyncSession, window: str) -> bytes:
+    # Aggregates plus the newest page only: a full listing grows with the table.
+    page = await _calls_page(
+        session, window_start(window), None, get_settings().precompute_page_rows
     )
-    top_caller_number = top_caller_number_result.scalar_one_or_none()
+    return page.body
+
+
+dashboard_snapshots.register("calls", _calls_snapshot)
+
+
+@router.get("/callers", response_model=CallerFanoutPage)
+async def list_caller_fanout(
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> CallerFanoutPage:
+    """Callers ranked by distinct callees; long windows are HyperLogLog estimates."""
+
+    return await caller_leaderboard(session, start_date, end_date, limit, offset)
+
+
+@router.post("/callers/rebuild", status_code=status.HTTP_204_NO_CONTENT)
+async def rebuild_caller_fanout(session: AsyncSession = Depends(get_session)) -> Response:
+    await rebuild_fanout(session)
+    await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _call_stats(session: AsyncSession, filters: tuple) -> CallStats:
+    totals = await event_totals(session, CALLS, filters)
 
     spam_percentage = (
-        blocked_calls / total_calls if total_calls else 0.0
+        totals.blocked / totals.total if totals.total else 0.0
     )
 
     return CallStats(
-        total_calls=total_calls,
-        blocked_calls=blocked_calls,
-        unique_callers=unique_callers,
+        total_calls=totals.total,
+        blocked_calls=totals.blocked,
+        unique_callers=totals.unique_parties,
         spam_percentage=round(spam_percentage, 3),
-        top_caller_number=top_caller_number,
+        top_caller_number=totals.top_party_number,
     )
 
 
-def _categorise_calls(calls: list[Call]) -> list[CallCategorySummary]:
-    grouped: dict[str, list[Call]] = {}
+def _categorise_calls(calls: Sequence[Row]) -> list[CallCategorySummary]:
+    grouped: dict[str, list[Row]] = {}
     for call in calls:
         category = call.category or "uncategorised"
         grouped.setdefault(category, []).append(call)
@@ -112,7 +176,7 @@ def _categorise_calls(calls: list[Call]) -> list[CallCategorySummary]:
                 total_calls=len(entries),
                 unique_callers=len(unique_callers),
                 blocked=blocked,
-                sample_preview=f"Caller {sample.caller.phone_number if sample.caller else 'Unknown'}"
+                sample_preview=f"Caller {sample.caller_number or 'Unknown'}"
                 f" → {sample.callee_number}",
             )
         )
@@ -124,10 +188,3 @@ def _categorise_calls(calls: list[Call]) -> list[CallCategorySummary]:
     )
 
 
-def _time_filters(column, start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple:
-    conditions = []
-    if start_date:
-        conditions.append(column >= start_date)
-    if end_date:
-        conditions.append(column <= end_date)
-    return tuple(conditions)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_read_session, get_session
+from app.models.category import Category
+from app.schemas.category import CategoryAliasCreate, CategoryRead
+from app.services.categories import add_alias, load_categories
+
+router = APIRouter()
+
+
+@router.get("", response_model=list[CategoryRead])
+async def list_categories(session: AsyncSession = Depends(get_read_session)) -> list[CategoryRead]:
+    rows = await session.scalars(select(Category).order_by(Category.name))
+    return [_category_read(category) for category in rows]
+
+
+@router.post("/aliases", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
+async def create_alias(
+    payload: CategoryAliasCreate,
+    session: AsyncSession = Depends(get_session),
+) -> CategoryRead:
+    try:
+        category = await add_alias(session, payload.alias, payload.category)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    await session.commit()
+    await load_categories(session)
+    return _category_read(category)
+
+
+def _category_read(category: Category) -> CategoryRead:
+    return CategoryRead(
+        id=category.id,
+        name=category.name,
+        aliases=sorted(alias.alias for alias in category.aliases),
+    )
@@ -1,19 +1,104 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, status
+import hmac
+from typing import Optional
 
-from app.schemas.classification import ClassificationRequest, ClassificationResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import get_read_session
+from app.schemas.classification import (
+    AdmissionStats,
+    ClassificationRequest,
+    ClassificationResponse,
+    LocalModelInfo,
+)
+from app.services.admission import (
+    AdmissionRejected,
+    AdmissionTimeout,
+    classification_admission,
+)
 from app.services.classifier import classify_message
+from app.services.local_model import LocalSpamModel, get_local_model, train_from_messages
 
 router = APIRouter()
 
 
+def _require_screening_token(x_screening_token: Optional[str] = Header(None)) -> None:
+    token = get_settings().screening_token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Screening is disabled")
+    if x_screening_token is None or not hmac.compare_digest(
+        x_screening_token.encode(), token.encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid screening token")
+
+
 @router.post("", response_model=ClassificationResponse)
 async def classify_text(payload: ClassificationRequest) -> ClassificationResponse:
+    return await _classify("interactive", payload.text)
+
+
+@router.post(
+    "/screen",
+    response_model=ClassificationResponse,
+    dependencies=[Depends(_require_screening_token)],
+)
+async def screen_text(payload: ClassificationRequest) -> ClassificationResponse:
+    """Automated screening of live traffic, admitted ahead of the UI tester."""
+
+    return await _classify("realtime", payload.text)
+
+
+async def _classify(priority: str, text: str) -> ClassificationResponse:
+    # The admission class comes from the route, never from the client.
     try:
-        return await classify_message(payload.text)
+        return await classification_admission.run(
+            priority, lambda: classify_message(text)
+        )
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    except AdmissionTimeout as exc:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(exc)) from exc
     except RuntimeError as exc:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="LLM classification unavailable: ensure OpenAI credentials are valid.",
         ) from exc
+
+
+@router.get("/admission", response_model=AdmissionStats)
+async def get_admission_stats() -> AdmissionStats:
+    return AdmissionStats(**classification_admission.stats())
+
+
+@router.get("/model", response_model=LocalModelInfo)
+async def get_model_info() -> LocalModelInfo:
+    model = get_local_model()
+    if model is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No local model trained")
+    return _model_info(model)
+
+
+@router.post("/model/train", response_model=LocalModelInfo)
+async def train_model(session: AsyncSession = Depends(get_read_session)) -> LocalModelInfo:
+    # Only reads: the fit must not hold the single writer connection.
+    try:
+        model = await train_from_messages(session)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return _model_info(model)
+
+
+def _model_info(model: LocalSpamModel) -> LocalModelInfo:
+    return LocalModelInfo(
+        version=model.version,
+        trained_at=model.trained_at,
+        samples=model.samples,
+        categories=model.categories,
+    )
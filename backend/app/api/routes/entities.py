@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.queries import message_rows_query
+from app.db.session import get_read_session
+from app.models.entity import MessageEntity
+from app.models.message import Message
+from app.schemas.entity import EntityCount, EntityKind
+from app.schemas.message import MessageRead
+from app.services.aggregates import time_filters
+from app.services.bodies import catch_up_dictionaries
+
+router = APIRouter()
+
+
+@router.get("/top", response_model=list[EntityCount])
+async def list_top_entities(
+    kind: EntityKind = Query("domain", description="Entity type to rank"),
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[EntityCount]:
+    filters = [
+        MessageEntity.kind == kind,
+        *time_filters(MessageEntity.received_at, start_date, end_date),
+    ]
+
+    message_count = func.count(MessageEntity.message_id)
+    result = await session.execute(
+        select(
+            MessageEntity.value,
+            message_count.label("messages"),
+            func.count(func.distinct(Message.sender_id)).label("senders"),
+        )
+        .join(Message, Message.id == MessageEntity.message_id)
+        .where(*filters)
+        .group_by(MessageEntity.value)
+        .order_by(message_count.desc(), MessageEntity.value)
+        .limit(limit)
+    )
+    return [
+        EntityCount(kind=kind, value=row.value, messages=row.messages, senders=row.senders)
+        for row in result
+    ]
+
+
+@router.get("/domains/{domain}/messages", response_model=list[MessageRead])
+async def list_messages_for_domain(
+    domain: str,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[MessageRead]:
+    await catch_up_dictionaries(session)
+    result = await session.execute(
+        message_rows_query()
+        .join(MessageEntity, MessageEntity.message_id == Message.id)
+        .where(MessageEntity.kind == "domain", MessageEntity.value == domain.lower())
+        .order_by(Message.received_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [MessageRead(**row._asdict()) for row in result]
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.schemas.ingest import CallIngest, IngestResult, SmsIngest
+from app.services.ingest import (
+    DuplicateEventError,
+    ingest_call,
+    ingest_message,
+    publish_call,
+    publish_message,
+)
+from app.services.write_queue import WriteQueueFullError, write_queue
+
+router = APIRouter()
+
+
+@router.post("/sms", response_model=IngestResult, status_code=status.HTTP_201_CREATED)
+async def ingest_sms_event(payload: SmsIngest, response: Response) -> IngestResult:
+    try:
+        message = await write_queue.submit(
+            lambda session: ingest_message(session, payload), publish_message
+        )
+    except DuplicateEventError as exc:
+        return _duplicate(response, exc)
+    except WriteQueueFullError as exc:
+        raise _overloaded(exc) from exc
+    return _accepted(response, message)
+
+
+@router.post("/calls", response_model=IngestResult, status_code=status.HTTP_201_CREATED)
+async def ingest_call_event(payload: CallIngest, response: Response) -> IngestResult:
+    try:
+        call = await write_queue.submit(lambda session: ingest_call(session, payload), publish_call)
+    except DuplicateEventError as exc:
+        return _duplicate(response, exc)
+    except WriteQueueFullError as exc:
+        raise _overloaded(exc) from exc
+    return _accepted(response, call)
+
+
+def _accepted(response: Response, row) -> IngestResult:
+    if row is None:
+        # Queued but not yet committed (WRITE_QUEUE_DURABILITY=enqueue).
+        response.status_code = status.HTTP_202_ACCEPTED
+        return IngestResult(id=None, queued=True)
+    return IngestResult(id=row.id)
+
+
+def _duplicate(response: Response, exc: DuplicateEventError) -> IngestResult:
+    # A redelivery is acknowledged (200, not 201) with the stored row's id.
+    response.status_code = status.HTTP_200_OK
+    return IngestResult(id=exc.existing_id, duplicate=True)
+
+
+def _overloaded(exc: WriteQueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": "1"},
+    )
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_settings
+from app.schemas.profile import ProfileRead, ProfileSummary
+from app.services.profiler import Profile, profiles
+
+
+def _require_token(x_profile: Optional[str] = Header(None)) -> None:
+    token = get_settings().profiling_token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if x_profile is None or not hmac.compare_digest(x_profile.encode(), token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+router = APIRouter(dependencies=[Depends(_require_token)])
+
+
+@router.get("", response_model=list[ProfileSummary])
+async def list_profiles() -> list[ProfileSummary]:
+    """Stored profiles, newest first."""
+
+    return [ProfileSummary(**profile.summary()) for profile in profiles.recent()]
+
+
+@router.get("/{profile_id}", response_model=ProfileRead)
+async def get_profile(profile_id: str) -> ProfileRead:
+    return ProfileRead(**_profile(profile_id).details())
+
+
+@router.get("/{profile_id}/flamegraph", response_class=PlainTextResponse)
+async def download_flamegraph(profile_id: str) -> PlainTextResponse:
+    """Collapsed stacks, weighted in microseconds, for flamegraph.pl or speedscope."""
+
+    return PlainTextResponse(
+        _profile(profile_id).collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
+
+
+def _profile(profile_id: str) -> Profile:
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
@@ -1,40 +1,120 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.db.session import get_read_session, get_session
 from app.models.sender import Sender
-from app.schemas.sender import SenderRead
+from app.schemas.sender import SenderRead, TopSender, TopSendersResponse
+from app.services.leaderboard import (
+    catch_up_leaderboard,
+    leaderboard,
+    rebuild_sender_counts,
+    top_from_counters,
+)
+from app.services.live_events import live_calls, live_messages
+from app.services.snapshots import dashboard_snapshots
+from app.services.write_queue import WriteQueueFullError, write_queue
 
 router = APIRouter(prefix="/senders", tags=["senders"])
 
 
-@router.post("/{sender_id}/block", response_model=SenderRead)
-async def block_sender(
-    sender_id: int,
-    session: AsyncSession = Depends(get_session),
-) -> SenderRead:
-    sender = await session.get(Sender, sender_id)
-    if sender is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sender not found")
-
-    sender.is_blocked = True
+@router.get("/top", response_model=TopSendersResponse)
+async def top_senders(
+    channel: Literal["sms", "calls"] = Query("sms"),
+    n: int = Query(10, ge=1, le=100),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    session: AsyncSession = Depends(get_read_session),
+) -> TopSendersResponse:
+    board = leaderboard(channel)
+    if start_date is None and end_date is None:
+        await catch_up_leaderboard(session, channel)
+        start_date, end_date = board.window()
+        ranking = board.top(n)
+        source = "memory"
+    else:
+        end_date = end_date or board.window()[1]
+        start_date = start_date or end_date - timedelta(days=board.window_days - 1)
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="start_date must not be after end_date",
+            )
+        ranking = await top_from_counters(session, channel, start_date, end_date, n)
+        source = "daily_counters"
+
+    senders = await _senders_by_id(session, [sender_id for sender_id, _ in ranking])
+    return TopSendersResponse(
+        channel=channel,
+        start_date=start_date,
+        end_date=end_date,
+        source=source,
+        senders=[
+            TopSender(
+                sender_id=sender_id,
+                phone_number=senders[sender_id].phone_number,
+                spam_events=events,
+                is_blocked=senders[sender_id].is_blocked,
+            )
+            for sender_id, events in ranking
+            if sender_id in senders
+        ],
+    )
+
+
+@router.post("/top/rebuild", status_code=status.HTTP_204_NO_CONTENT)
+async def rebuild_top_senders(session: AsyncSession = Depends(get_session)) -> Response:
+    await rebuild_sender_counts(session)
     await session.commit()
-    await session.refresh(sender)
-    return sender
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/{sender_id}/block", response_model=SenderRead)
+async def block_sender(sender_id: int) -> SenderRead:
+    return await _set_blocked(sender_id, True)
 
 
 @router.post("/{sender_id}/unblock", response_model=SenderRead)
-async def unblock_sender(
-    sender_id: int,
-    session: AsyncSession = Depends(get_session),
-) -> SenderRead:
-    sender = await session.get(Sender, sender_id)
-    if sender is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sender not found")
-
-    sender.is_blocked = False
-    await session.commit()
-    await session.refresh(sender)
-    return sender
+async def unblock_sender(sender_id: int) -> SenderRead:
+    return await _set_blocked(sender_id, False)
+
+
+async def _set_blocked(sender_id: int, blocked: bool) -> SenderRead:
+    async def apply(session: AsyncSession) -> SenderRead:
+        sender = await session.get(Sender, sender_id)
+        if sender is None:
+            raise LookupError("Sender not found")
+        sender.is_blocked = blocked
+        sender.blocked_changed_at = datetime.now(timezone.utc)
+        # Read before the batch commits; the ORM row may be expired by then.
+        return SenderRead.model_validate(sender)
+
+    try:
+        # Group-committed with ingest, but always awaited: the caller gets the sender back.
+        return await write_queue.submit(apply, publish=_publish_blocked, wait=True)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except WriteQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+def _publish_blocked(sender: SenderRead) -> None:
+    live_messages.set_party_blocked(sender.id, sender.is_blocked)
+    live_calls.set_party_blocked(sender.id, sender.is_blocked)
+    dashboard_snapshots.invalidate()
+
+
+async def _senders_by_id(session: AsyncSession, sender_ids: list[int]) -> dict[int, Sender]:
+    if not sender_ids:
+        return {}
+    result = await session.scalars(select(Sender).where(Sender.id.in_(sender_ids)))
+    return {sender.id: sender for sender in result}
@@ -1,107 +1,289 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.db.session import get_session
+from app.api.responses import FastJSONResponse, snapshot_response
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.db.body_codec import active_dictionary
+from app.db.queries import message_rows_query
+from app.db.session import get_read_session
+from app.models.body import MessageBody
 from app.models.message import Message
-from app.models.sender import Sender
 from app.schemas.message import (
+    BodyDictionaryInfo,
+    BodyStorageStats,
     MessageCategorySummary,
+    MessagePage,
     MessageRead,
+    MessageTemplatePage,
     MessageStats,
+    SimilarMessage,
+    SimilarMessagesResponse,
     SmsListResponse,
 )
+from app.services.bodies import (
+    activate_dictionary,
+    catch_up_dictionaries,
+    storage_stats,
+    train_body_dictionary,
+)
+from app.services.aggregates import message_category_summaries, time_filters
+from app.services.drilldown import decode_cursor, template_messages, template_page
+from app.services.live_events import live_messages
+from app.services.similarity import message_index
+from app.services.scatter import MESSAGES, event_totals
+from app.services.snapshots import Window, dashboard_snapshots, window_start
+from app.services.write_queue import WriteQueueFullError, write_queue
 
 router = APIRouter()
 
 
-@router.get("", response_model=SmsListResponse)
+@router.get("", response_model=SmsListResponse, response_class=FastJSONResponse)
 async def list_sms(
     start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
     end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
-    session: AsyncSession = Depends(get_session),
-) -> SmsListResponse:
-    filters = _time_filters(Message.received_at, start_date, end_date)
+    window: Optional[Window] = Query(
+        None,
+        description="Standard window instead of start_date/end_date; paged, served pre-computed",
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Only the newest rows of the range in recent_messages"
+    ),
+    session: AsyncSession = Depends(get_read_session),
+) -> FastJSONResponse:
+    if window is not None:
+        if start_date or end_date:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="window cannot be combined with start_date or end_date",
+            )
+        # Windows are always paged; snapshots hold the default page.
+        limit = limit or get_settings().precompute_page_rows
+        if limit == get_settings().precompute_page_rows:
+            cached = snapshot_response("sms", window)
+            if cached is not None:
+                return cached
+        start_date = window_start(window)
+    if limit is not None:
+        return await _sms_page(session, start_date, end_date, limit)
+    return await _sms_listing(session, time_filters(Message.received_at, start_date, end_date))
+
+
+async def _sms_page(
+    session: AsyncSession,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: int,
+) -> FastJSONResponse:
+    """Like ``_sms_listing``, but the rows are only the newest ``limit``.
+
+    The rows come from the in-memory ring when it holds the whole page; the
+    categories are aggregated in SQL since the page no longer covers the range.
+    """
+
+    filters = time_filters(Message.received_at, start_date, end_date)
+    # Before the ring's catch-up, which decodes the new rows' bodies.
+    await catch_up_dictionaries(session)
+    await live_messages.catch_up(session)
+    rows = live_messages.newest(start_date, end_date, limit)
+    if rows is None:
+        result = await session.execute(
+            message_rows_query()
+            .where(*filters)
+            .order_by(Message.received_at.desc(), Message.id.desc())
+            .limit(limit)
+        )
+        # Aware UTC like the ring's rows; SQLite hands back naive datetimes.
+        rows = [{**row._asdict(), "received_at": as_utc(row.received_at)} for row in result]
 
+    stats = await _message_stats(session, filters)
+    categories = await message_category_summaries(session, filters)
+    return FastJSONResponse(
+        {
+            "stats": stats.model_dump(),
+            "categories": [category.model_dump() for category in categories],
+            "recent_messages": rows,
+        }
+    )
+
+
+async def _sms_listing(session: AsyncSession, filters: tuple) -> FastJSONResponse:
+    await catch_up_dictionaries(session)
     messages_result = await session.execute(
-        select(Message)
-        .options(selectinload(Message.sender))
-        .where(*filters)
-        .order_by(Message.received_at.desc())
+        message_rows_query().where(*filters).order_by(Message.received_at.desc())
     )
-    messages = list(messages_result.scalars())
+    messages = messages_result.all()
 
     stats = await _message_stats(session, filters)
     categories = _categorise_messages(messages)
 
-    recent_messages = [
-        MessageRead(
-            id=message.id,
-            sender_id=message.sender_id,
-            sender_number=message.sender.phone_number if message.sender else None,
-            receiver_number=message.receiver_number,
-            body=message.body,
-            category=message.category,
-            received_at=message.received_at,
-            is_spam=message.is_spam,
-            confidence=message.confidence,
-            blocked=message.blocked,
-            sender_is_blocked=message.sender.is_blocked if message.sender else False,
-        )
-        for message in messages
-    ]
+    # Rows come straight from the database, so they are emitted as plain dicts
+    # in MessageRead's field order rather than validated a second time.
+    recent_messages = [message._asdict() for message in messages]
 
-    return SmsListResponse(
-        stats=stats,
-        categories=categories,
-        recent_messages=recent_messages,
+    return FastJSONResponse(
+        {
+            "stats": stats.model_dump(),
+            "categories": [category.model_dump() for category in categories],
+            "recent_messages": recent_messages,
+        }
     )
 
 
-async def _message_stats(session: AsyncSession, filters: tuple) -> MessageStats:
-    total_messages = await session.scalar(
-        select(func.count(Message.id)).where(*filters)
-    ) or 0
-    blocked_messages = await session.scalar(
-        select(func.count()).where(Message.blocked.is_(True), *filters)
-    ) or 0
-    unique_senders = await session.scalar(
-        select(func.count(func.distinct(Message.sender_id))).where(
-            Message.sender_id.is_not(None), *filters
+async def _sms_snapshot(session: AsyncSession, window: str) -> bytes:
+    # Aggregates plus the newest page only: a full listing grows with the table.
+    page = await _sms_page(session, window_start(window), None, get_settings().precompute_page_rows)
+    return page.body
+
+
+dashboard_snapshots.register("sms", _sms_snapshot)
+
+
+@router.get("/categories", response_model=list[MessageCategorySummary])
+async def list_sms_categories(
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[MessageCategorySummary]:
+    """Drill-down level 1: category aggregates only."""
+
+    return await message_category_summaries(session, time_filters(Message.received_at, start_date, end_date))
+
+
+@router.get("/categories/{category}/templates", response_model=MessageTemplatePage)
+async def list_category_templates(
+    category: str,
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> MessageTemplatePage:
+    """Drill-down level 2: distinct bodies in a category, most frequent first."""
+
+    return await template_page(
+        session, category, time_filters(Message.received_at, start_date, end_date), limit, offset
+    )
+
+
+@router.get("/templates/{body_id}/messages", response_model=MessagePage)
+async def list_template_messages(
+    body_id: int,
+    category: Optional[str] = Query(None, description="Only messages filed under this category"),
+    start_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive lower bound"),
+    end_date: Optional[datetime] = Query(None, description="ISO timestamp inclusive upper bound"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    session: AsyncSession = Depends(get_read_session),
+) -> MessagePage:
+    """Drill-down level 3: messages carrying one body, newest first."""
+
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Malformed cursor"
+        ) from exc
+    return await template_messages(
+        session, body_id, category, time_filters(Message.received_at, start_date, end_date), limit, position
+    )
+
+
+@router.get("/bodies/stats", response_model=BodyStorageStats)
+async def body_storage_stats(session: AsyncSession = Depends(get_read_session)) -> BodyStorageStats:
+    return BodyStorageStats(
+        **await storage_stats(session),
+        compression_enabled=get_settings().body_compression,
+        active_dictionary_id=active_dictionary(),
+    )
+
+
+@router.post("/bodies/dictionary", response_model=BodyDictionaryInfo)
+async def train_dictionary(
+    session: AsyncSession = Depends(get_read_session),
+) -> BodyDictionaryInfo:
+    # Sample and build on a read connection; only the insert takes the writer.
+    try:
+        dictionary = await train_body_dictionary(session)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    content = dictionary.content
+
+    async def store(write_session: AsyncSession) -> BodyDictionaryInfo:
+        write_session.add(dictionary)
+        await write_session.flush()
+        return BodyDictionaryInfo(
+            id=dictionary.id,
+            created_at=dictionary.created_at,
+            sample_size=dictionary.sample_size,
+            size_bytes=len(content),
+        )
+
+    try:
+        return await write_queue.submit(
+            store, publish=lambda info: activate_dictionary(info.id, content), wait=True
         )
-    ) or 0
-
-    top_sender_number_result = await session.execute(
-        select(Sender.phone_number)
-        .join(Message, Sender.id == Message.sender_id)
-        .where(*filters)
-        .group_by(Sender.id)
-        .order_by(func.count(Message.id).desc())
-        .limit(1)
+    except WriteQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+@router.get("/{message_id}/similar", response_model=SimilarMessagesResponse)
+async def list_similar_messages(
+    message_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of neighbours to return"),
+    session: AsyncSession = Depends(get_read_session),
+) -> SimilarMessagesResponse:
+    await catch_up_dictionaries(session)
+    body = await session.scalar(
+        select(MessageBody.content).join_from(Message, MessageBody).where(Message.id == message_id)
+    )
+    if body is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+
+    neighbours = message_index.query(body, k, exclude_id=message_id)
+    rows_result = await session.execute(
+        message_rows_query().where(Message.id.in_([neighbour_id for neighbour_id, _ in neighbours]))
+    )
+    rows = {row.id: row for row in rows_result}
+
+    return SimilarMessagesResponse(
+        message_id=message_id,
+        matches=[
+            SimilarMessage(score=score, message=MessageRead(**rows[neighbour_id]._asdict()))
+            for neighbour_id, score in neighbours
+            if neighbour_id in rows
+        ],
     )
-    top_sender_number = top_sender_number_result.scalar_one_or_none()
+
+
+async def _message_stats(session: AsyncSession, filters: tuple) -> MessageStats:
+    totals = await event_totals(session, MESSAGES, filters)
 
     spam_percentage = (
-        blocked_messages / total_messages if total_messages else 0.0
+        totals.blocked / totals.total if totals.total else 0.0
     )
 
     return MessageStats(
-        total_messages=total_messages,
-        blocked_messages=blocked_messages,
-        unique_senders=unique_senders,
+        total_messages=totals.total,
+        blocked_messages=totals.blocked,
+        unique_senders=totals.unique_parties,
         spam_percentage=round(spam_percentage, 3),
-        top_sender_number=top_sender_number,
+        top_sender_number=totals.top_party_number,
     )
 
 
-def _categorise_messages(messages: list[Message]) -> list[MessageCategorySummary]:
-    grouped: dict[str, list[Message]] = {}
+def _categorise_messages(messages: Sequence[Row]) -> list[MessageCategorySummary]:
+    grouped: dict[str, list[Row]] = {}
     for message in messages:
         category = message.category or "uncategorised"
         grouped.setdefault(category, []).append(message)
@@ -129,10 +311,3 @@ def _categorise_messages(messages: list[Message]) -> list[MessageCategorySummary
     )
 
 
-def _time_filters(column, start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple:
-    conditions = []
-    if start_date:
-        conditions.append(column >= start_date)
-    if end_date:
-        conditions.append(column <= end_date)
-    return tuple(conditions)
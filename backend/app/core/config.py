@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -11,11 +11,103 @@ class Settings(BaseSettings):
     app_name: str = "AntiSpam Admin API"
     debug: bool = True
     database_url: str = "sqlite+aiosqlite:///./antispm.db"
+    database_replica_url: Optional[str] = None
+    seed_demo_data: bool = True
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
+    db_statement_cache_size: int = 500
+    # Only used when DATABASE_URL is a SQLite file.
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65_536
+    sqlite_mmap_size_bytes: int = 268_435_456
+    sqlite_reader_pool_size: int = 4
+    # Split the summary/SMS/call aggregates into this many id-range partitions
+    # queried concurrently (see app.services.scatter); 1 runs each as one query.
+    query_fanout_partitions: int = 1
+
+    retention_days: Optional[int] = None
+    retention_interval_seconds: int = 3600
+    archive_dir: Path = Path("./archive")
+    fanout_exact_days: int = 7
+    leaderboard_window_days: int = 30
+    # Counter changes stamped up to this long before a window's last catch-up are read again.
+    leaderboard_resync_seconds: float = 30.0
+    # How stale a worker's block-rule trie may get before ingest re-checks the rule-set version.
+    block_rules_refresh_seconds: float = 1.0
+    ingest_dedupe_cache_size: int = 100_000
+    body_cache_size: int = 50_000
+    # How often ingest checks whether retention deleted bodies its cache may still name.
+    body_cache_refresh_seconds: float = 1.0
+    body_compression: bool = False
+    # How often reads look for preset dictionaries trained by other workers.
+    body_dictionary_refresh_seconds: float = 1.0
+    series_max_buckets: int = 2000
+    # Newest events per channel held in memory for the live tables (~45 bytes each).
+    live_events_capacity: int = 500_000
+    # Block/unblock and reclassification changes stamped up to this long before a
+    # ring's last sync are read again, covering commit delay and clock skew.
+    live_events_resync_seconds: float = 30.0
+
+    write_queue_enabled: bool = True
+    write_queue_batch_rows: int = 5000
+    write_queue_max_delay_ms: float = 5.0
+    write_queue_capacity: int = 20_000
+    # "commit": acknowledge writes once committed; "enqueue": once queued.
+    write_queue_durability: Literal["commit", "enqueue"] = "commit"
+    write_queue_enqueue_timeout_seconds: float = 5.0
+
+    # Pre-computed ?window= payloads for the dashboard; see app.services.snapshots.
+    precompute_enabled: bool = True
+    precompute_interval_seconds: float = 60.0
+    precompute_min_interval_seconds: float = 15.0
+    precompute_max_age_seconds: float = 300.0
+    # Rows of the newest page kept in the /api/sms and /api/calls snapshots.
+    precompute_page_rows: int = 100
 
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-4o-mini"
     openai_temperature: float = 0.0
     openai_max_output_tokens: int = 256
+    # Point at a compatible server, e.g. app.fakes.openai_server for offline load tests.
+    openai_base_url: Optional[str] = None
+    openai_timeout_seconds: float = 30.0
+    openai_max_retries: int = 2
+
+    # Admission control in front of classify_message; see app.services.admission.
+    classify_max_concurrency: int = 16
+    classify_realtime_concurrency: int = 12
+    classify_realtime_max_queue: int = 200
+    classify_realtime_deadline_seconds: float = 5.0
+    classify_interactive_concurrency: int = 4
+    classify_interactive_max_queue: int = 20
+    classify_interactive_deadline_seconds: float = 15.0
+    classify_batch_concurrency: int = 4
+    classify_batch_max_queue: int = 200
+    classify_batch_deadline_seconds: float = 120.0
+    # Required in X-Screening-Token by the realtime class's route; unset disables it.
+    screening_token: Optional[str] = None
+
+    local_model_dir: Path = Path("./models")
+    local_model_decisive_margin: float = 0.4
+
+    reclassify_enabled: bool = False
+    reclassify_requests_per_minute: int = 60
+    reclassify_concurrency: int = 4
+    reclassify_batch_size: int = 50
+    reclassify_poll_seconds: float = 30.0
+    reclassify_uncertainty_band: float = 0.2
+    reclassify_breaker_threshold: int = 5
+    reclassify_breaker_cooldown_seconds: float = 60.0
+
+    # On-demand request profiles; see app.services.profiler. Unset disables profiling.
+    profiling_token: Optional[str] = None
+    profile_sample_interval_ms: float = 1.0
+    profile_store_size: int = 50
+
     cors_allow_origins: List[str] = ["http://localhost:5173"]
 
     class Config:
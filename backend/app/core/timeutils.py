@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Treat naive datetimes as UTC (SQLite drops the offset) and normalise aware ones."""
+
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
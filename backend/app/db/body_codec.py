@@ -0,0 +1,123 @@
+"""Storage encoding for deduplicated message bodies.
+
+``PackedText`` is a binary column that reads and writes ``str``. Each stored
+value starts with a one-byte tag:
+
+* ``0``: UTF-8 text, stored as is;
+* ``1``: zlib-compressed UTF-8;
+* ``2``: zlib-compressed with a preset dictionary, followed by the 4-byte
+  big-endian ``body_dictionaries.id`` that was used.
+
+Compression is applied on write when ``BODY_COMPRESSION`` is enabled and it
+actually saves space. Reads decode any tag, so values written under earlier
+settings or dictionaries stay readable. The app registers every dictionary at
+startup and, before reading bodies, asynchronously registers those trained
+since (by another worker) with ids above ``newest_dictionary``. Decoding runs
+where nothing can be awaited, so a value that still names an unknown
+dictionary falls back to the blocking loader set with ``set_dictionary_loader``.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from typing import Callable, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import get_settings
+
+_PLAIN = 0
+_ZLIB = 1
+_ZLIB_DICTIONARY = 2
+
+_dictionaries: dict[int, bytes] = {}
+_active_dictionary: Optional[int] = None
+_dictionary_loader: Optional[Callable[[int], Optional[bytes]]] = None
+_loader_lock = threading.Lock()
+
+
+def register_dictionary(dictionary_id: int, content: bytes, activate: bool = True) -> None:
+    global _active_dictionary
+    _dictionaries[dictionary_id] = content
+    if activate and (_active_dictionary is None or dictionary_id >= _active_dictionary):
+        _active_dictionary = dictionary_id
+
+
+def set_dictionary_loader(loader: Callable[[int], Optional[bytes]]) -> None:
+    """Fetch dictionaries missing from this process; ``loader`` must not await."""
+
+    global _dictionary_loader
+    _dictionary_loader = loader
+
+
+def active_dictionary() -> Optional[int]:
+    return _active_dictionary
+
+
+def newest_dictionary() -> int:
+    """Highest dictionary id this process has registered, or 0."""
+
+    return max(_dictionaries, default=0)
+
+
+def pack(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    packed = bytes([_PLAIN]) + raw
+    if not get_settings().body_compression:
+        return packed
+
+    if _active_dictionary is not None:
+        compressor = zlib.compressobj(9, zdict=_dictionaries[_active_dictionary])
+        candidate = (
+            bytes([_ZLIB_DICTIONARY])
+            + _active_dictionary.to_bytes(4, "big")
+            + compressor.compress(raw)
+            + compressor.flush()
+        )
+    else:
+        candidate = bytes([_ZLIB]) + zlib.compress(raw, 9)
+    return candidate if len(candidate) < len(packed) else packed
+
+
+def unpack(value: bytes) -> str:
+    tag = value[0]
+    if tag == _PLAIN:
+        return value[1:].decode("utf-8")
+    if tag == _ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    if tag == _ZLIB_DICTIONARY:
+        dictionary = _dictionary(int.from_bytes(value[1:5], "big"))
+        decompressor = zlib.decompressobj(zdict=dictionary)
+        return (decompressor.decompress(value[5:]) + decompressor.flush()).decode("utf-8")
+    raise ValueError(f"Unknown body encoding tag {tag}")
+
+
+class PackedText(TypeDecorator):
+    """Text stored as tagged, optionally compressed bytes."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        return None if value is None else pack(value)
+
+    def process_result_value(self, value: Optional[bytes], dialect) -> Optional[str]:
+        return None if value is None else unpack(bytes(value))
+
+
+def _dictionary(dictionary_id: int) -> bytes:
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is not None:
+        return dictionary
+    with _loader_lock:
+        if dictionary_id not in _dictionaries and _dictionary_loader is not None:
+            content = _dictionary_loader(dictionary_id)
+            if content is not None:
+                # Readable from now on, but new writes keep the active dictionary.
+                register_dictionary(dictionary_id, content, activate=False)
+    try:
+        return _dictionaries[dictionary_id]
+    except KeyError:
+        raise LookupError(f"Body dictionary {dictionary_id} does not exist") from None
@@ -9,15 +9,29 @@ from app.db.session import SessionLocal, engine
 from app.models.call import Call
 from app.models.message import Message
 from app.models.sender import Sender
+from app.services.bodies import new_body
+from app.services.categories import categories, ensure_taxonomy, load_categories
+from app.services.entities import build_entities
+from app.services.fanout import rebuild_fanout
+from app.services.leaderboard import rebuild_sender_counts
+from app.services.timeseries import rebuild_rollups
 
 
-async def init_db() -> None:
-    """Create tables and seed a richer demo dataset."""
+async def init_db(seed: bool = True) -> None:
+    """Create missing tables; with ``seed``, reset them to a richer demo dataset."""
 
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+        if seed:
+            await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
+    async with SessionLocal() as session:
+        await ensure_taxonomy(session)
+        await session.commit()
+        await load_categories(session)
+    if not seed:
+        return
+
     async with SessionLocal() as session:
         senders = _seed_senders()
         session.add_all(senders)
@@ -27,6 +41,12 @@ async def init_db() -> None:
         calls = _seed_calls(senders)
 
         session.add_all(messages + calls)
+        await session.flush()
+
+        session.add_all(entity for message in messages for entity in build_entities(message))
+        await rebuild_fanout(session)
+        await rebuild_sender_counts(session)
+        await rebuild_rollups(session)
         await session.commit()
 
 
@@ -188,12 +208,13 @@ def _seed_messages(senders: Sequence[Sender]) -> list[Message]:
         },
     ]
 
+    bodies = {text: new_body(text) for text in {spec["body"] for spec in specs}}
     return [
         Message(
             sender=spec["sender"],
             receiver_number=spec["receiver"],
-            body=spec["body"],
-            category=spec["category"],
+            body_record=bodies[spec["body"]],
+            category_id=categories.category_id(spec["category"]),
             received_at=now - spec["delta"],
             is_spam=spec["spam"],
             confidence=spec["confidence"],
@@ -314,7 +335,7 @@ def _seed_calls(senders: Sequence[Sender]) -> list[Call]:
             callee_number=spec["callee"],
             started_at=now - spec["delta"],
             duration_seconds=spec["duration"],
-            category=spec["category"],
+            category_id=categories.category_id(spec["category"]),
             is_spam=spec["spam"],
             confidence=spec["confidence"],
             blocked=spec["blocked"],
@@ -0,0 +1,51 @@
+"""Column-projected read queries shared by the API routes and background jobs."""
+
+from __future__ import annotations
+
+from sqlalchemy import Select, false, func, select
+
+from app.models.body import MessageBody
+from app.models.call import Call
+from app.models.category import Category
+from app.models.message import Message
+from app.models.sender import Sender
+
+
+def message_rows_query() -> Select:
+    """Single JOINed select of exactly the MessageRead columns, in field order."""
+
+    return select(
+        Message.id,
+        Message.sender_id,
+        Sender.phone_number.label("sender_number"),
+        Message.receiver_number,
+        MessageBody.content.label("body"),
+        Category.name.label("category"),
+        Message.received_at,
+        Message.is_spam,
+        Message.confidence,
+        Message.blocked,
+        func.coalesce(Sender.is_blocked, false()).label("sender_is_blocked"),
+    ).join(MessageBody, MessageBody.id == Message.body_id).outerjoin(
+        Sender, Sender.id == Message.sender_id
+    ).outerjoin(Category, Category.id == Message.category_id)
+
+
+def call_rows_query() -> Select:
+    """Single JOINed select of exactly the CallRead columns, in field order."""
+
+    return select(
+        Call.id,
+        Call.caller_id,
+        Sender.phone_number.label("caller_number"),
+        Call.callee_number,
+        Call.started_at,
+        Call.duration_seconds,
+        Category.name.label("category"),
+        Call.is_spam,
+        Call.confidence,
+        Call.blocked,
+        func.coalesce(Sender.is_blocked, false()).label("caller_is_blocked"),
+    ).outerjoin(Sender, Sender.id == Call.caller_id).outerjoin(
+        Category, Category.id == Call.category_id
+    )
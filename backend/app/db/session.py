@@ -1,12 +1,179 @@
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+
+
+def normalise_database_url(url: str) -> str:
+    """Map plain Postgres URLs (as issued by Render/Heroku) onto the asyncpg driver."""
+
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        url = "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+def sync_database_url(url: str) -> str:
+    """The same database through a blocking driver, for code that cannot await."""
+
+    parsed = make_url(normalise_database_url(url))
+    backend = parsed.get_backend_name()
+    driver = {"sqlite": "pysqlite", "postgresql": "psycopg"}.get(backend)
+    return parsed.set(drivername=f"{backend}+{driver}" if driver else backend).render_as_string(
+        hide_password=False
+    )
+
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(settings: Settings, read_only: bool) -> list[str]:
+    """Pragmas applied to every new SQLite connection.
+
+    ``journal_mode`` is persistent, so the writer sets it; in WAL mode readers see
+    the last committed snapshot and never wait for the writer, nor it for them.
+    ``synchronous=NORMAL`` only fsyncs the WAL at checkpoints, which is durable
+    against application crashes and loses at most the latest commits on power loss.
+    """
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        # Negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size = -{settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size_bytes}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        pragmas += [
+            f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+            f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        ]
+    return pragmas
+
+
+def _engine_options(
+    url: str,
+    settings: Settings,
+    read_only: bool = False,
+    pool_size: Optional[int] = None,
+) -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": settings.debug}
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        if is_sqlite_file(url):
+            # SQLite allows one writer at a time, so writes queue for one connection
+            # here instead of on the file lock; reads get a pool of their own.
+            # (aiosqlite would otherwise open a new connection per checkout.)
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=pool_size or (settings.sqlite_reader_pool_size if read_only else 1),
+                max_overflow=0,
+                pool_timeout=settings.db_pool_timeout_seconds,
+            )
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_pre_ping=True,
+    )
+    if backend == "postgresql":
+        # asyncpg keeps its own per-connection statement cache; SQLAlchemy adds a
+        # prepared-statement cache on top so repeated dashboard queries skip PREPARE.
+        options["connect_args"] = {
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        }
+    return options
+
+
+def _create_engine(
+    url: str,
+    settings: Settings,
+    read_only: bool = False,
+    pool_size: Optional[int] = None,
+) -> AsyncEngine:
+    url = normalise_database_url(url)
+    created = create_async_engine(url, **_engine_options(url, settings, read_only, pool_size))
+    if make_url(url).get_backend_name() == "sqlite":
+        _emit_sqlite_begin(created)
+    if is_sqlite_file(url):
+        pragmas = sqlite_pragmas(settings, read_only)
+
+        @event.listens_for(created.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, _connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return created
+
+
+def _emit_sqlite_begin(created: AsyncEngine) -> None:
+    # The sqlite3 driver only opens a transaction before DML and never before
+    # SAVEPOINT, so releasing the outermost savepoint commits on its own and
+    # the write queue's per-write savepoints each became a commit. SQLAlchemy's
+    # documented workaround: turn the driver's handling off and emit BEGIN.
+
+    @event.listens_for(created.sync_engine, "connect")
+    def _disable_driver_begin(dbapi_connection, _connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(created.sync_engine, "begin")
+    def _begin(connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+
+def _create_read_engine(settings: Settings, primary: AsyncEngine) -> AsyncEngine:
+    # Read-only dashboard traffic goes to the replica when one is configured. A
+    # SQLite file gets a pool of query-only connections next to the writer;
+    # anything else shares the primary.
+    if settings.database_replica_url:
+        return _create_engine(settings.database_replica_url, settings)
+    if is_sqlite_file(normalise_database_url(settings.database_url)):
+        return _create_engine(settings.database_url, settings, read_only=True)
+    return primary
+
+
+def _create_fanout_engine(settings: Settings, read: AsyncEngine) -> AsyncEngine:
+    # Partial aggregates (app.services.scatter) get SQLite connections of their
+    # own, so a request holding a read connection never waits for its partitions
+    # behind other requests doing the same.
+    url = settings.database_replica_url or settings.database_url
+    if settings.query_fanout_partitions > 1 and is_sqlite_file(normalise_database_url(url)):
+        return _create_engine(
+            url, settings, read_only=True, pool_size=settings.query_fanout_partitions
+        )
+    return read
+
 
 _settings = get_settings()
-engine: AsyncEngine = create_async_engine(_settings.database_url, echo=_settings.debug)
+engine: AsyncEngine = _create_engine(_settings.database_url, _settings)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+read_engine: AsyncEngine = _create_read_engine(_settings, engine)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+fanout_engine: AsyncEngine = _create_fanout_engine(_settings, read_engine)
+FanoutSessionLocal = async_sessionmaker(fanout_engine, expire_on_commit=False, class_=AsyncSession)
+
 
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_session() -> AsyncSession:
+    async with ReadSessionLocal() as session:
+        yield session
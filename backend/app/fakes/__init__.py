@@ -0,0 +1 @@
+"""In-process stand-ins for external services, for offline load tests and benchmarks."""
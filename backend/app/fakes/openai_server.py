@@ -0,0 +1,224 @@
+"""Fake OpenAI chat-completions server for offline classifier load testing.
+
+Run it next to the API and point the classifier at it::
+
+    python -m app.fakes.openai_server --port 8100 --latency lognormal \\
+        --latency-ms 400 --latency-sigma 0.6 --error-rate 0.01 --rate-limit-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+``POST /v1/chat/completions`` answers in the OpenAI response shape with a JSON
+verdict derived only from the message text (keyword rules plus a hash-based
+confidence), so the same text always gets the same verdict. Latency, injected
+``500``/``429`` responses and an optional requests-per-second cap are
+randomised from ``--seed`` to reproduce production tail behaviour.
+``GET /stats`` reports what was served.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_PROMPT_PREFIX = "Classify the following message:\n"
+
+# Ordered: the first category with the most keyword hits wins.
+SPAM_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "lottery": ("won", "winner", "prize", "lottery", "cruise", "jackpot"),
+    "phishing": ("verify", "click", "link", "password", "gift card", "suspended", "claim"),
+    "financial": ("bank", "loan", "refinance", "credit", "payout", "funds"),
+    "promotional": ("promo", "offer", "discount", "limited time", "upgrade", "deal"),
+    "logistics": ("package", "delivery", "customs", "parcel", "shipment"),
+    "services": ("warranty", "insurance", "call us back"),
+}
+HAM_CATEGORY = "personal"
+
+
+@dataclass(frozen=True)
+class FakeOpenAIConfig:
+    latency: str = "lognormal"  # fixed | uniform | lognormal
+    latency_ms: float = 300.0  # fixed value, uniform upper bound or lognormal median
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    requests_per_second: Optional[float] = None
+    retry_after_seconds: float = 1.0
+    seed: int = 0
+
+
+def verdict(text: str) -> dict:
+    """Deterministic classification of ``text`` in the shape the classifier expects."""
+
+    lowered = text.lower()
+    hits = {
+        category: sum(keyword in lowered for keyword in keywords)
+        for category, keywords in SPAM_KEYWORDS.items()
+    }
+    category, score = max(hits.items(), key=lambda item: item[1])
+    jitter = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:2], "big") / 65535
+    if score == 0:
+        return {
+            "is_spam": False,
+            "confidence": round(0.05 + 0.15 * jitter, 3),
+            "category": HAM_CATEGORY,
+            "rationale": "No spam indicators found.",
+        }
+    return {
+        "is_spam": True,
+        "confidence": round(min(0.55 + 0.12 * score + 0.05 * jitter, 0.99), 3),
+        "category": category,
+        "rationale": f"Matched {score} {category} indicator(s).",
+    }
+
+
+def create_fake_openai_app(config: Optional[FakeOpenAIConfig] = None) -> FastAPI:
+    config = config or FakeOpenAIConfig()
+    rng = random.Random(config.seed)
+    stats: Counter = Counter()
+    window = {"second": 0, "count": 0}
+
+    app = FastAPI(title="Fake OpenAI", docs_url=None, redoc_url=None)
+    app.state.config = config
+    app.state.stats = stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> JSONResponse:
+        payload = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(_latency_seconds(config, rng))
+
+        if config.requests_per_second is not None:
+            second = int(time.monotonic())
+            if window["second"] != second:
+                window.update(second=second, count=0)
+            window["count"] += 1
+            if window["count"] > config.requests_per_second:
+                return _rate_limited(config, stats)
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            return _rate_limited(config, stats)
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected failure", "type": "server_error"}},
+            )
+
+        text = _message_text(payload.get("messages") or [])
+        stats["completions"] += 1
+        content = json.dumps(verdict(text))
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-fake-{stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(text.split()),
+                    "completion_tokens": len(content.split()),
+                    "total_tokens": len(text.split()) + len(content.split()),
+                },
+            }
+        )
+
+    @app.get("/stats")
+    async def served() -> dict[str, int]:
+        return dict(stats)
+
+    return app
+
+
+def _latency_seconds(config: FakeOpenAIConfig, rng: random.Random) -> float:
+    if config.latency == "fixed":
+        millis = config.latency_ms
+    elif config.latency == "uniform":
+        millis = rng.uniform(0.0, config.latency_ms)
+    elif config.latency == "lognormal":
+        # median = exp(mu), so mu = ln(latency_ms); sigma widens the tail.
+        millis = config.latency_ms * rng.lognormvariate(0.0, config.latency_sigma)
+    else:
+        raise ValueError(f"Unknown latency distribution {config.latency!r}")
+    return millis / 1000
+
+
+def _rate_limited(config: FakeOpenAIConfig, stats: Counter) -> JSONResponse:
+    stats["rate_limited"] += 1
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after": f"{config.retry_after_seconds:g}"},
+        content={
+            "error": {
+                "message": "Rate limit reached (fake)",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }
+        },
+    )
+
+
+def _message_text(messages: list[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = str(message.get("content") or "")
+            return content.split(_PROMPT_PREFIX, 1)[-1]
+    return ""
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--requests-per-second", type=float, default=None)
+    parser.add_argument("--retry-after-seconds", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_arguments(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_second=args.requests_per_second,
+        retry_after_seconds=args.retry_after_seconds,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_fake_openai_app(config_from_arguments(args)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
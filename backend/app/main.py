@@ -1,35 +1,96 @@
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import router as api_router
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
 from app.db.init_db import init_db
+from app.db.session import SessionLocal
+from app.services.blocking import load_block_rules
+from app.services.bodies import load_body_dictionaries
+from app.services.leaderboard import load_leaderboards
+from app.services.live_events import live_calls, live_messages
+from app.services.local_model import load_latest_model
+from app.services.profiler import ProfilingMiddleware, install_sql_hooks, profiles
+from app.services.reclassifier import ReclassificationWorker
+from app.services.retention import run_retention_loop
+from app.services.similarity import message_index
+from app.services.snapshots import dashboard_snapshots
+from app.services.write_queue import write_queue
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
-    await init_db()
+async def lifespan(app: FastAPI):
+    settings: Settings = app.state.settings
+    await init_db(seed=settings.seed_demo_data)
+    load_latest_model()
+    async with SessionLocal() as session:
+        await load_body_dictionaries(session)
+        await message_index.rebuild(session)
+        await load_leaderboards(session)
+        await load_block_rules(session)
+        await live_messages.load(session)
+        await live_calls.load(session)
+
+    if settings.write_queue_enabled:
+        write_queue.start()
+
+    background_tasks: list[asyncio.Task] = []
+    if settings.retention_days:
+        background_tasks.append(
+            asyncio.create_task(
+                run_retention_loop(settings.retention_days, settings.retention_interval_seconds)
+            )
+        )
+    if settings.reclassify_enabled and settings.openai_api_key:
+        background_tasks.append(asyncio.create_task(ReclassificationWorker(settings).run()))
+    if settings.precompute_enabled:
+        background_tasks.append(asyncio.create_task(dashboard_snapshots.run()))
+
     yield
 
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await write_queue.drain()
+    dashboard_snapshots.clear()
 
-settings = get_settings()
 
-app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_allow_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.include_router(api_router)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the ASGI app; no database or model work happens until the lifespan starts."""
+
+    settings = settings or get_settings()
+    app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan)
+    app.state.settings = settings
+    if settings.profiling_token:
+        install_sql_hooks()
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=settings.profiling_token,
+            store=profiles,
+            interval=settings.profile_sample_interval_ms / 1000,
+        )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(api_router)
+    app.add_api_route("/health", health_check, methods=["GET"], tags=["health"])
+    return app
 
 
-@app.get("/health", tags=["health"])
 async def health_check() -> dict[str, str]:
     """Basic health check endpoint."""
     return {"status": "ok"}
+
+
+app = create_app()
@@ -1,5 +1,28 @@
+from app.models.block_rule import BlockRule, BlockRuleSet
+from app.models.body import BodyDictionary, BodyGeneration, MessageBody
 from app.models.call import Call
+from app.models.category import Category, CategoryAlias
+from app.models.entity import MessageEntity
+from app.models.fanout import CallerFanoutDay, CallerFanoutMonth
 from app.models.message import Message
+from app.models.rollup import EventRollupHour
 from app.models.sender import Sender
+from app.models.sender_count import SenderDailyCount
 
-__all__ = ["Call", "Message", "Sender"]
+__all__ = [
+    "BlockRule",
+    "BlockRuleSet",
+    "BodyDictionary",
+    "BodyGeneration",
+    "Call",
+    "CallerFanoutDay",
+    "CallerFanoutMonth",
+    "Category",
+    "CategoryAlias",
+    "EventRollupHour",
+    "Message",
+    "MessageBody",
+    "MessageEntity",
+    "Sender",
+    "SenderDailyCount",
+]
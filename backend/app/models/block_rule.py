@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class BlockRule(Base):
+    """Blocks every number starting with ``prefix``; counters track what it caught."""
+
+    __tablename__ = "block_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    prefix: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
+    note: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    senders_caught: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    events_caught: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_matched_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class BlockRuleSet(Base):
+    """A single row whose ``version`` every rule change bumps, so workers see stale tries."""
+
+    __tablename__ = "block_rule_set"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.db.body_codec import PackedText
+
+
+class MessageBody(Base):
+    """One row per distinct message text, keyed by the sha256 of its UTF-8 bytes."""
+
+    __tablename__ = "message_bodies"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    length: Mapped[int] = mapped_column(Integer, nullable=False)
+    content: Mapped[str] = mapped_column(PackedText, nullable=False)
+
+
+class BodyDictionary(Base):
+    """A zlib preset dictionary trained on sampled bodies; the newest one is used for writes."""
+
+    __tablename__ = "body_dictionaries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    sample_size: Mapped[int] = mapped_column(Integer)
+    content: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class BodyGeneration(Base):
+    """A single row bumped whenever bodies are deleted, so workers drop cached body ids."""
+
+    __tablename__ = "body_generation"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    generation: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
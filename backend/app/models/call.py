@@ -7,6 +7,7 @@ from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.models.category import CategoryId
 
 
 class Call(Base):
@@ -15,11 +16,15 @@ class Call(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     caller_id: Mapped[Optional[int]] = mapped_column(ForeignKey("senders.id"), nullable=True)
     callee_number: Mapped[str] = mapped_column(String(32))
-    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
     duration_seconds: Mapped[int] = mapped_column(Integer, default=0)
-    category: Mapped[Optional[str]] = mapped_column(String(64))
+    category_id: Mapped[Optional[int]] = mapped_column(
+        CategoryId, ForeignKey("categories.id"), nullable=True, index=True
+    )
     is_spam: Mapped[bool] = mapped_column(Boolean, default=False)
     confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     blocked: Mapped[bool] = mapped_column(Boolean, default=False)
+    # sha256 idempotency key of the delivered event; NULL for rows loaded without one.
+    event_key: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
 
     caller: Mapped[Optional["Sender"]] = relationship("Sender", back_populates="calls")
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Integer, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+
+# SQLite only auto-assigns ids for INTEGER primary keys.
+CategoryId = SmallInteger().with_variant(Integer(), "sqlite")
+
+
+class Category(Base):
+    """Canonical classification category; events reference it by ``category_id``."""
+
+    __tablename__ = "categories"
+
+    id: Mapped[int] = mapped_column(CategoryId, primary_key=True)
+    name: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+
+    aliases: Mapped[list["CategoryAlias"]] = relationship(
+        "CategoryAlias", back_populates="category", lazy="selectin"
+    )
+
+
+class CategoryAlias(Base):
+    """A normalised label (e.g. ``"prize"``) that maps onto a canonical category."""
+
+    __tablename__ = "category_aliases"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    alias: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), index=True)
+
+    category: Mapped[Category] = relationship("Category", back_populates="aliases")
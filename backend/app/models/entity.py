@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class MessageEntity(Base):
+    __tablename__ = "message_entities"
+    __table_args__ = (
+        Index("ix_message_entities_kind_value", "kind", "value"),
+        Index("ix_message_entities_kind_received_at", "kind", "received_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    message_id: Mapped[int] = mapped_column(
+        ForeignKey("messages.id", ondelete="CASCADE"), index=True
+    )
+    kind: Mapped[str] = mapped_column(String(16))
+    value: Mapped[str] = mapped_column(String(255))
+    # Denormalised from the message so windowed top-N queries stay on this table.
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
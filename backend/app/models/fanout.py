@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class CallerFanoutDay(Base):
+    """Per-caller, per-UTC-day call count and HyperLogLog sketch of distinct callees."""
+
+    __tablename__ = "caller_fanout_daily"
+    __table_args__ = (
+        UniqueConstraint("caller_id", "day", name="uq_caller_fanout_daily_caller_day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    caller_id: Mapped[int] = mapped_column(ForeignKey("senders.id"), index=True)
+    day: Mapped[date] = mapped_column(Date, index=True)
+    calls: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    first_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    last_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    callee_sketch: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class CallerFanoutMonth(Base):
+    """The daily rows of one caller and UTC month, pre-merged; ``month`` is its first day."""
+
+    __tablename__ = "caller_fanout_monthly"
+    __table_args__ = (
+        UniqueConstraint("caller_id", "month", name="uq_caller_fanout_monthly_caller_month"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    caller_id: Mapped[int] = mapped_column(ForeignKey("senders.id"), index=True)
+    month: Mapped[date] = mapped_column(Date, index=True)
+    calls: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    first_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    last_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    callee_sketch: Mapped[bytes] = mapped_column(LargeBinary)
@@ -3,23 +3,41 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.models.category import CategoryId
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serve the SMS drill-down: templates per category, then messages per template.
+        Index("ix_messages_category_body", "category_id", "body_id"),
+        Index("ix_messages_body_received", "body_id", "received_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     sender_id: Mapped[Optional[int]] = mapped_column(ForeignKey("senders.id"), nullable=True)
     receiver_number: Mapped[str] = mapped_column(String(32))
-    body: Mapped[str] = mapped_column(Text)
-    category: Mapped[Optional[str]] = mapped_column(String(64))
-    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    body_id: Mapped[int] = mapped_column(ForeignKey("message_bodies.id"))
+    # sha256 idempotency key of the delivered event; NULL for rows loaded without one.
+    event_key: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
+    category_id: Mapped[Optional[int]] = mapped_column(
+        CategoryId, ForeignKey("categories.id"), nullable=True
+    )
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
     is_spam: Mapped[bool] = mapped_column(Boolean, default=False)
     confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     blocked: Mapped[bool] = mapped_column(Boolean, default=False)
+    classified_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
 
     sender: Mapped[Optional["Sender"]] = relationship("Sender", back_populates="messages")
+    body_record: Mapped["MessageBody"] = relationship("MessageBody", lazy="joined")
+
+    @property
+    def body(self) -> str:
+        return self.body_record.content
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class EventRollupHour(Base):
+    """Detected and blocked events per channel and UTC hour (epoch seconds of the hour start)."""
+
+    __tablename__ = "event_rollups_hourly"
+    __table_args__ = (
+        UniqueConstraint("channel", "hour_start", name="uq_event_rollups_hourly_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel: Mapped[str] = mapped_column(String(8))
+    hour_start: Mapped[int] = mapped_column(BigInteger)
+    detected: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    blocked: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
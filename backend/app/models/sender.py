@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -15,7 +16,15 @@ class Sender(Base):
     phone_number: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
     spam_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     is_blocked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # When is_blocked last changed; other workers' live rings re-sync from it.
+    blocked_changed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
     last_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    # The prefix rule that blocked this sender, if any; lets rules count senders without a scan.
+    block_rule_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("block_rules.id"), nullable=True, index=True
+    )
 
     messages: Mapped[list["Message"]] = relationship("Message", back_populates="sender")
     calls: Mapped[list["Call"]] = relationship("Call", back_populates="caller")
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class SenderDailyCount(Base):
+    """Spam events per sender, channel and UTC day; the leaderboard's durable counters."""
+
+    __tablename__ = "sender_daily_counts"
+    __table_args__ = (
+        UniqueConstraint("sender_id", "channel", "day", name="uq_sender_daily_counts_key"),
+        Index("ix_sender_daily_counts_channel_day", "channel", "day"),
+        Index("ix_sender_daily_counts_channel_updated", "channel", "updated_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sender_id: Mapped[int] = mapped_column(ForeignKey("senders.id"), index=True)
+    channel: Mapped[str] = mapped_column(String(8))
+    day: Mapped[date] = mapped_column(Date)
+    events: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Last change to events; other workers' in-memory windows catch up from it.
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
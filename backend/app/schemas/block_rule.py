@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class BlockRuleCreate(BaseModel):
+    prefix: str = Field(min_length=1, max_length=40)
+    note: Optional[str] = Field(default=None, max_length=255)
+
+
+class BlockRuleRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    prefix: str
+    note: Optional[str]
+    created_at: datetime
+    senders_caught: int
+    events_caught: int
+    last_matched_at: Optional[datetime]
@@ -40,3 +40,19 @@ class CallListResponse(BaseModel):
     stats: CallStats
     categories: list[CallCategorySummary]
     recent_calls: list[CallRead]
+
+
+class CallerFanout(BaseModel):
+    caller_id: int
+    caller_number: str
+    distinct_callees: int
+    total_calls: int
+    first_seen: datetime
+    last_seen: datetime
+    is_blocked: bool
+
+
+class CallerFanoutPage(BaseModel):
+    estimated: bool
+    total_callers: int
+    items: list[CallerFanout]
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+
+class CategoryRead(BaseModel):
+    id: int
+    name: str
+    aliases: list[str]
+
+
+class CategoryAliasCreate(BaseModel):
+    alias: str = Field(min_length=1, max_length=64)
+    category: str = Field(min_length=1, max_length=64)
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -10,3 +12,33 @@ class ClassificationResponse(BaseModel):
     confidence: float
     category: str
     rationale: str
+
+
+class LocalModelInfo(BaseModel):
+    version: int
+    trained_at: str
+    samples: int
+    categories: list[str]
+
+
+class AdmissionClassStats(BaseModel):
+    priority: Literal["realtime", "interactive", "batch"]
+    concurrency: int
+    max_queue: int
+    deadline_seconds: float
+    active: int
+    queued: int
+    admitted: int
+    rejected_queue_full: int
+    rejected_deadline: int
+    timed_out: int
+    wait_ms_p50: Optional[float]
+    wait_ms_p95: Optional[float]
+    wait_ms_max: Optional[float]
+
+
+class AdmissionStats(BaseModel):
+    total_concurrency: int
+    active: int
+    service_time_ms: Optional[float]
+    classes: list[AdmissionClassStats]
@@ -0,0 +1,12 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+EntityKind = Literal["url", "domain", "phone"]
+
+
+class EntityCount(BaseModel):
+    kind: EntityKind
+    value: str
+    messages: int
+    senders: int
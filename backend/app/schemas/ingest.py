@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SmsIngest(BaseModel):
+    event_id: Optional[str] = Field(None, max_length=128)
+    sender_number: Optional[str] = Field(None, max_length=32)
+    receiver_number: str = Field(max_length=32)
+    body: str = Field(min_length=1)
+    received_at: Optional[datetime] = None
+    category: Optional[str] = Field(None, max_length=64)
+    is_spam: bool = False
+    confidence: Optional[float] = Field(None, ge=0, le=1)
+    blocked: bool = False
+
+
+class CallIngest(BaseModel):
+    event_id: Optional[str] = Field(None, max_length=128)
+    caller_number: Optional[str] = Field(None, max_length=32)
+    callee_number: str = Field(max_length=32)
+    started_at: Optional[datetime] = None
+    duration_seconds: int = Field(0, ge=0)
+    category: Optional[str] = Field(None, max_length=64)
+    is_spam: bool = False
+    confidence: Optional[float] = Field(None, ge=0, le=1)
+    blocked: bool = False
+
+
+class IngestResult(BaseModel):
+    # ``None`` when the event was only queued (WRITE_QUEUE_DURABILITY=enqueue).
+    id: Optional[int]
+    duplicate: bool = False
+    queued: bool = False
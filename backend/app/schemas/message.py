@@ -41,3 +41,60 @@ class SmsListResponse(BaseModel):
     stats: MessageStats
     categories: list[MessageCategorySummary]
     recent_messages: list[MessageRead]
+
+
+class TemplateSender(BaseModel):
+    sender_id: int
+    sender_number: str
+    messages: int
+
+
+class MessageTemplate(BaseModel):
+    body_id: int
+    body: str
+    total_messages: int
+    unique_senders: int
+    blocked: int
+    first_seen: datetime
+    last_seen: datetime
+    top_senders: list[TemplateSender]
+
+
+class MessageTemplatePage(BaseModel):
+    category: str
+    total_templates: int
+    items: list[MessageTemplate]
+
+
+class MessagePage(BaseModel):
+    body_id: int
+    items: list[MessageRead]
+    # Pass back as ``cursor`` for the next page; ``None`` on the last page.
+    next_cursor: Optional[str]
+
+
+class SimilarMessage(BaseModel):
+    score: float
+    message: MessageRead
+
+
+class SimilarMessagesResponse(BaseModel):
+    message_id: int
+    matches: list[SimilarMessage]
+
+
+class BodyStorageStats(BaseModel):
+    messages: int
+    distinct_bodies: int
+    referenced_chars: int
+    distinct_chars: int
+    stored_bytes: int
+    compression_enabled: bool
+    active_dictionary_id: Optional[int] = None
+
+
+class BodyDictionaryInfo(BaseModel):
+    id: int
+    created_at: datetime
+    sample_size: int
+    size_bytes: int
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str
+    status: Optional[int]
+    started_at: datetime
+    duration_ms: float
+    phases_ms: dict[str, float]
+
+
+class ProfileFunction(BaseModel):
+    function: str
+    self_ms: float
+    total_ms: float
+
+
+class ProfileQuery(BaseModel):
+    statement: str
+    count: int
+    total_ms: float
+
+
+class ProfileRead(ProfileSummary):
+    samples: int
+    sql_statements: int
+    sql_ms: float
+    top_functions: list[ProfileFunction]
+    top_queries: list[ProfileQuery]
@@ -1,3 +1,6 @@
+from datetime import date
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -8,3 +11,18 @@ class SenderRead(BaseModel):
     phone_number: str
     spam_count: int
     is_blocked: bool
+
+
+class TopSender(BaseModel):
+    sender_id: int
+    phone_number: str
+    spam_events: int
+    is_blocked: bool
+
+
+class TopSendersResponse(BaseModel):
+    channel: Literal["sms", "calls"]
+    start_date: date
+    end_date: date
+    source: Literal["memory", "daily_counters"]
+    senders: list[TopSender]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -10,6 +10,8 @@ from app.schemas.message import MessageStats
 
 class DashboardSummary(BaseModel):
     timeframe: str
+    granularity: str = "day"
+    timezone: str = "UTC"
     sms: MessageStats
     calls: CallStats
     overall_block_rate: float
@@ -24,11 +26,13 @@ class DashboardSummary(BaseModel):
 
 class SmsDailyStat(BaseModel):
     date: date
+    bucket_start: datetime
     detected: int
     blocked: int
 
 
 class CallDailyStat(BaseModel):
     date: date
+    bucket_start: datetime
     detected: int
     blocked: int
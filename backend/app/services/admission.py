@@ -0,0 +1,247 @@
+"""Admission control for classification traffic.
+
+``classify_message`` can end in an OpenAI call, so every caller competes for the
+same quota and event loop. ``AdmissionController`` sits in front of it with one
+bounded FIFO queue and one concurrency limit per priority class, plus a shared
+limit over all classes:
+
+* ``realtime``: automated screening of live traffic;
+* ``interactive``: the tester in the UI;
+* ``batch``: backfills such as the reclassification worker.
+
+A freed slot goes to the highest-priority class that has waiters and spare
+class capacity, so batch work only uses capacity the others leave idle.
+
+Every request has a deadline (its class default unless the caller passes one).
+A request is shed immediately with ``AdmissionRejected`` when its class queue
+is full, or when the expected wait (queue position times the recent service
+time) already exceeds the deadline. A queued request that is still waiting at
+its deadline is shed the same way, and one admitted but not finished by it
+gets ``AdmissionTimeout``. The API maps these to ``429`` with ``Retry-After``
+and ``504``. ``stats`` reports depth, in-flight work, outcomes and recent
+queue-wait percentiles per class.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core.config import Settings, get_settings
+
+PRIORITIES = ("realtime", "interactive", "batch")
+_WAIT_SAMPLES = 1024
+_SERVICE_TIME_WEIGHT = 0.2
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    name: str
+    concurrency: int
+    max_queue: int
+    deadline_seconds: float
+
+
+class AdmissionRejected(RuntimeError):
+    """Shed before running; ``retry_after`` is a hint in whole seconds."""
+
+    def __init__(self, priority: str, reason: str, retry_after: int) -> None:
+        detail = "queue is full" if reason == "queue_full" else "deadline cannot be met"
+        super().__init__(f"Shed {priority} classification: {detail}")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTimeout(RuntimeError):
+    """Admitted, but the work did not finish before the request's deadline."""
+
+
+class _ClassState:
+    def __init__(self, spec: PriorityClass) -> None:
+        self.spec = spec
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.counts: Counter = Counter()
+        self.waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+
+class AdmissionController:
+    def __init__(self, classes: list[PriorityClass], total_concurrency: int) -> None:
+        # Dict order is priority order: earlier classes are dispatched first.
+        self._classes = {spec.name: _ClassState(spec) for spec in classes}
+        self.total_concurrency = total_concurrency
+        self._active = 0
+        self._service_time: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "AdmissionController":
+        return cls(
+            [
+                PriorityClass(
+                    name,
+                    getattr(settings, f"classify_{name}_concurrency"),
+                    getattr(settings, f"classify_{name}_max_queue"),
+                    getattr(settings, f"classify_{name}_deadline_seconds"),
+                )
+                for name in PRIORITIES
+            ],
+            settings.classify_max_concurrency,
+        )
+
+    async def run(
+        self,
+        priority: str,
+        work: Callable[[], Awaitable[Any]],
+        deadline_seconds: Optional[float] = None,
+    ) -> Any:
+        """Run ``work()`` once admitted under ``priority``, within the deadline."""
+
+        state = self._classes[priority]
+        budget = deadline_seconds if deadline_seconds is not None else state.spec.deadline_seconds
+        deadline = time.monotonic() + budget
+        await self._acquire(state, deadline)
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(work(), max(deadline - started, 0.0))
+        except asyncio.TimeoutError:
+            state.counts["timed_out"] += 1
+            raise AdmissionTimeout(f"{priority} classification exceeded its deadline") from None
+        finally:
+            self._record_service_time(time.monotonic() - started)
+            self._release(state)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "total_concurrency": self.total_concurrency,
+            "active": self._active,
+            "service_time_ms": (
+                round(self._service_time * 1000, 1) if self._service_time is not None else None
+            ),
+            "classes": [
+                {
+                    "priority": name,
+                    "concurrency": state.spec.concurrency,
+                    "max_queue": state.spec.max_queue,
+                    "deadline_seconds": state.spec.deadline_seconds,
+                    "active": state.active,
+                    "queued": len(state.waiters),
+                    "admitted": state.counts["admitted"],
+                    "rejected_queue_full": state.counts["queue_full"],
+                    "rejected_deadline": state.counts["deadline"],
+                    "timed_out": state.counts["timed_out"],
+                    "wait_ms_p50": _percentile_ms(state.waits, 0.50),
+                    "wait_ms_p95": _percentile_ms(state.waits, 0.95),
+                    "wait_ms_max": _percentile_ms(state.waits, 1.0),
+                }
+                for name, state in self._classes.items()
+            ],
+        }
+
+    async def _acquire(self, state: _ClassState, deadline: float) -> None:
+        queued_at = time.monotonic()
+        if not state.waiters and self._has_capacity(state) and not self._higher_waiting(state):
+            self._admit(state)
+            state.waits.append(0.0)
+            return
+
+        if len(state.waiters) >= state.spec.max_queue:
+            self._reject(state, "queue_full", self._expected_wait(state))
+        expected = self._expected_wait(state)
+        if expected is not None and queued_at + expected > deadline:
+            self._reject(state, "deadline", expected)
+
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(deadline - queued_at, 0.0))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted at the last moment; hand the slot straight back.
+                self._release(state)
+            else:
+                waiter.cancel()
+                _discard(state.waiters, waiter)
+            self._reject(state, "deadline", self._expected_wait(state))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(state)
+            else:
+                waiter.cancel()
+                _discard(state.waiters, waiter)
+            raise
+        state.waits.append(time.monotonic() - queued_at)
+
+    def _admit(self, state: _ClassState) -> None:
+        state.active += 1
+        self._active += 1
+        state.counts["admitted"] += 1
+
+    def _release(self, state: _ClassState) -> None:
+        state.active -= 1
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for state in self._classes.values():
+            while state.waiters and self._has_capacity(state):
+                waiter = state.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._admit(state)
+                waiter.set_result(None)
+
+    def _has_capacity(self, state: _ClassState) -> bool:
+        return self._active < self.total_concurrency and state.active < state.spec.concurrency
+
+    def _higher_waiting(self, state: _ClassState) -> bool:
+        # Only waiters that a free slot could actually go to take precedence.
+        for other in self._classes.values():
+            if other is state:
+                return False
+            if other.waiters and other.active < other.spec.concurrency:
+                return True
+        return False
+
+    def _expected_wait(self, state: _ClassState) -> Optional[float]:
+        if self._service_time is None:
+            return None
+        ahead = 0
+        for other in self._classes.values():
+            ahead += len(other.waiters)
+            if other is state:
+                break
+        lanes = max(min(state.spec.concurrency, self.total_concurrency), 1)
+        return (ahead + 1) / lanes * self._service_time
+
+    def _reject(self, state: _ClassState, reason: str, expected_wait: Optional[float]) -> None:
+        state.counts[reason] += 1
+        retry_after = max(1, math.ceil(expected_wait)) if expected_wait is not None else 1
+        raise AdmissionRejected(state.spec.name, reason, retry_after)
+
+    def _record_service_time(self, seconds: float) -> None:
+        if self._service_time is None:
+            self._service_time = seconds
+        else:
+            self._service_time += _SERVICE_TIME_WEIGHT * (seconds - self._service_time)
+
+
+def _discard(waiters: deque, waiter: asyncio.Future) -> None:
+    try:
+        waiters.remove(waiter)
+    except ValueError:
+        pass
+
+
+def _percentile_ms(samples: deque, quantile: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(int(quantile * len(ordered)), len(ordered) - 1)] * 1000, 1)
+
+
+classification_admission = AdmissionController.from_settings(get_settings())
@@ -0,0 +1,124 @@
+"""Range filters and per-category aggregates shared by the dashboard routes.
+
+``/api/summary``, ``/api/sms`` (with its drill-down) and ``/api/calls`` all
+restrict a channel to ``[start_date, end_date]`` and summarise it per category.
+Both live here so the channels cannot drift apart.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timeutils import as_utc
+from app.db.queries import call_rows_query
+from app.models.body import MessageBody
+from app.models.call import Call
+from app.models.category import Category
+from app.models.message import Message
+from app.schemas.call import CallCategorySummary
+from app.schemas.message import MessageCategorySummary
+from app.services.bodies import catch_up_dictionaries
+
+UNCATEGORISED = "uncategorised"
+PREVIEW_CHARS = 120
+
+
+def time_filters(column, start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple:
+    """Inclusive bounds on ``column``, in UTC like the stored event times.
+
+    SQLite compares the bound's wall time and drops its offset, so a bound sent
+    as ``10:30+05:00`` must be bound as ``05:30`` to match rows stored in UTC.
+    """
+
+    conditions = []
+    if start_date:
+        conditions.append(column >= as_utc(start_date))
+    if end_date:
+        conditions.append(column <= as_utc(end_date))
+    return tuple(conditions)
+
+
+async def message_category_summaries(
+    session: AsyncSession,
+    filters: tuple,
+) -> list[MessageCategorySummary]:
+    rows = (
+        await session.execute(
+            select(
+                func.coalesce(Category.name, UNCATEGORISED).label("category"),
+                func.count(Message.id).label("total"),
+                func.count(func.distinct(Message.sender_id)).label("senders"),
+                func.coalesce(func.sum(cast(Message.blocked, Integer)), 0).label("blocked"),
+                func.count(func.distinct(Message.body_id)).label("templates"),
+                func.max(Message.body_id).label("sample_body_id"),
+            )
+            .outerjoin(Category, Category.id == Message.category_id)
+            .where(*filters)
+            .group_by(Message.category_id, Category.name)
+            .order_by(func.count(Message.id).desc())
+        )
+    ).all()
+    previews = await body_contents(session, [row.sample_body_id for row in rows])
+    return [
+        MessageCategorySummary(
+            category=row.category,
+            total_messages=row.total,
+            unique_senders=row.senders,
+            blocked=row.blocked,
+            sample_preview=previews.get(row.sample_body_id, "")[:PREVIEW_CHARS],
+            unique_messages=row.templates,
+        )
+        for row in rows
+    ]
+
+
+async def call_category_summaries(
+    session: AsyncSession,
+    filters: tuple,
+) -> list[CallCategorySummary]:
+    rows = (
+        await session.execute(
+            select(
+                func.coalesce(Category.name, UNCATEGORISED).label("category"),
+                func.count(Call.id).label("total"),
+                func.count(func.distinct(Call.caller_id)).label("callers"),
+                func.coalesce(func.sum(cast(Call.blocked, Integer)), 0).label("blocked"),
+                func.max(Call.id).label("sample_id"),
+            )
+            .outerjoin(Category, Category.id == Call.category_id)
+            .where(*filters)
+            .group_by(Call.category_id, Category.name)
+            .order_by(func.count(Call.id).desc())
+        )
+    ).all()
+    samples = {
+        sample.id: sample
+        for sample in await session.execute(
+            call_rows_query().where(Call.id.in_([row.sample_id for row in rows]))
+        )
+    }
+    return [
+        CallCategorySummary(
+            category=row.category,
+            total_calls=row.total,
+            unique_callers=row.callers,
+            blocked=row.blocked,
+            sample_preview=f"Caller {samples[row.sample_id].caller_number or 'Unknown'}"
+            f" → {samples[row.sample_id].callee_number}",
+        )
+        for row in rows
+    ]
+
+
+async def body_contents(session: AsyncSession, body_ids: list[int]) -> dict[int, str]:
+    if not body_ids:
+        return {}
+    await catch_up_dictionaries(session)
+    rows = await session.execute(
+        select(MessageBody.id, MessageBody.content).where(MessageBody.id.in_(body_ids))
+    )
+    return {row.id: row.content for row in rows}
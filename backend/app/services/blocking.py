@@ -0,0 +1,229 @@
+"""Prefix block rules matched against every inbound sender or caller number.
+
+Scam operations rotate through number ranges, so besides per-sender blocking
+(``Sender.is_blocked``) operators can block a prefix such as ``+1555001``
+(written ``+1555001xxx`` if preferred). Rules live in ``block_rules`` and are
+held in memory as a prefix trie, so ingest matches a number in O(length of the
+number) without a query. The longest matching prefix wins.
+
+A caught event is stored as blocked and its sender is blocked and tagged with
+the rule (``senders.block_rule_id``). Each rule keeps running
+``senders_caught``/``events_caught`` counters, bumped with one ``UPDATE`` per
+caught event, so its stats never need a scan of ``senders`` or the event
+tables.
+
+Rule changes go through the write queue and bump ``block_rule_set.version`` in
+the same transaction. The worker that made the change reloads its trie once it
+commits. Every other worker compares its trie's version with the stored one
+before matching, at most once per ``BLOCK_RULES_REFRESH_SECONDS``, and reloads
+when they differ. A new rule therefore reaches all workers within that delay.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.block_rule import BlockRule, BlockRuleSet
+from app.models.sender import Sender
+
+_SEPARATORS = re.compile(r"[\s\-.()]+")
+_PREFIX = re.compile(r"\+?\d+")
+_WILDCARDS = "xX*"
+
+
+def normalise_number(number: str) -> str:
+    return _SEPARATORS.sub("", number)
+
+
+def normalise_prefix(prefix: str) -> str:
+    """Canonical form of a rule prefix; raises ``ValueError`` if it is not one."""
+
+    value = normalise_number(prefix).rstrip(_WILDCARDS)
+    if not _PREFIX.fullmatch(value):
+        raise ValueError(f"Invalid number prefix {prefix!r}")
+    return value
+
+
+class PrefixTrie:
+    """Character trie over number prefixes, stored as parallel node arrays."""
+
+    def __init__(self) -> None:
+        self._children: list[dict[str, int]] = [{}]
+        self._values: list[Optional[int]] = [None]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, prefix: str, value: int) -> None:
+        node = 0
+        for char in prefix:
+            child = self._children[node].get(char)
+            if child is None:
+                child = len(self._children)
+                self._children[node][char] = child
+                self._children.append({})
+                self._values.append(None)
+            node = child
+        if self._values[node] is None:
+            self._size += 1
+        self._values[node] = value
+
+    def longest_match(self, key: str) -> Optional[int]:
+        node = 0
+        found = self._values[0]
+        for char in key:
+            node = self._children[node].get(char)
+            if node is None:
+                break
+            if self._values[node] is not None:
+                found = self._values[node]
+        return found
+
+
+class BlockRuleMatcher:
+    def __init__(self, refresh_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.version = 0
+        self._trie = PrefixTrie()
+        self._checked_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._trie)
+
+    def load(self, rules: Iterable[tuple[int, str]], version: int) -> None:
+        """Replace the trie with ``(id, prefix)`` rules at rule-set ``version``."""
+
+        trie = PrefixTrie()
+        for rule_id, prefix in rules:
+            trie.add(prefix, rule_id)
+        self._trie = trie
+        self.version = version
+        self._checked_at = time.monotonic()
+
+    def stale(self, version: int) -> bool:
+        """Record a check against the stored ``version``; true if the trie must be reloaded."""
+
+        self._checked_at = time.monotonic()
+        return version != self.version
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.refresh_seconds
+
+    def match(self, number: Optional[str]) -> Optional[int]:
+        """Id of the most specific rule covering ``number``, if any."""
+
+        if not number or not len(self._trie):
+            return None
+        return self._trie.longest_match(normalise_number(number))
+
+
+block_rules = BlockRuleMatcher(get_settings().block_rules_refresh_seconds)
+
+
+async def read_rule_set(session: AsyncSession) -> tuple[list[tuple[int, str]], int]:
+    """Every rule as ``(id, prefix)`` and the rule-set version, for ``BlockRuleMatcher.load``."""
+
+    rules = [tuple(row) for row in await session.execute(select(BlockRule.id, BlockRule.prefix))]
+    return rules, await _rule_set_version(session)
+
+
+async def load_block_rules(session: AsyncSession) -> None:
+    block_rules.load(*await read_rule_set(session))
+
+
+async def refresh_block_rules(session: AsyncSession) -> None:
+    """Reload the trie if another worker changed the rules since it was loaded."""
+
+    if block_rules.due() and block_rules.stale(await _rule_set_version(session)):
+        await load_block_rules(session)
+
+
+async def _rule_set_version(session: AsyncSession) -> int:
+    version = await session.scalar(select(BlockRuleSet.version).where(BlockRuleSet.id == 1))
+    return version or 0
+
+
+async def _bump_rule_set_version(session: AsyncSession) -> None:
+    bumped = await session.execute(
+        update(BlockRuleSet).where(BlockRuleSet.id == 1).values(version=BlockRuleSet.version + 1)
+    )
+    if not bumped.rowcount:
+        session.add(BlockRuleSet(id=1, version=1))
+        await session.flush()
+
+
+async def apply_block_rules(
+    session: AsyncSession,
+    sender: Optional[Sender],
+    seen_at: datetime,
+) -> bool:
+    """Block ``sender`` if a rule covers its number and count the catch (staged)."""
+
+    if sender is None:
+        return False
+    await refresh_block_rules(session)
+    rule_id = block_rules.match(sender.phone_number)
+    if rule_id is None:
+        return False
+
+    new_sender = sender.block_rule_id != rule_id
+    if new_sender and sender.block_rule_id is not None:
+        # A more specific rule now covers this sender; move it over.
+        await session.execute(
+            update(BlockRule)
+            .where(BlockRule.id == sender.block_rule_id)
+            .values(senders_caught=BlockRule.senders_caught - 1)
+        )
+    if not sender.is_blocked:
+        sender.is_blocked = True
+        sender.blocked_changed_at = datetime.now(timezone.utc)
+    sender.block_rule_id = rule_id
+    await session.execute(
+        update(BlockRule)
+        .where(BlockRule.id == rule_id)
+        .values(
+            senders_caught=BlockRule.senders_caught + int(new_sender),
+            events_caught=BlockRule.events_caught + 1,
+            last_matched_at=seen_at,
+        )
+    )
+    return True
+
+
+async def create_block_rule(
+    session: AsyncSession,
+    prefix: str,
+    note: Optional[str] = None,
+) -> BlockRule:
+    """Stage a rule for an already normalised prefix; ``ValueError`` if it exists."""
+
+    try:
+        async with session.begin_nested():
+            rule = BlockRule(prefix=prefix, note=note, created_at=datetime.now(timezone.utc))
+            session.add(rule)
+    except IntegrityError:
+        raise ValueError(f"A rule for prefix {prefix!r} already exists") from None
+    await _bump_rule_set_version(session)
+    return rule
+
+
+async def delete_block_rule(session: AsyncSession, rule_id: int) -> None:
+    """Stage removal of a rule; senders it blocked stay blocked but lose the tag."""
+
+    rule = await session.get(BlockRule, rule_id)
+    if rule is None:
+        raise LookupError(f"Block rule {rule_id} not found")
+    await session.execute(
+        update(Sender).where(Sender.block_rule_id == rule_id).values(block_rule_id=None)
+    )
+    await session.delete(rule)
+    await _bump_rule_set_version(session)
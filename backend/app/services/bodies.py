@@ -0,0 +1,284 @@
+"""Interning of message texts into ``message_bodies``.
+
+A campaign sends one text to many receivers, so ``messages`` only holds a
+``body_id`` and each distinct text is stored once, keyed by its sha256. Ingest
+resolves texts through a bounded hash -> row cache. A hit is attached to the
+session with ``merge(load=False)``, so repeat texts cost no SQL at all; a miss
+looks the hash up and inserts the body when it is new.
+
+Retention deletes bodies no message refers to any more and bumps
+``body_generation`` in the same transaction. A cached id may name such a body,
+so ingest compares the stored generation with its cache's, at most once per
+``BODY_CACHE_REFRESH_SECONDS``, and empties the cache when they differ.
+
+Optionally (``BODY_COMPRESSION``) bodies are zlib-compressed, using a preset
+dictionary trained from sampled bodies when one exists; see ``app.db.body_codec``.
+Code that reads bodies calls ``catch_up_dictionaries`` first. At most once per
+``BODY_DICTIONARY_REFRESH_SECONDS`` it registers dictionaries another worker
+trained since, so decoding does not have to fetch them with a blocking query.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import Engine, create_engine, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.pool import NullPool
+
+from app.core.config import get_settings
+from app.db.body_codec import newest_dictionary, register_dictionary, set_dictionary_loader
+from app.db.session import sync_database_url
+from app.models.body import BodyDictionary, BodyGeneration, MessageBody
+from app.models.message import Message
+
+# zlib only looks back 32 KiB, so a larger preset dictionary would be wasted.
+DICTIONARY_BYTES = 32 * 1024
+_DICTIONARY_NGRAMS = (3, 4, 5, 6)
+
+
+class BodyCache:
+    """Bounded LRU of content hash -> committed ``(body_id, length)``."""
+
+    def __init__(self, capacity: int, refresh_seconds: float = 0.0) -> None:
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.generation = 0
+        self._entries: OrderedDict[str, tuple[int, int]] = OrderedDict()
+        self._checked_at = float("-inf")
+
+    def get(self, content_hash: str) -> Optional[tuple[int, int]]:
+        entry = self._entries.get(content_hash)
+        if entry is not None:
+            self._entries.move_to_end(content_hash)
+        return entry
+
+    def remember(self, content_hash: str, body_id: int, length: int) -> None:
+        if self.capacity <= 0:
+            return
+        self._entries[content_hash] = (body_id, length)
+        self._entries.move_to_end(content_hash)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.refresh_seconds
+
+    def check(self, generation: int) -> None:
+        """Empty the cache if bodies were deleted since it last saw ``generation``."""
+
+        self._checked_at = time.monotonic()
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+
+
+body_cache = BodyCache(get_settings().body_cache_size, get_settings().body_cache_refresh_seconds)
+_dictionaries_checked_at = float("-inf")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def new_body(text: str) -> MessageBody:
+    return MessageBody(content_hash=content_hash(text), length=len(text), content=text)
+
+
+async def intern_body(session: AsyncSession, text: str) -> MessageBody:
+    """Return the persistent body row for ``text``, staging an insert if it is new."""
+
+    if body_cache.due():
+        body_cache.check(await _body_generation(session))
+    digest = content_hash(text)
+    cached = body_cache.get(digest)
+    if cached is not None:
+        body_id, length = cached
+        body = MessageBody(id=body_id, content_hash=digest, length=length, content=text)
+        make_transient_to_detached(body)
+        return await session.merge(body, load=False)
+
+    query = select(MessageBody).where(MessageBody.content_hash == digest)
+    body = await session.scalar(query)
+    if body is None:
+        try:
+            async with session.begin_nested():
+                body = new_body(text)
+                session.add(body)
+        except IntegrityError:
+            # Another writer stored the same text between our lookup and insert.
+            body = await session.scalar(query)
+    else:
+        body_cache.remember(body.content_hash, body.id, body.length)
+    return body
+
+
+async def purge_orphan_bodies(session: AsyncSession, body_ids: list[int]) -> int:
+    """Delete the given bodies no message refers to any more (staged); return how many."""
+
+    if not body_ids:
+        return 0
+    referenced = select(Message.id).where(Message.body_id == MessageBody.id).exists()
+    result = await session.execute(
+        delete(MessageBody)
+        .where(MessageBody.id.in_(body_ids), ~referenced)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        # Before the commit: a later write of the same batch must not reuse a purged id.
+        body_cache.clear()
+        bumped = await session.execute(
+            update(BodyGeneration)
+            .where(BodyGeneration.id == 1)
+            .values(generation=BodyGeneration.generation + 1)
+        )
+        if not bumped.rowcount:
+            session.add(BodyGeneration(id=1, generation=1))
+            await session.flush()
+    return result.rowcount
+
+
+async def _body_generation(session: AsyncSession) -> int:
+    generation = await session.scalar(
+        select(BodyGeneration.generation).where(BodyGeneration.id == 1)
+    )
+    return generation or 0
+
+
+async def load_body_dictionaries(session: AsyncSession) -> None:
+    global _dictionaries_checked_at
+    for dictionary in await session.scalars(select(BodyDictionary).order_by(BodyDictionary.id)):
+        register_dictionary(dictionary.id, dictionary.content)
+    _dictionaries_checked_at = time.monotonic()
+    set_dictionary_loader(fetch_dictionary)
+
+
+async def catch_up_dictionaries(session: AsyncSession) -> None:
+    """Register dictionaries trained since this worker last looked, before decoding.
+
+    Readable from now on, but new writes keep the active dictionary. Checked at
+    most once per ``BODY_DICTIONARY_REFRESH_SECONDS``; a body that still names an
+    unknown dictionary (trained within that interval) is left to ``fetch_dictionary``.
+    """
+
+    global _dictionaries_checked_at
+    if time.monotonic() - _dictionaries_checked_at < get_settings().body_dictionary_refresh_seconds:
+        return
+    rows = await session.execute(
+        select(BodyDictionary.id, BodyDictionary.content)
+        .where(BodyDictionary.id > newest_dictionary())
+        .order_by(BodyDictionary.id)
+    )
+    for dictionary_id, content in rows:
+        register_dictionary(dictionary_id, content, activate=False)
+    _dictionaries_checked_at = time.monotonic()
+
+
+def fetch_dictionary(dictionary_id: int) -> Optional[bytes]:
+    """Blocking read of one dictionary, the codec's last resort.
+
+    Decoding happens inside SQLAlchemy's result processing, where nothing can be
+    awaited. ``catch_up_dictionaries`` registers new dictionaries ahead of it, so
+    this only runs for one trained within the last refresh interval, at most once
+    per dictionary.
+    """
+
+    with _dictionary_engine().connect() as connection:
+        return connection.scalar(
+            select(BodyDictionary.content).where(BodyDictionary.id == dictionary_id)
+        )
+
+
+@lru_cache(maxsize=1)
+def _dictionary_engine() -> Engine:
+    # The primary, not a replica: the dictionary may have only just committed.
+    return create_engine(sync_database_url(get_settings().database_url), poolclass=NullPool)
+
+
+async def train_body_dictionary(session: AsyncSession, sample_size: int = 2000) -> BodyDictionary:
+    """Build a zlib preset dictionary from the most recent distinct bodies.
+
+    The dictionary is the most frequent word n-grams of the sample, packed so the
+    most valuable ones sit at the end (zlib encodes nearer matches more cheaply).
+    ``session`` is only read, so a read session will do. The dictionary is
+    returned unsaved: add it on a writer session and call ``activate_dictionary``
+    once it has committed.
+    """
+
+    texts = (
+        await session.scalars(
+            select(MessageBody.content).order_by(MessageBody.id.desc()).limit(sample_size)
+        )
+    ).all()
+    if not texts:
+        raise ValueError("No message bodies available for training")
+
+    ngrams: Counter = Counter()
+    for text in texts:
+        words = text.split()
+        for size in _DICTIONARY_NGRAMS:
+            ngrams.update(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+    chosen: list[bytes] = []
+    used = 0
+    for ngram, count in sorted(
+        ngrams.items(), key=lambda item: item[1] * len(item[0]), reverse=True
+    ):
+        if count < 2:
+            break
+        encoded = ngram.encode("utf-8") + b" "
+        if used + len(encoded) > DICTIONARY_BYTES:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    if not chosen:
+        raise ValueError("Message bodies share no repeated phrases to train on")
+
+    dictionary = BodyDictionary(
+        created_at=datetime.now(timezone.utc),
+        sample_size=len(texts),
+        content=b"".join(reversed(chosen)),
+    )
+    return dictionary
+
+
+def activate_dictionary(dictionary_id: int, content: bytes) -> None:
+    """Use a committed dictionary for new writes."""
+
+    register_dictionary(dictionary_id, content)
+
+
+async def storage_stats(session: AsyncSession) -> dict[str, int]:
+    messages, referenced_chars = (
+        await session.execute(
+            select(func.count(Message.id), func.coalesce(func.sum(MessageBody.length), 0))
+            .select_from(Message)
+            .join(MessageBody, MessageBody.id == Message.body_id)
+        )
+    ).one()
+    bodies, body_chars, stored_bytes = (
+        await session.execute(
+            select(
+                func.count(MessageBody.id),
+                func.coalesce(func.sum(MessageBody.length), 0),
+                func.coalesce(func.sum(func.length(MessageBody.content)), 0),
+            )
+        )
+    ).one()
+    return {
+        "messages": messages,
+        "distinct_bodies": bodies,
+        "referenced_chars": int(referenced_chars),
+        "distinct_chars": int(body_chars),
+        "stored_bytes": int(stored_bytes),
+    }
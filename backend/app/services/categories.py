@@ -0,0 +1,165 @@
+"""Canonical category taxonomy and the normaliser applied to every category label.
+
+Classifiers and feeds produce free-form labels ("Lottery", "lottery scam",
+"prize"). ``CategoryNormalizer.canonical`` maps a label onto one canonical
+name by, in order:
+
+1. exact match of the normalised label (case-folded, ``_``/``-`` as spaces)
+   against canonical names and aliases;
+2. the most specific known phrase inside the label, ignoring generic words
+   such as "scam" or "message" unless nothing else matches;
+3. a fuzzy ``difflib`` match for typos and inflections;
+4. otherwise ``"other"``.
+
+Results are memoised per raw label. Canonical names and aliases live in
+``categories``/``category_aliases``. The built-in taxonomy is inserted at startup and
+the whole table is held in memory, so resolving a label to its ``category_id``
+never needs a query on the ingest or classification paths.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category, CategoryAlias
+
+OTHER = "other"
+
+TAXONOMY: dict[str, tuple[str, ...]] = {
+    "lottery": ("prize", "sweepstakes", "jackpot", "lottery scam", "winner", "raffle"),
+    "financial": ("finance", "bank", "banking", "loan", "loans", "refinance", "credit", "crypto"),
+    "phishing": ("phish", "credential theft", "account verification", "smishing", "gift card"),
+    "promotional": ("promo", "promotion", "advertising", "advert", "ad", "offer", "sale"),
+    "marketing": ("marketing call", "sales call"),
+    "telemarketing": ("robocall", "robo call", "cold call"),
+    "scam": ("fraud", "impersonation", "extortion", "spam"),
+    "security": ("otp", "2fa", "two factor", "verification code", "one time password"),
+    "logistics": ("delivery", "shipping", "package", "parcel", "customs"),
+    "transactional": ("receipt", "payroll", "payment confirmation", "order update"),
+    "system": ("alert", "maintenance", "service notice"),
+    "services": ("warranty", "insurance", "subscription"),
+    "support": ("customer service", "customer support", "helpdesk"),
+    "collections": ("debt collection", "debt", "collection agency"),
+    "survey": ("poll", "feedback", "questionnaire"),
+    "personal": ("ham", "legitimate", "not spam", "conversation", "family", "friend"),
+    OTHER: ("unknown", "misc", "miscellaneous", "uncategorised", "uncategorized", "none"),
+}
+
+# Words that say something is unwanted without saying what kind; "lottery scam"
+# should land in lottery, not scam.
+_GENERIC_WORDS = frozenset({"scam", "spam", "fraud", "message", "messages", "sms", "text", "call"})
+_FUZZY_CUTOFF = 0.82
+_MEMO_LIMIT = 10_000
+_SEPARATORS = re.compile(r"[\s_\-/]+")
+
+
+_BUILTIN_PHRASES = {
+    **{alias: name for name, aliases in TAXONOMY.items() for alias in aliases},
+    **{name: name for name in TAXONOMY},
+}
+
+
+def normalise_label(label: str) -> str:
+    return _SEPARATORS.sub(" ", label.casefold()).strip()
+
+
+class CategoryNormalizer:
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._phrases: dict[str, str] = {}
+        self._memo: dict[str, str] = {}
+
+    def load(self, categories: list[Category]) -> None:
+        self._ids = {category.name: category.id for category in categories}
+        self._names = {category.id: category.name for category in categories}
+        self._phrases = {category.name: category.name for category in categories}
+        for category in categories:
+            for alias in category.aliases:
+                self._phrases[alias.alias] = category.name
+        self._memo.clear()
+
+    def name(self, category_id: Optional[int]) -> Optional[str]:
+        return None if category_id is None else self._names.get(category_id)
+
+    def canonical(self, label: Optional[str]) -> Optional[str]:
+        if label is None:
+            return None
+        cached = self._memo.get(label)
+        if cached is None:
+            cached = self._resolve(normalise_label(label))
+            if len(self._memo) >= _MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[label] = cached
+        return cached
+
+    def category_id(self, label: Optional[str]) -> Optional[int]:
+        name = self.canonical(label)
+        return None if name is None else self._ids.get(name, self._ids.get(OTHER))
+
+    def _resolve(self, label: str) -> str:
+        phrases = self._phrases or _BUILTIN_PHRASES
+        if not label:
+            return OTHER
+        if label in phrases:
+            return phrases[label]
+
+        words = label.split()
+        specific = [word for word in words if word not in _GENERIC_WORDS] or words
+        for size in range(len(specific), 0, -1):
+            for start in range(len(specific) - size + 1):
+                phrase = " ".join(specific[start:start + size])
+                if phrase in phrases:
+                    return phrases[phrase]
+
+        match = difflib.get_close_matches(label, list(phrases), n=1, cutoff=_FUZZY_CUTOFF)
+        return phrases[match[0]] if match else OTHER
+
+
+categories = CategoryNormalizer()
+
+
+async def ensure_taxonomy(session: AsyncSession) -> None:
+    """Insert any built-in categories and aliases missing from the tables (staged)."""
+
+    existing = {
+        category.name: category for category in await session.scalars(select(Category))
+    }
+    known_aliases = set(await session.scalars(select(CategoryAlias.alias)))
+    for name, aliases in TAXONOMY.items():
+        category = existing.get(name)
+        if category is None:
+            category = existing[name] = Category(name=name)
+            session.add(category)
+        for alias in aliases:
+            if alias not in known_aliases and alias not in existing:
+                known_aliases.add(alias)
+                session.add(CategoryAlias(alias=alias, category=category))
+    await session.flush()
+
+
+async def load_categories(session: AsyncSession) -> None:
+    categories.load(list(await session.scalars(select(Category).order_by(Category.id))))
+
+
+async def add_alias(session: AsyncSession, alias: str, category_name: str) -> Category:
+    """Map ``alias`` onto an existing canonical category; raises ``LookupError``/``ValueError``."""
+
+    alias = normalise_label(alias)
+    category = await session.scalar(
+        select(Category).where(Category.name == normalise_label(category_name))
+    )
+    if category is None:
+        raise LookupError(f"Unknown category {category_name!r}")
+    taken = await session.scalar(select(CategoryAlias.id).where(CategoryAlias.alias == alias))
+    if taken is not None or await session.scalar(select(Category.id).where(Category.name == alias)):
+        raise ValueError(f"Alias {alias!r} is already in use")
+    session.add(CategoryAlias(alias=alias, category_id=category.id))
+    await session.flush()
+    await session.refresh(category, ["aliases"])
+    return category
@@ -2,19 +2,45 @@ from __future__ import annotations
 
 import json
 import logging
+from functools import lru_cache
 from typing import Optional
 
-from openai import AsyncOpenAI
-from openai._exceptions import OpenAIError
-
 from app.core.config import get_settings
 from app.schemas.classification import ClassificationResponse
+from app.services.categories import categories
+from app.services.local_model import get_local_model
 
 logger = logging.getLogger(__name__)
 
 
 async def classify_message(text: str) -> ClassificationResponse:
-    """Classify text using OpenAI; raise if the model cannot be reached."""
+    """Classify text, screening with the local model before falling through to OpenAI.
+
+    A local verdict whose spam probability is within ``local_model_decisive_margin``
+    of 0 or 1 is returned directly. Otherwise the LLM decides, and the local
+    verdict is the fallback when OpenAI is unavailable. Raises only when neither
+    model can answer.
+    """
+
+    local_model = get_local_model()
+    local_verdict = local_model.classify_batch([text])[0] if local_model else None
+    if local_verdict is not None and _is_decisive(local_verdict):
+        return local_verdict
+
+    result = await _classify_with_openai(text)
+    if result is None:
+        if local_verdict is not None:
+            return local_verdict
+        raise RuntimeError("OpenAI classification unavailable")
+    return result
+
+
+async def classify_with_llm(text: str) -> ClassificationResponse:
+    """Classify text with OpenAI only; raises ``RuntimeError`` when it cannot answer.
+
+    For callers that need the LLM's verdict specifically, such as the
+    reclassification worker, and must see its failures.
+    """
 
     result = await _classify_with_openai(text)
     if result is None:
@@ -22,13 +48,37 @@ async def classify_message(text: str) -> ClassificationResponse:
     return result
 
 
+def _is_decisive(verdict: ClassificationResponse) -> bool:
+    margin = get_settings().local_model_decisive_margin
+    return abs(verdict.confidence - 0.5) >= margin
+
+
+@lru_cache(maxsize=4)
+def _openai_client(api_key: str, base_url: Optional[str], timeout: float, max_retries: int):
+    """One client (and connection pool) per configuration instead of one per request."""
+
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries
+    )
+
+
 async def _classify_with_openai(text: str) -> Optional[ClassificationResponse]:
     settings = get_settings()
     if not settings.openai_api_key:
         logger.warning("OpenAI API key not configured; cannot classify message")
         return None
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    # The SDK takes most of a second to import; load it on first use, not at startup.
+    from openai import OpenAIError
+
+    client = _openai_client(
+        settings.openai_api_key,
+        settings.openai_base_url,
+        settings.openai_timeout_seconds,
+        settings.openai_max_retries,
+    )
 
     system_prompt = (
         "You are a telecom compliance assistant. Process the provided message and respond with "
@@ -73,7 +123,7 @@ async def _classify_with_openai(text: str) -> Optional[ClassificationResponse]:
     confidence = max(0.0, min(confidence, 1.0))
 
     is_spam = bool(payload.get("is_spam", False))
-    category = str(payload.get("category", "unknown"))
+    category = categories.canonical(str(payload.get("category", "unknown")))
     rationale = str(payload.get("rationale", "")) or "LLM did not provide a rationale."
 
     return ClassificationResponse(
@@ -0,0 +1,180 @@
+"""Three-level SMS drill-down: categories, then templates, then messages.
+
+``GET /api/sms`` returns every message of the window at once. The drill-down
+endpoints load one level at a time:
+
+1. ``aggregates.message_category_summaries``: one aggregate row per category;
+2. ``template_page``: the distinct bodies ("templates") of one category, with
+   counts and their top senders, a page at a time;
+3. ``template_messages``: the individual messages of one template, newest first,
+   paginated by a ``(received_at, id)`` keyset cursor so deep pages cost the
+   same as the first.
+
+Each level is one grouped query plus a lookup of the few bodies it shows, served
+by the ``(category_id, body_id)`` and ``(body_id, received_at)`` indexes on
+``messages``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Integer, cast, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.queries import message_rows_query
+from app.models.category import Category
+from app.models.message import Message
+from app.models.sender import Sender
+from app.schemas.message import (
+    MessagePage,
+    MessageRead,
+    MessageTemplate,
+    MessageTemplatePage,
+    TemplateSender,
+)
+from app.services.aggregates import UNCATEGORISED, body_contents
+from app.services.bodies import catch_up_dictionaries
+
+TOP_SENDERS = 5
+
+
+def category_filter(category: str):
+    if category == UNCATEGORISED:
+        return Message.category_id.is_(None)
+    return Message.category_id == (
+        select(Category.id).where(Category.name == category).scalar_subquery()
+    )
+
+
+async def template_page(
+    session: AsyncSession,
+    category: str,
+    filters: list,
+    limit: int,
+    offset: int,
+) -> MessageTemplatePage:
+    conditions = [category_filter(category), *filters]
+    total = await session.scalar(
+        select(func.count(func.distinct(Message.body_id))).where(*conditions)
+    )
+    rows = (
+        await session.execute(
+            select(
+                Message.body_id,
+                func.count(Message.id).label("total"),
+                func.count(func.distinct(Message.sender_id)).label("senders"),
+                func.coalesce(func.sum(cast(Message.blocked, Integer)), 0).label("blocked"),
+                func.min(Message.received_at).label("first_seen"),
+                func.max(Message.received_at).label("last_seen"),
+            )
+            .where(*conditions)
+            .group_by(Message.body_id)
+            .order_by(func.count(Message.id).desc(), Message.body_id)
+            .limit(limit)
+            .offset(offset)
+        )
+    ).all()
+
+    body_ids = [row.body_id for row in rows]
+    bodies = await body_contents(session, body_ids)
+    top_senders = await _top_senders(session, body_ids, conditions)
+    return MessageTemplatePage(
+        category=category,
+        total_templates=total or 0,
+        items=[
+            MessageTemplate(
+                body_id=row.body_id,
+                body=bodies.get(row.body_id, ""),
+                total_messages=row.total,
+                unique_senders=row.senders,
+                blocked=row.blocked,
+                first_seen=row.first_seen,
+                last_seen=row.last_seen,
+                top_senders=top_senders.get(row.body_id, []),
+            )
+            for row in rows
+        ],
+    )
+
+
+async def template_messages(
+    session: AsyncSession,
+    body_id: int,
+    category: Optional[str],
+    filters: list,
+    limit: int,
+    cursor: Optional[tuple[datetime, int]],
+) -> MessagePage:
+    query = message_rows_query().where(Message.body_id == body_id, *filters)
+    if category is not None:
+        query = query.where(category_filter(category))
+    if cursor is not None:
+        query = query.where(tuple_(Message.received_at, Message.id) < tuple_(*cursor))
+    await catch_up_dictionaries(session)
+    rows = (
+        await session.execute(
+            query.order_by(Message.received_at.desc(), Message.id.desc()).limit(limit + 1)
+        )
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].received_at, rows[-1].id)
+    return MessagePage(
+        body_id=body_id,
+        items=[MessageRead(**row._asdict()) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def encode_cursor(received_at: datetime, message_id: int) -> str:
+    return f"{received_at.isoformat()}~{message_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Parse a cursor from ``encode_cursor``; raises ``ValueError`` if malformed."""
+
+    timestamp, _, message_id = cursor.rpartition("~")
+    return datetime.fromisoformat(timestamp), int(message_id)
+
+
+async def _top_senders(
+    session: AsyncSession,
+    body_ids: list[int],
+    conditions: list,
+) -> dict[int, list[TemplateSender]]:
+    if not body_ids:
+        return {}
+    messages = func.count(Message.id)
+    ranked = (
+        select(
+            Message.body_id,
+            Message.sender_id,
+            messages.label("messages"),
+            func.row_number()
+            .over(partition_by=Message.body_id, order_by=(messages.desc(), Message.sender_id))
+            .label("rank"),
+        )
+        .where(Message.body_id.in_(body_ids), Message.sender_id.is_not(None), *conditions)
+        .group_by(Message.body_id, Message.sender_id)
+        .subquery()
+    )
+    rows = await session.execute(
+        select(ranked.c.body_id, ranked.c.sender_id, Sender.phone_number, ranked.c.messages)
+        .join(Sender, Sender.id == ranked.c.sender_id)
+        .where(ranked.c.rank <= TOP_SENDERS)
+        .order_by(ranked.c.body_id, ranked.c.rank)
+    )
+    senders: dict[int, list[TemplateSender]] = {}
+    for row in rows:
+        senders.setdefault(row.body_id, []).append(
+            TemplateSender(
+                sender_id=row.sender_id,
+                sender_number=row.phone_number,
+                messages=row.messages,
+            )
+        )
+    return senders
@@ -0,0 +1,79 @@
+"""Extraction of URLs, domains and callback numbers embedded in message bodies."""
+
+from __future__ import annotations
+
+import re
+from urllib.parse import urlsplit
+
+from app.models.entity import MessageEntity
+from app.models.message import Message
+
+ENTITY_KINDS = ("url", "domain", "phone")
+
+_URL_PATTERN = re.compile(r"(?:https?://|www\.)[^\s<>\"']+", re.IGNORECASE)
+_DOMAIN_PATTERN = re.compile(
+    r"(?<![\w@.-])((?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24})(?![\w-])",
+    re.IGNORECASE,
+)
+_PHONE_PATTERN = re.compile(r"(?<![\w+])\+?\d[\d\s().-]{5,}\d(?!\w)")
+# Dates such as 2024-01-01 or 01/02/2024 also match the phone pattern.
+_DATE_PATTERN = re.compile(r"\d{4}([-/.])\d{1,2}\1\d{1,2}|\d{1,2}([-/.])\d{1,2}\2\d{2,4}")
+# Without a leading +, shorter digit runs are mostly codes (OTPs, references).
+_MIN_LOCAL_PHONE_DIGITS = 10
+_TRAILING_PUNCTUATION = ".,;:!?)]}"
+_MAX_VALUE_LENGTH = 255
+
+
+def extract_entities(text: str) -> list[tuple[str, str]]:
+    """Return unique ``(kind, value)`` pairs found in ``text``, in order of appearance.
+
+    >>> extract_entities("Call +1 (555) 010-9999 or 555-010-9999 now")
+    [('phone', '+15550109999'), ('phone', '5550109999')]
+    >>> extract_entities("Your code is 12345678, valid until 2024-01-01 or 01/02/2024")
+    []
+    """
+
+    found: dict[tuple[str, str], None] = {}
+
+    remainder = text
+    for match in _URL_PATTERN.finditer(text):
+        url = match.group(0).rstrip(_TRAILING_PUNCTUATION)
+        parsed = urlsplit(url if "://" in url else f"http://{url}")
+        domain = _normalise_domain(parsed.hostname or "")
+        if domain:
+            found[("url", url[:_MAX_VALUE_LENGTH])] = None
+            found[("domain", domain)] = None
+        remainder = remainder.replace(match.group(0), " ")
+
+    for match in _DOMAIN_PATTERN.finditer(remainder):
+        found[("domain", _normalise_domain(match.group(1)))] = None
+
+    for match in _PHONE_PATTERN.finditer(text):
+        candidate = match.group(0)
+        if _DATE_PATTERN.fullmatch(candidate):
+            continue
+        digits = re.sub(r"\D", "", candidate)
+        international = candidate.startswith("+")
+        if (7 if international else _MIN_LOCAL_PHONE_DIGITS) <= len(digits) <= 15:
+            found[("phone", ("+" if international else "") + digits)] = None
+
+    return list(found)
+
+
+def build_entities(message: Message) -> list[MessageEntity]:
+    return [
+        MessageEntity(
+            message_id=message.id,
+            kind=kind,
+            value=value,
+            received_at=message.received_at,
+        )
+        for kind, value in extract_entities(message.body)
+    ]
+
+
+def _normalise_domain(host: str) -> str:
+    host = host.lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host[:_MAX_VALUE_LENGTH]
@@ -0,0 +1,340 @@
+"""Per-caller fan-out: how many distinct numbers each caller dialled.
+
+Ingest maintains one ``caller_fanout_daily`` row per caller and UTC day, and
+one ``caller_fanout_monthly`` row per caller and UTC month, each with a sketch
+of the callees (``app.services.hll``; exact while a row has few callees).
+Windows of up to ``fanout_exact_days`` are answered exactly from ``calls`` (a
+bounded, timestamp-indexed range). Longer windows merge the monthly sketches
+of the months they cover completely and the daily sketches of the days at
+their edges, so a window costs at most about two months of daily rows per
+caller plus one row per month. Sketched windows are aligned to whole UTC days.
+
+A callee cannot be taken back out of a sketch, so when retention deletes calls
+(``retract_calls``) the rows those calls fell into are rebuilt from the calls
+that remain.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, or_, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.models.call import Call
+from app.models.fanout import CallerFanoutDay, CallerFanoutMonth
+from app.models.sender import Sender
+from app.schemas.call import CallerFanout, CallerFanoutPage
+from app.services import hll
+from app.services.aggregates import time_filters
+
+
+async def record_call(session: AsyncSession, call: Call) -> None:
+    """Fold one call into its caller's daily fan-out row (staged, not committed)."""
+
+    if call.caller_id is None:
+        return
+
+    started_at = as_utc(call.started_at)
+    for model, period in _periods(started_at):
+        row = await _period_row(session, model, call.caller_id, period, started_at)
+        sketch = hll.HyperLogLog(row.callee_sketch)
+        sketch.add(call.callee_number)
+        row.callee_sketch = sketch.to_bytes()
+        row.calls += 1
+        if started_at < as_utc(row.first_seen):
+            row.first_seen = started_at
+        if started_at > as_utc(row.last_seen):
+            row.last_seen = started_at
+
+
+async def rebuild_fanout(session: AsyncSession) -> None:
+    """Recompute every daily and monthly fan-out row from the raw ``calls`` table."""
+
+    await session.execute(delete(CallerFanoutDay))
+    await session.execute(delete(CallerFanoutMonth))
+    result = await session.stream(
+        select(Call.caller_id, Call.callee_number, Call.started_at).where(
+            Call.caller_id.is_not(None)
+        )
+    )
+
+    rows = _FanoutRows()
+    async for caller_id, callee_number, started_at in result:
+        started_at = as_utc(started_at)
+        for model, period in _periods(started_at):
+            rows.add(model, period, caller_id, callee_number, started_at)
+    session.add_all(rows.finish())
+
+
+async def retract_calls(
+    session: AsyncSession,
+    calls: Iterable[tuple[Optional[int], datetime]],
+) -> None:
+    """Rebuild the rows deleted ``(caller_id, started_at)`` calls fell into (staged).
+
+    Call after the calls are deleted: each affected row is recomputed from the
+    caller's remaining calls in its day or month, or dropped if none remain.
+    """
+
+    callers: dict[tuple[type, date], set[int]] = defaultdict(set)
+    for caller_id, started_at in calls:
+        if caller_id is not None:
+            for model, period in _periods(as_utc(started_at)):
+                callers[(model, period)].add(caller_id)
+
+    rows = _FanoutRows()
+    for (model, period), caller_ids in callers.items():
+        column = getattr(model, _PERIOD_COLUMN[model])
+        await session.execute(
+            delete(model).where(model.caller_id.in_(caller_ids), column == period)
+        )
+        start, end = _period_bounds(model, period)
+        result = await session.execute(
+            select(Call.caller_id, Call.callee_number, Call.started_at).where(
+                Call.caller_id.in_(caller_ids), Call.started_at >= start, Call.started_at < end
+            )
+        )
+        for caller_id, callee_number, started_at in result:
+            rows.add(model, period, caller_id, callee_number, as_utc(started_at))
+    session.add_all(rows.finish())
+
+
+class _FanoutRows:
+    """Daily or monthly rows accumulated from calls, with their callee sketches."""
+
+    def __init__(self) -> None:
+        self._rows: dict[tuple, CallerFanoutDay | CallerFanoutMonth] = {}
+        self._sketches: dict[tuple, hll.HyperLogLog] = defaultdict(hll.HyperLogLog)
+
+    def add(
+        self,
+        model: type,
+        period: date,
+        caller_id: int,
+        callee_number: str,
+        started_at: datetime,
+    ) -> None:
+        key = (model, caller_id, period)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = model(
+                caller_id=caller_id,
+                calls=0,
+                first_seen=started_at,
+                last_seen=started_at,
+                **{_PERIOD_COLUMN[model]: period},
+            )
+        row.calls += 1
+        row.first_seen = min(row.first_seen, started_at)
+        row.last_seen = max(row.last_seen, started_at)
+        self._sketches[key].add(callee_number)
+
+    def finish(self) -> list:
+        for key, row in self._rows.items():
+            row.callee_sketch = self._sketches[key].to_bytes()
+        return list(self._rows.values())
+
+
+async def caller_leaderboard(
+    session: AsyncSession,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: int,
+    offset: int,
+) -> CallerFanoutPage:
+    window_end = as_utc(end_date) if end_date else datetime.now(timezone.utc)
+    exact = start_date is not None and window_end - as_utc(start_date) <= timedelta(
+        days=get_settings().fanout_exact_days
+    )
+    if exact:
+        total, ranked = await _exact_ranking(session, start_date, end_date, limit, offset)
+    else:
+        total, ranked = await _sketched_ranking(session, start_date, end_date, limit, offset)
+
+    senders = {
+        row.id: row
+        for row in await session.execute(
+            select(Sender.id, Sender.phone_number, Sender.is_blocked).where(
+                Sender.id.in_([entry[0] for entry in ranked])
+            )
+        )
+    }
+    return CallerFanoutPage(
+        estimated=not exact,
+        total_callers=total,
+        items=[
+            CallerFanout(
+                caller_id=caller_id,
+                caller_number=senders[caller_id].phone_number,
+                distinct_callees=distinct,
+                total_calls=calls,
+                first_seen=first_seen,
+                last_seen=last_seen,
+                is_blocked=senders[caller_id].is_blocked,
+            )
+            for caller_id, distinct, calls, first_seen, last_seen in ranked
+            if caller_id in senders
+        ],
+    )
+
+
+async def _exact_ranking(session, start_date, end_date, limit, offset):
+    filters = [Call.caller_id.is_not(None), *time_filters(Call.started_at, start_date, end_date)]
+
+    total = await session.scalar(
+        select(func.count(func.distinct(Call.caller_id))).where(*filters)
+    ) or 0
+    distinct = func.count(func.distinct(Call.callee_number))
+    result = await session.execute(
+        select(
+            Call.caller_id,
+            distinct.label("distinct_callees"),
+            func.count(Call.id).label("calls"),
+            func.min(Call.started_at).label("first_seen"),
+            func.max(Call.started_at).label("last_seen"),
+        )
+        .where(*filters)
+        .group_by(Call.caller_id)
+        .order_by(distinct.desc(), Call.caller_id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return total, [tuple(row) for row in result]
+
+
+async def _sketched_ranking(session, start_date, end_date, limit, offset):
+    start_day = as_utc(start_date).date() if start_date else None
+    end_day = as_utc(end_date).date() if end_date else None
+
+    grouped: dict[int, list] = {}
+    for row in await session.execute(_window_rows(start_day, end_day)):
+        entry = grouped.get(row.caller_id)
+        if entry is None:
+            entry = grouped[row.caller_id] = [
+                0, row.first_seen, row.last_seen, hll.HyperLogLog()
+            ]
+        entry[0] += row.calls
+        entry[1] = min(entry[1], row.first_seen)
+        entry[2] = max(entry[2], row.last_seen)
+        entry[3].update(row.callee_sketch)
+
+    if not grouped:
+        return 0, []
+
+    caller_ids = list(grouped)
+    sketches = [grouped[caller_id][3] for caller_id in caller_ids]
+    estimates = np.array([len(sketch.hashes) for sketch in sketches], dtype=np.int64)
+    dense = [index for index, sketch in enumerate(sketches) if not sketch.is_sparse]
+    if dense:
+        # One vectorised estimate over every caller that outgrew the exact set.
+        estimates[dense] = hll.estimate(
+            np.stack([np.frombuffer(sketches[index].registers, dtype=np.uint8) for index in dense])
+        )
+    order = sorted(range(len(caller_ids)), key=lambda index: (-estimates[index], caller_ids[index]))
+    ranked = []
+    for index in order[offset:offset + limit]:
+        calls, first_seen, last_seen, _ = grouped[caller_ids[index]]
+        ranked.append((caller_ids[index], int(estimates[index]), calls, first_seen, last_seen))
+    return len(caller_ids), ranked
+
+
+def _window_rows(start_day: Optional[date], end_day: Optional[date]):
+    """Monthly rows for the months inside the window, daily rows for the days around them."""
+
+    # Months from ``first_month`` up to (excluding) ``end_month`` lie wholly inside.
+    first_month = start_day if start_day is None or start_day.day == 1 else _next_month(start_day)
+    end_month = _month_start(end_day + timedelta(days=1)) if end_day else None
+
+    day_filters = []
+    if start_day:
+        day_filters.append(CallerFanoutDay.day >= start_day)
+    if end_day:
+        day_filters.append(CallerFanoutDay.day <= end_day)
+    days = _sketch_rows(CallerFanoutDay)
+    if first_month is not None and end_month is not None and first_month >= end_month:
+        return days.where(*day_filters)
+
+    month_filters = []
+    edges = []
+    if first_month is not None:
+        month_filters.append(CallerFanoutMonth.month >= first_month)
+        edges.append(CallerFanoutDay.day < first_month)
+    if end_month is not None:
+        month_filters.append(CallerFanoutMonth.month < end_month)
+        edges.append(CallerFanoutDay.day >= end_month)
+    months = _sketch_rows(CallerFanoutMonth).where(*month_filters)
+    if not edges:
+        return months
+    return union_all(months, days.where(*day_filters, or_(*edges)))
+
+
+def _sketch_rows(model: type):
+    return select(
+        model.caller_id, model.calls, model.first_seen, model.last_seen, model.callee_sketch
+    )
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+_PERIOD_COLUMN = {CallerFanoutDay: "day", CallerFanoutMonth: "month"}
+
+
+def _periods(started_at: datetime) -> tuple[tuple[type, date], ...]:
+    day = started_at.date()
+    return (CallerFanoutDay, day), (CallerFanoutMonth, _month_start(day))
+
+
+def _period_bounds(model: type, period: date) -> tuple[datetime, datetime]:
+    """Half-open UTC range ``[start, end)`` of a daily or monthly row."""
+
+    end = period + timedelta(days=1) if model is CallerFanoutDay else _next_month(period)
+    return (
+        datetime.combine(period, datetime.min.time(), timezone.utc),
+        datetime.combine(end, datetime.min.time(), timezone.utc),
+    )
+
+
+async def _period_row(
+    session: AsyncSession,
+    model: type,
+    caller_id: int,
+    period: date,
+    started_at: datetime,
+):
+    column = getattr(model, _PERIOD_COLUMN[model])
+    query = (
+        select(model)
+        .where(model.caller_id == caller_id, column == period)
+        .with_for_update()
+    )
+    row = await session.scalar(query)
+    if row is not None:
+        return row
+    try:
+        async with session.begin_nested():
+            row = model(
+                caller_id=caller_id,
+                calls=0,
+                first_seen=started_at,
+                last_seen=started_at,
+                callee_sketch=b"",
+                **{_PERIOD_COLUMN[model]: period},
+            )
+            session.add(row)
+    except IntegrityError:
+        # Another writer created this period's row between our lookup and insert.
+        row = await session.scalar(query)
+    return row
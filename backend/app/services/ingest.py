@@ -0,0 +1,306 @@
+"""Write path for inbound SMS and call events from the switch feeds.
+
+``ingest_message``/``ingest_call`` stage rows on the caller's session without
+committing, so callers decide the transaction boundary. They return the staged
+event as plain values (``IngestedMessage``/``IngestedCall``), read before the
+commit. The write queue applies many events on one session, and a later
+event's savepoint rollback can expire or detach the ORM rows of earlier ones.
+Once the transaction has committed, ``publish_message``/``publish_call`` update
+the in-process indexes that mirror the tables from those values.
+
+Feeds redeliver, so every event carries an idempotency key: the sha256 of the
+caller's ``event_id`` or, failing that, of its sender, receiver, body and
+timestamp. ``messages.event_key``/``calls.event_key`` are unique, and the keys
+of recently committed events are also held in a bounded in-memory map, so the
+common redelivery is rejected before any SQL runs.
+
+Events from a number covered by a prefix block rule (``app.services.blocking``)
+are stored as blocked, and their sender is blocked.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.models.call import Call
+from app.models.message import Message
+from app.models.sender import Sender
+from app.schemas.ingest import CallIngest, SmsIngest
+from app.services.bodies import body_cache, intern_body
+from app.services.blocking import apply_block_rules
+from app.services.categories import categories
+from app.services.entities import build_entities
+from app.services.fanout import record_call
+from app.services.leaderboard import record_spam_event
+from app.services.live_events import live_calls, live_messages
+from app.services.similarity import message_index
+from app.services.snapshots import dashboard_snapshots
+from app.services.timeseries import record_event
+
+
+class DuplicateEventError(ValueError):
+    """The event was already ingested; ``existing_id`` is the stored row's id."""
+
+    def __init__(self, existing_id: Optional[int]) -> None:
+        super().__init__("Event already ingested")
+        self.existing_id = existing_id
+
+
+@dataclass(frozen=True)
+class IngestedMessage:
+    id: int
+    event_key: Optional[str]
+    sender_id: Optional[int]
+    sender_number: Optional[str]
+    sender_is_blocked: bool
+    receiver_number: str
+    body_id: int
+    body_hash: str
+    body: str
+    category_id: Optional[int]
+    received_at: datetime
+    is_spam: bool
+    confidence: Optional[float]
+    blocked: bool
+
+
+@dataclass(frozen=True)
+class IngestedCall:
+    id: int
+    event_key: Optional[str]
+    caller_id: Optional[int]
+    caller_number: Optional[str]
+    caller_is_blocked: bool
+    callee_number: str
+    started_at: datetime
+    duration_seconds: int
+    category_id: Optional[int]
+    is_spam: bool
+    confidence: Optional[float]
+    blocked: bool
+
+
+class RecentEventKeys:
+    """Bounded LRU map of recently committed event keys to their row ids."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._entries: OrderedDict[str, int] = OrderedDict()
+
+    def get(self, key: str) -> Optional[int]:
+        row_id = self._entries.get(key)
+        if row_id is not None:
+            self._entries.move_to_end(key)
+        return row_id
+
+    def remember(self, key: Optional[str], row_id: int) -> None:
+        if key is None or self.capacity <= 0:
+            return
+        self._entries[key] = row_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+recent_messages = RecentEventKeys(get_settings().ingest_dedupe_cache_size)
+recent_calls = RecentEventKeys(get_settings().ingest_dedupe_cache_size)
+
+
+def event_key(
+    event_id: Optional[str],
+    source: Optional[str],
+    destination: str,
+    occurred_at: Optional[datetime],
+    body: str = "",
+) -> Optional[str]:
+    """Idempotency key for an event, or ``None`` when nothing identifies a redelivery.
+
+    Without an ``event_id`` the event is identified by its contents, which needs
+    a caller-supplied timestamp: server-stamped events are never equal.
+    """
+
+    if event_id:
+        parts = ["id", event_id]
+    elif occurred_at is not None:
+        parts = ["fields", source or "", destination, as_utc(occurred_at).isoformat(), body]
+    else:
+        return None
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+async def ingest_message(session: AsyncSession, payload: SmsIngest) -> IngestedMessage:
+    """Stage an SMS event; raises ``DuplicateEventError`` for a redelivery."""
+
+    key = event_key(
+        payload.event_id,
+        payload.sender_number,
+        payload.receiver_number,
+        payload.received_at,
+        payload.body,
+    )
+    _reject_recent(recent_messages, key)
+    # Stored in UTC: SQLite keeps the wall time and drops the offset.
+    received_at = as_utc(payload.received_at) if payload.received_at else datetime.now(timezone.utc)
+    sender = await _touch_sender(session, payload.sender_number, received_at, payload.is_spam)
+    rule_blocked = await apply_block_rules(session, sender, received_at)
+    body = await intern_body(session, payload.body)
+
+    message = await _insert_once(
+        session,
+        Message,
+        recent_messages,
+        sender=sender,
+        receiver_number=payload.receiver_number,
+        body_record=body,
+        category_id=categories.category_id(payload.category),
+        received_at=received_at,
+        is_spam=payload.is_spam,
+        confidence=payload.confidence,
+        blocked=payload.blocked or rule_blocked,
+        event_key=key,
+    )
+    session.add_all(build_entities(message))
+    await record_event(session, "sms", received_at, message.blocked)
+    if message.is_spam:
+        await record_spam_event(session, "sms", message.sender_id, received_at)
+    return IngestedMessage(
+        id=message.id,
+        event_key=key,
+        sender_id=message.sender_id,
+        sender_number=sender.phone_number if sender is not None else None,
+        sender_is_blocked=sender is not None and sender.is_blocked,
+        receiver_number=payload.receiver_number,
+        body_id=body.id,
+        body_hash=body.content_hash,
+        body=payload.body,
+        category_id=message.category_id,
+        received_at=received_at,
+        is_spam=message.is_spam,
+        confidence=message.confidence,
+        blocked=message.blocked,
+    )
+
+
+async def ingest_call(session: AsyncSession, payload: CallIngest) -> IngestedCall:
+    """Stage a call event; raises ``DuplicateEventError`` for a redelivery."""
+
+    key = event_key(
+        payload.event_id, payload.caller_number, payload.callee_number, payload.started_at
+    )
+    _reject_recent(recent_calls, key)
+    started_at = as_utc(payload.started_at) if payload.started_at else datetime.now(timezone.utc)
+    caller = await _touch_sender(session, payload.caller_number, started_at, payload.is_spam)
+    rule_blocked = await apply_block_rules(session, caller, started_at)
+
+    call = await _insert_once(
+        session,
+        Call,
+        recent_calls,
+        caller=caller,
+        callee_number=payload.callee_number,
+        started_at=started_at,
+        duration_seconds=payload.duration_seconds,
+        category_id=categories.category_id(payload.category),
+        is_spam=payload.is_spam,
+        confidence=payload.confidence,
+        blocked=payload.blocked or rule_blocked,
+        event_key=key,
+    )
+    await record_call(session, call)
+    await record_event(session, "calls", started_at, call.blocked)
+    if call.is_spam:
+        await record_spam_event(session, "calls", call.caller_id, started_at)
+    return IngestedCall(
+        id=call.id,
+        event_key=key,
+        caller_id=call.caller_id,
+        caller_number=caller.phone_number if caller is not None else None,
+        caller_is_blocked=caller is not None and caller.is_blocked,
+        callee_number=payload.callee_number,
+        started_at=started_at,
+        duration_seconds=payload.duration_seconds,
+        category_id=call.category_id,
+        is_spam=call.is_spam,
+        confidence=call.confidence,
+        blocked=call.blocked,
+    )
+
+
+def publish_message(message: IngestedMessage) -> None:
+    recent_messages.remember(message.event_key, message.id)
+    body_cache.remember(message.body_hash, message.body_id, len(message.body))
+    message_index.add([message.id], [message.body])
+    live_messages.add(message)
+    dashboard_snapshots.invalidate()
+
+
+def publish_call(call: IngestedCall) -> None:
+    recent_calls.remember(call.event_key, call.id)
+    live_calls.add(call)
+    dashboard_snapshots.invalidate()
+
+
+def _reject_recent(recent: RecentEventKeys, key: Optional[str]) -> None:
+    if key is not None:
+        existing_id = recent.get(key)
+        if existing_id is not None:
+            raise DuplicateEventError(existing_id)
+
+
+async def _insert_once(session: AsyncSession, model: type, recent: RecentEventKeys, **values):
+    key = values["event_key"]
+    try:
+        # The row is built inside the savepoint: linking it to its sender earlier
+        # would make the savepoint's autoflush see a related object not yet added.
+        async with session.begin_nested():
+            row = model(**values)
+            session.add(row)
+    except IntegrityError:
+        if key is None:
+            raise
+        # Lost the race to another delivery of the same event (or it predates the cache).
+        existing_id = await session.scalar(select(model.id).where(model.event_key == key))
+        if existing_id is None:
+            raise
+        recent.remember(key, existing_id)
+        raise DuplicateEventError(existing_id) from None
+    return row
+
+
+async def _touch_sender(
+    session: AsyncSession,
+    phone_number: Optional[str],
+    seen_at: datetime,
+    is_spam: bool,
+) -> Optional[Sender]:
+    if not phone_number:
+        return None
+
+    sender = await session.scalar(select(Sender).where(Sender.phone_number == phone_number))
+    if sender is None:
+        try:
+            async with session.begin_nested():
+                sender = Sender(phone_number=phone_number, spam_count=0, last_seen=seen_at)
+                session.add(sender)
+        except IntegrityError:
+            # Another writer created the sender between our lookup and insert.
+            sender = await session.scalar(select(Sender).where(Sender.phone_number == phone_number))
+
+    if is_spam:
+        sender.spam_count += 1
+    if sender.last_seen is None or as_utc(seen_at) > as_utc(sender.last_seen):
+        sender.last_seen = seen_at
+    return sender
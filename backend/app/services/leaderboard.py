@@ -0,0 +1,311 @@
+"""Top spam senders per channel, maintained incrementally.
+
+Durable per-day counters live in ``sender_daily_counts`` and are bumped in the
+ingest transaction. Each channel also keeps the trailing
+``leaderboard_window_days`` of those counters in memory, together with running
+window totals and a cached top slice. A default-window lookup is then a
+list slice; an increment that touches the cached slice updates it in place and
+re-sorts its ``CACHED_TOP`` entries. Arbitrary windows aggregate the daily
+counters, which hold one row per sender-day rather than one per event. All
+windows are aligned to whole UTC days.
+
+The windows follow the stored counters, whichever worker wrote them. Every
+counter write stamps ``updated_at``. Before serving the default window, a worker
+reads back the counters changed since its last catch-up and sets its copies to
+the stored values. The read starts ``LEADERBOARD_RESYNC_SECONDS`` early to cover
+writes stamped before they commit and clock skew between workers. Because
+setting is idempotent, a counter read twice is still counted once. Rebuilds
+update the counters in place rather than replacing them, and rows that lose
+their events drop to zero, so other workers pick those changes up too.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.models.call import Call
+from app.models.message import Message
+from app.models.sender_count import SenderDailyCount
+
+CHANNELS = ("sms", "calls")
+CACHED_TOP = 100
+
+
+class WindowLeaderboard:
+    """Trailing-window spam counts for one channel with a cached top slice."""
+
+    def __init__(self, window_days: int, resync_seconds: float = 0.0) -> None:
+        self.window_days = window_days
+        self.resync_window = timedelta(seconds=resync_seconds)
+        self.synced_at: Optional[datetime] = None
+        self._days: dict[date, Counter] = defaultdict(Counter)
+        self._totals: Counter = Counter()
+        self._top: Optional[list[tuple[int, int]]] = None
+
+    def window(self, today: Optional[date] = None) -> tuple[date, date]:
+        today = today or datetime.now(timezone.utc).date()
+        return today - timedelta(days=self.window_days - 1), today
+
+    def increment(self, sender_id: int, day: date, amount: int = 1) -> None:
+        start, _ = self._expire()
+        if day < start:
+            return
+        self._days[day][sender_id] += amount
+        self._totals[sender_id] += amount
+        top = self._top
+        if top is None:
+            return
+        # Totals only grow here, so the slice can be patched and re-sorted in place;
+        # a slice shorter than CACHED_TOP holds every sender.
+        entry = (sender_id, self._totals[sender_id])
+        for index, (entry_id, _) in enumerate(top):
+            if entry_id == sender_id:
+                top[index] = entry
+                break
+        else:
+            if len(top) >= CACHED_TOP and _rank_key(entry) <= _rank_key(top[-1]):
+                return
+            top.append(entry)
+        top.sort(key=_rank_key, reverse=True)
+        del top[CACHED_TOP:]
+
+    def set_count(self, sender_id: int, day: date, events: int) -> None:
+        """Make ``sender_id``'s count for ``day`` equal the stored counter."""
+
+        start, _ = self._expire()
+        if day < start:
+            return
+        delta = events - self._days[day][sender_id]
+        if delta > 0:
+            self.increment(sender_id, day, delta)
+        elif delta < 0:
+            # A rebuild or retention lowered it; the cached slice may no longer hold.
+            self._days[day][sender_id] = events
+            self._totals[sender_id] += delta
+            self._totals += Counter()
+            self._top = None
+
+    def top(self, n: int) -> list[tuple[int, int]]:
+        self._expire()
+        if self._top is None:
+            self._top = heapq.nlargest(CACHED_TOP, self._totals.items(), key=_rank_key)
+        return self._top[:n]
+
+    def clear(self) -> None:
+        self.synced_at = None
+        self._days.clear()
+        self._totals.clear()
+        self._top = None
+
+    def _expire(self) -> tuple[date, date]:
+        start, end = self.window()
+        for day in [day for day in self._days if day < start]:
+            self._totals.subtract(self._days.pop(day))
+            self._totals += Counter()  # drop zero and negative entries
+            self._top = None
+        return start, end
+
+
+def _rank_key(entry: tuple[int, int]) -> tuple[int, int]:
+    # Highest count first, ties to the lowest sender id.
+    sender_id, events = entry
+    return events, -sender_id
+
+
+_boards: dict[str, WindowLeaderboard] = {}
+
+
+def leaderboard(channel: str) -> WindowLeaderboard:
+    board = _boards.get(channel)
+    if board is None:
+        settings = get_settings()
+        board = _boards[channel] = WindowLeaderboard(
+            settings.leaderboard_window_days, settings.leaderboard_resync_seconds
+        )
+    return board
+
+
+async def record_spam_event(
+    session: AsyncSession,
+    channel: str,
+    sender_id: Optional[int],
+    occurred_at: datetime,
+) -> None:
+    """Bump the durable daily counter (staged); windows pick it up on catch-up."""
+
+    if sender_id is None:
+        return
+    day = as_utc(occurred_at).date()
+    query = (
+        select(SenderDailyCount)
+        .where(
+            SenderDailyCount.sender_id == sender_id,
+            SenderDailyCount.channel == channel,
+            SenderDailyCount.day == day,
+        )
+        .with_for_update()
+    )
+    row = await session.scalar(query)
+    if row is None:
+        try:
+            async with session.begin_nested():
+                row = SenderDailyCount(sender_id=sender_id, channel=channel, day=day, events=0)
+                session.add(row)
+        except IntegrityError:
+            row = await session.scalar(query)
+    row.events += 1
+    row.updated_at = datetime.now(timezone.utc)
+
+
+async def retract_spam_events(
+    session: AsyncSession,
+    channel: str,
+    events: Iterable[tuple[Optional[int], datetime]],
+) -> None:
+    """Take archived ``(sender_id, occurred_at)`` spam events off the daily counters (staged).
+
+    Counters inside the in-memory window are kept at zero and stamped so other
+    workers' windows see the change; older ones are deleted once empty.
+    """
+
+    counts = Counter(
+        (sender_id, as_utc(occurred_at).date())
+        for sender_id, occurred_at in events
+        if sender_id is not None
+    )
+    now = datetime.now(timezone.utc)
+    for (sender_id, day), count in counts.items():
+        await session.execute(
+            update(SenderDailyCount)
+            .where(
+                SenderDailyCount.sender_id == sender_id,
+                SenderDailyCount.channel == channel,
+                SenderDailyCount.day == day,
+            )
+            .values(events=SenderDailyCount.events - count, updated_at=now)
+        )
+    if counts:
+        start, _ = leaderboard(channel).window()
+        await session.execute(
+            delete(SenderDailyCount).where(
+                SenderDailyCount.channel == channel,
+                SenderDailyCount.day < start,
+                SenderDailyCount.events <= 0,
+            )
+        )
+
+
+async def top_from_counters(
+    session: AsyncSession,
+    channel: str,
+    start_day: date,
+    end_day: date,
+    n: int,
+) -> list[tuple[int, int]]:
+    total = func.sum(SenderDailyCount.events)
+    result = await session.execute(
+        select(SenderDailyCount.sender_id, total.label("events"))
+        .where(
+            SenderDailyCount.channel == channel,
+            SenderDailyCount.day >= start_day,
+            SenderDailyCount.day <= end_day,
+        )
+        .group_by(SenderDailyCount.sender_id)
+        .having(total > 0)
+        .order_by(total.desc(), SenderDailyCount.sender_id)
+        .limit(n)
+    )
+    return [(row.sender_id, int(row.events)) for row in result]
+
+
+async def rebuild_sender_counts(session: AsyncSession) -> None:
+    """Recompute the daily counters from raw spam events and reload the in-memory windows.
+
+    Counters are updated in place and stamped, and ones no event supports any
+    more drop to zero, so other workers' windows see the rebuild on catch-up.
+    """
+
+    now = datetime.now(timezone.utc)
+    stored = {
+        (row.sender_id, row.channel, row.day): row
+        for row in await session.scalars(select(SenderDailyCount))
+    }
+    for channel, sender_column, time_column, is_spam in (
+        ("sms", Message.sender_id, Message.received_at, Message.is_spam),
+        ("calls", Call.caller_id, Call.started_at, Call.is_spam),
+    ):
+        counts: Counter = Counter()
+        result = await session.stream(
+            select(sender_column, time_column).where(
+                sender_column.is_not(None), is_spam.is_(True)
+            )
+        )
+        async for sender_id, occurred_at in result:
+            counts[(sender_id, channel, as_utc(occurred_at).date())] += 1
+        for key, events in counts.items():
+            row = stored.pop(key, None)
+            if row is None:
+                sender_id, _, day = key
+                session.add(
+                    SenderDailyCount(
+                        sender_id=sender_id, channel=channel, day=day, events=events, updated_at=now
+                    )
+                )
+            elif row.events != events:
+                row.events = events
+                row.updated_at = now
+    for row in stored.values():
+        if row.events:
+            row.events = 0
+            row.updated_at = now
+    await session.flush()
+    await load_leaderboards(session)
+
+
+async def load_leaderboards(session: AsyncSession) -> None:
+    for channel in CHANNELS:
+        board = leaderboard(channel)
+        board.clear()
+        synced_at = datetime.now(timezone.utc)
+        start, end = board.window()
+        result = await session.execute(
+            select(SenderDailyCount.sender_id, SenderDailyCount.day, SenderDailyCount.events).where(
+                SenderDailyCount.channel == channel,
+                SenderDailyCount.day >= start,
+                SenderDailyCount.day <= end,
+            )
+        )
+        for sender_id, day, events in result:
+            board.increment(sender_id, day, events)
+        board.synced_at = synced_at
+
+
+async def catch_up_leaderboard(session: AsyncSession, channel: str) -> None:
+    """Apply counter changes committed since ``channel``'s window last synced."""
+
+    board = leaderboard(channel)
+    if board.synced_at is None:
+        await load_leaderboards(session)
+        return
+    synced_at = datetime.now(timezone.utc)
+    start, end = board.window()
+    result = await session.execute(
+        select(SenderDailyCount.sender_id, SenderDailyCount.day, SenderDailyCount.events).where(
+            SenderDailyCount.channel == channel,
+            SenderDailyCount.updated_at >= board.synced_at - board.resync_window,
+            SenderDailyCount.day >= start,
+            SenderDailyCount.day <= end,
+        )
+    )
+    for sender_id, day, events in result:
+        board.set_count(sender_id, day, events)
+    board.synced_at = synced_at
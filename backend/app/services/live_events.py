@@ -0,0 +1,516 @@
+"""Ring buffers of the newest SMS and call events for the live tables.
+
+``GET /api/sms?limit=`` and ``GET /api/calls?limit=`` show the newest ``limit``
+events of a range. Instead of a JOINed query per refresh, the page is cut from
+an in-memory ring of the last ``LIVE_EVENTS_CAPACITY`` events per channel,
+filled from the database at startup and appended to as events are published.
+
+Each ring is a struct of numpy arrays, one slot per event. Phone numbers and
+bodies are interned in string tables and slots hold int32 indexes into them.
+Categories are kept as ids and senders as ids into a small per-sender table, so
+a block/unblock is a single update. A slot costs about 45 bytes plus its share
+of the interned strings.
+
+Events may arrive out of timestamp order, so a ring tracks a ``horizon``: every
+event stamped after it is held. Once a full ring overwrites a slot, the horizon
+moves up to that slot's timestamp. ``newest`` returns ``None`` unless the page
+it would serve is provably complete, meaning the range starts after the
+horizon or every row of the page is newer than it. The caller then falls back
+to SQL.
+
+Publishing only reaches the ring of the worker that committed the event, so
+before cutting a page the routes call ``catch_up``. It reads the rows with ids
+above ``synced_id`` (every committed row up to it is known to the ring) and adds
+those the ring does not hold yet: events from other workers, or ones whose
+publish failed. With nothing new, this is one empty primary-key range scan.
+SQLite commits rows in id order. On Postgres, a transaction that commits after
+a higher id was synced can still be missed until the next reload.
+
+Rows the ring already holds change too: senders are blocked and unblocked
+(``senders.blocked_changed_at``) and messages are reclassified
+(``messages.classified_at``). ``catch_up`` re-reads the senders and messages
+stamped since its previous sync, less ``LIVE_EVENTS_RESYNC_SECONDS``, and
+applies them. The overlap covers writes stamped before they commit and clocks
+that differ between workers. Each of these is an index range scan over the
+recent changes only.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import Select, false, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.models.body import MessageBody
+from app.models.call import Call
+from app.models.message import Message
+from app.models.sender import Sender
+from app.services.categories import categories
+
+if TYPE_CHECKING:
+    from app.services.ingest import IngestedCall, IngestedMessage
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_SPAM, _BLOCKED = 1, 2
+_LOAD_CHUNK = 10_000
+
+
+def _micros(moment: datetime) -> int:
+    return (as_utc(moment) - _EPOCH) // _MICROSECOND
+
+
+class _StringTable:
+    """Interned strings; slots store an index, or -1 for ``None``."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def get(self, index: int) -> Optional[str]:
+        return None if index < 0 else self.values[index]
+
+    def compact(self, column: np.ndarray, live: np.ndarray) -> None:
+        """Drop strings no live slot refers to and renumber ``column`` in place."""
+
+        used = np.unique(column[live & (column >= 0)])
+        lookup = np.full(len(self.values) + 1, -1, dtype=np.int32)
+        lookup[used] = np.arange(len(used), dtype=np.int32)
+        # Index -1 lands on the extra trailing entry and stays -1.
+        column[:] = lookup[column]
+        self.values = [self.values[index] for index in used.tolist()]
+        self._index = {value: index for index, value in enumerate(self.values)}
+
+
+class EventRing(ABC):
+    """Fixed-capacity ring of one channel's newest events.
+
+    ``FIELDS`` names the row keys, in the read schema's field order, and
+    ``MODEL`` is the table the ring mirrors.
+    """
+
+    FIELDS: tuple[str, ...] = ()
+    MODEL: type
+
+    def __init__(self, capacity: int, resync_seconds: float = 0.0) -> None:
+        self.capacity = capacity
+        self.resync_window = timedelta(seconds=resync_seconds)
+        self._id = np.full(capacity, -1, dtype=np.int64)
+        self._at = np.zeros(capacity, dtype=np.int64)
+        self._party = np.full(capacity, -1, dtype=np.int64)
+        self._counterpart = np.full(capacity, -1, dtype=np.int32)
+        self._category = np.full(capacity, -1, dtype=np.int32)
+        self._confidence = np.full(capacity, np.nan, dtype=np.float64)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._numbers = _StringTable()
+        # Sender/caller id -> [phone number, is_blocked], shared by all its events.
+        self._parties: dict[int, list] = {}
+        self._next = 0
+        self._filled = 0
+        self._horizon: Optional[int] = None
+        self.synced_id = 0
+        self._changes_since: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._id >= 0))
+
+    def clear(self) -> None:
+        self.__init__(self.capacity, self.resync_window.total_seconds())
+
+    def append(self, **fields: Any) -> None:
+        """Add an event; ``fields`` are ``_write``'s keywords."""
+
+        if self.capacity <= 0:
+            return
+        if self._horizon is not None and _micros(fields["at"]) <= self._horizon:
+            return
+        slot = self._next
+        if self._filled == self.capacity:
+            if self._id[slot] >= 0:
+                evicted = int(self._at[slot])
+                self._horizon = evicted if self._horizon is None else max(self._horizon, evicted)
+        else:
+            self._filled += 1
+        self._next = (slot + 1) % self.capacity
+        self._write(slot, **fields)
+        if self._next == 0:
+            # Once per lap: drop strings and senders only overwritten slots used.
+            self._compact()
+
+    def newest(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        limit: int,
+    ) -> Optional[list[dict[str, Any]]]:
+        """Newest ``limit`` rows in the range, or ``None`` if the ring cannot vouch for them."""
+
+        mask = self._id >= 0
+        start = _micros(start_date) if start_date is not None else None
+        if start is not None:
+            mask &= self._at >= start
+        if end_date is not None:
+            mask &= self._at <= _micros(end_date)
+        slots = np.flatnonzero(mask)
+        if len(slots) > limit:
+            # Everything tied with the limit-th timestamp, then an exact sort of that.
+            cutoff = np.partition(self._at[slots], len(slots) - limit)[len(slots) - limit]
+            slots = slots[self._at[slots] >= cutoff]
+        slots = slots[np.lexsort((-self._id[slots], -self._at[slots]))][:limit]
+
+        complete = (
+            self._horizon is None
+            or (start is not None and start > self._horizon)
+            or (len(slots) == limit and int(self._at[slots[-1]]) > self._horizon)
+        )
+        if not complete:
+            return None
+        return [self._row(slot) for slot in slots.tolist()]
+
+    def set_party_blocked(self, party_id: int, blocked: bool) -> None:
+        party = self._parties.get(party_id)
+        if party is not None:
+            party[1] = blocked
+
+    def reclassify(self, updates: Iterable[dict[str, Any]]) -> None:
+        """Apply the reclassifier's ``{id, is_spam, confidence, category_id}`` updates."""
+
+        updates = sorted(updates, key=lambda update: update["id"])
+        if not updates:
+            return
+        ids = np.array([update["id"] for update in updates], dtype=np.int64)
+        slots = np.flatnonzero(np.isin(self._id, ids))
+        for slot, position in zip(
+            slots.tolist(), np.searchsorted(ids, self._id[slots]).tolist()
+        ):
+            update = updates[position]
+            confidence = update["confidence"]
+            self._confidence[slot] = np.nan if confidence is None else confidence
+            category_id = update["category_id"]
+            self._category[slot] = -1 if category_id is None else category_id
+            flags = int(self._flags[slot]) & ~_SPAM
+            self._flags[slot] = flags | (_SPAM if update["is_spam"] else 0)
+
+    def forget_before(self, cutoff: datetime) -> None:
+        """Drop events stamped before ``cutoff``, after retention deleted them."""
+
+        self._id[(self._id >= 0) & (self._at < _micros(cutoff))] = -1
+
+    async def load(self, session: AsyncSession) -> None:
+        """Refill with the newest events in the database."""
+
+        self.clear()
+        if self.capacity <= 0:
+            return
+        self._changes_since = datetime.now(timezone.utc) - self.resync_window
+        # Newest rows go to the end of the arrays, so slot 0 is overwritten first.
+        slot = self.capacity
+        result = await session.stream(self._source().limit(self.capacity))
+        async for partition in result.partitions(_LOAD_CHUNK):
+            for row in partition:
+                slot -= 1
+                self._write(slot, **row._asdict())
+        self._filled = self.capacity - slot
+        if self._filled == self.capacity:
+            # Older events exist, and ones tied with the oldest loaded may be missing.
+            self._horizon = int(self._at[0])
+        self.synced_id = max(int(self._id.max()), 0) if self._filled else 0
+
+    async def catch_up(self, session: AsyncSession) -> None:
+        """Add committed events this process did not publish, and apply changed rows."""
+
+        if self.capacity <= 0:
+            return
+        synced_at = datetime.now(timezone.utc)
+        model = self.MODEL
+        rows = (
+            await session.execute(
+                self._source()
+                .where(model.id > self.synced_id)
+                .order_by(None)
+                .order_by(model.id)
+                .limit(self.capacity + 1)
+            )
+        ).all()
+        if len(rows) > self.capacity:
+            await self.load(session)
+            return
+        if rows:
+            ids = np.array([row.id for row in rows], dtype=np.int64)
+            held = np.isin(ids, self._id)
+            for row, known in zip(rows, held.tolist()):
+                if not known:
+                    self.append(**row._asdict())
+            self.synced_id = max(self.synced_id, int(ids[-1]))
+        await self._resync_changes(session)
+        self._changes_since = synced_at - self.resync_window
+
+    async def _resync_changes(self, session: AsyncSession) -> None:
+        since = self._changes_since
+        if since is None:
+            return
+        changed = await session.execute(
+            select(Sender.id, Sender.is_blocked).where(Sender.blocked_changed_at >= since)
+        )
+        for party_id, blocked in changed:
+            self.set_party_blocked(party_id, blocked)
+        reclassified = self._reclassified_since(since)
+        if reclassified is not None:
+            self.reclassify(row._asdict() for row in await session.execute(reclassified))
+
+    def _write(
+        self,
+        slot: int,
+        *,
+        id: int,
+        at: datetime,
+        party_id: Optional[int],
+        party_number: Optional[str],
+        party_blocked: bool,
+        counterpart: str,
+        category_id: Optional[int],
+        is_spam: bool,
+        confidence: Optional[float],
+        blocked: bool,
+        extra: Any,
+    ) -> None:
+        self._id[slot] = id
+        self._at[slot] = _micros(at)
+        self._party[slot] = -1 if party_id is None else party_id
+        if party_id is not None:
+            self._parties[party_id] = [party_number, bool(party_blocked)]
+        self._counterpart[slot] = self._numbers.intern(counterpart)
+        self._category[slot] = -1 if category_id is None else category_id
+        self._confidence[slot] = np.nan if confidence is None else confidence
+        self._flags[slot] = (_SPAM if is_spam else 0) | (_BLOCKED if blocked else 0)
+        self._store_extra(slot, extra)
+
+    def _row(self, slot: int) -> dict[str, Any]:
+        party_id = int(self._party[slot])
+        number, blocked = self._parties.get(party_id, (None, False))
+        confidence = float(self._confidence[slot])
+        flags = int(self._flags[slot])
+        values = self._row_values(
+            slot,
+            id=int(self._id[slot]),
+            party_id=party_id if party_id >= 0 else None,
+            party_number=number,
+            counterpart=self._numbers.get(int(self._counterpart[slot])),
+            at=_EPOCH + int(self._at[slot]) * _MICROSECOND,
+            category=categories.name(int(self._category[slot])),
+            is_spam=bool(flags & _SPAM),
+            confidence=None if np.isnan(confidence) else confidence,
+            blocked=bool(flags & _BLOCKED),
+            party_blocked=blocked,
+        )
+        return dict(zip(self.FIELDS, values))
+
+    def _compact(self) -> None:
+        live = self._id >= 0
+        self._numbers.compact(self._counterpart, live)
+        live_parties = set(np.unique(self._party[live]).tolist())
+        self._parties = {
+            party_id: party for party_id, party in self._parties.items() if party_id in live_parties
+        }
+        self._compact_extra(live)
+
+    # Channel-specific columns.
+
+    @abstractmethod
+    def _source(self) -> Select:
+        """Newest-first rows of the table, labelled as ``_write``'s keywords."""
+
+    @abstractmethod
+    def _store_extra(self, slot: int, extra: Any) -> None:
+        ...
+
+    def _compact_extra(self, live: np.ndarray) -> None:
+        pass
+
+    def _reclassified_since(self, since: datetime) -> Optional[Select]:
+        """``reclassify``'s updates for rows changed since ``since``, if the channel has any."""
+
+        return None
+
+    @abstractmethod
+    def _row_values(self, slot: int, **common: Any) -> tuple:
+        ...
+
+
+class MessageRing(EventRing):
+    MODEL = Message
+    FIELDS = (
+        "id",
+        "sender_id",
+        "sender_number",
+        "receiver_number",
+        "body",
+        "category",
+        "received_at",
+        "is_spam",
+        "confidence",
+        "blocked",
+        "sender_is_blocked",
+    )
+
+    def __init__(self, capacity: int, resync_seconds: float = 0.0) -> None:
+        super().__init__(capacity, resync_seconds)
+        self._body = np.full(capacity, -1, dtype=np.int32)
+        self._bodies = _StringTable()
+
+    def add(self, message: IngestedMessage) -> None:
+        self.append(
+            id=message.id,
+            at=message.received_at,
+            party_id=message.sender_id,
+            party_number=message.sender_number,
+            party_blocked=message.sender_is_blocked,
+            counterpart=message.receiver_number,
+            category_id=message.category_id,
+            is_spam=message.is_spam,
+            confidence=message.confidence,
+            blocked=message.blocked,
+            extra=message.body,
+        )
+
+    def _source(self) -> Select:
+        return (
+            select(
+                Message.id,
+                Message.received_at.label("at"),
+                Message.sender_id.label("party_id"),
+                Sender.phone_number.label("party_number"),
+                func.coalesce(Sender.is_blocked, false()).label("party_blocked"),
+                Message.receiver_number.label("counterpart"),
+                Message.category_id,
+                Message.is_spam,
+                Message.confidence,
+                Message.blocked,
+                MessageBody.content.label("extra"),
+            )
+            .join(MessageBody, MessageBody.id == Message.body_id)
+            .outerjoin(Sender, Sender.id == Message.sender_id)
+            .order_by(Message.received_at.desc(), Message.id.desc())
+        )
+
+    def _reclassified_since(self, since: datetime) -> Optional[Select]:
+        return select(
+            Message.id, Message.is_spam, Message.confidence, Message.category_id
+        ).where(Message.classified_at >= since)
+
+    def _store_extra(self, slot: int, body: str) -> None:
+        self._body[slot] = self._bodies.intern(body)
+
+    def _compact_extra(self, live: np.ndarray) -> None:
+        self._bodies.compact(self._body, live)
+
+    def _row_values(self, slot: int, **common: Any) -> tuple:
+        return (
+            common["id"],
+            common["party_id"],
+            common["party_number"],
+            common["counterpart"],
+            self._bodies.get(int(self._body[slot])),
+            common["category"],
+            common["at"],
+            common["is_spam"],
+            common["confidence"],
+            common["blocked"],
+            common["party_blocked"],
+        )
+
+
+class CallRing(EventRing):
+    MODEL = Call
+    FIELDS = (
+        "id",
+        "caller_id",
+        "caller_number",
+        "callee_number",
+        "started_at",
+        "duration_seconds",
+        "category",
+        "is_spam",
+        "confidence",
+        "blocked",
+        "caller_is_blocked",
+    )
+
+    def __init__(self, capacity: int, resync_seconds: float = 0.0) -> None:
+        super().__init__(capacity, resync_seconds)
+        self._duration = np.zeros(capacity, dtype=np.int32)
+
+    def add(self, call: IngestedCall) -> None:
+        self.append(
+            id=call.id,
+            at=call.started_at,
+            party_id=call.caller_id,
+            party_number=call.caller_number,
+            party_blocked=call.caller_is_blocked,
+            counterpart=call.callee_number,
+            category_id=call.category_id,
+            is_spam=call.is_spam,
+            confidence=call.confidence,
+            blocked=call.blocked,
+            extra=call.duration_seconds,
+        )
+
+    def _source(self) -> Select:
+        return (
+            select(
+                Call.id,
+                Call.started_at.label("at"),
+                Call.caller_id.label("party_id"),
+                Sender.phone_number.label("party_number"),
+                func.coalesce(Sender.is_blocked, false()).label("party_blocked"),
+                Call.callee_number.label("counterpart"),
+                Call.category_id,
+                Call.is_spam,
+                Call.confidence,
+                Call.blocked,
+                Call.duration_seconds.label("extra"),
+            )
+            .outerjoin(Sender, Sender.id == Call.caller_id)
+            .order_by(Call.started_at.desc(), Call.id.desc())
+        )
+
+    def _store_extra(self, slot: int, duration_seconds: int) -> None:
+        self._duration[slot] = duration_seconds
+
+    def _row_values(self, slot: int, **common: Any) -> tuple:
+        return (
+            common["id"],
+            common["party_id"],
+            common["party_number"],
+            common["counterpart"],
+            common["at"],
+            int(self._duration[slot]),
+            common["category"],
+            common["is_spam"],
+            common["confidence"],
+            common["blocked"],
+            common["party_blocked"],
+        )
+
+
+_settings = get_settings()
+live_messages = MessageRing(_settings.live_events_capacity, _settings.live_events_resync_seconds)
+live_calls = CallRing(_settings.live_events_capacity, _settings.live_events_resync_seconds)
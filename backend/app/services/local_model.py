@@ -0,0 +1,236 @@
+"""Local NumPy spam model: hashed n-gram logistic regression plus naive Bayes categories.
+
+Models are trained from labelled ``messages`` rows and saved as versioned
+directories (``<local_model_dir>/v<N>/``) of raw ``.npy`` arrays plus a
+``meta.json``. Loading memory-maps the arrays, so a worker starts serving
+without reading the weights into its heap and forked workers share the pages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.body import MessageBody
+from app.models.category import Category
+from app.models.message import Message
+from app.schemas.classification import ClassificationResponse
+from app.services.bodies import catch_up_dictionaries
+from app.services.text_features import hashed_features, segment_starts
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIMENSION = 1 << 18
+_EPOCHS = 300
+_LEARNING_RATE = 2.0
+_L2 = 1e-4
+_NB_ALPHA = 0.1
+
+_active_model: Optional["LocalSpamModel"] = None
+
+
+@dataclass
+class LocalSpamModel:
+    version: int
+    trained_at: str
+    samples: int
+    categories: list[str]
+    spam_weights: np.ndarray
+    spam_bias: float
+    category_log_prob: np.ndarray
+    category_log_prior: np.ndarray
+
+    def spam_probabilities(self, texts: Sequence[str]) -> np.ndarray:
+        return self._spam_probabilities(len(texts), *hashed_features(texts, FEATURE_DIMENSION))
+
+    def predict_categories(self, texts: Sequence[str]) -> list[str]:
+        doc_index, features, _ = hashed_features(texts, FEATURE_DIMENSION)
+        return self._predict_categories(len(texts), doc_index, features)
+
+    def classify_batch(self, texts: Sequence[str]) -> list[ClassificationResponse]:
+        if not texts:
+            return []
+        doc_index, features, values = hashed_features(texts, FEATURE_DIMENSION)
+        probabilities = self._spam_probabilities(len(texts), doc_index, features, values)
+        categories = self._predict_categories(len(texts), doc_index, features)
+        rationale = f"Local n-gram model v{self.version}."
+        return [
+            ClassificationResponse(
+                is_spam=bool(probability >= 0.5),
+                confidence=round(float(probability), 4),
+                category=category,
+                rationale=rationale,
+            )
+            for probability, category in zip(probabilities, categories)
+        ]
+
+    def _spam_probabilities(
+        self, documents: int, doc_index: np.ndarray, features: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        scores = np.bincount(
+            doc_index, weights=self.spam_weights[features] * values, minlength=documents
+        )
+        return 1.0 / (1.0 + np.exp(-(scores + self.spam_bias)))
+
+    def _predict_categories(
+        self, documents: int, doc_index: np.ndarray, features: np.ndarray
+    ) -> list[str]:
+        scores = np.tile(self.category_log_prior, (documents, 1))
+        if features.size:
+            starts, counts = segment_starts(doc_index, documents)
+            present = counts > 0
+            scores[present] += np.add.reduceat(
+                self.category_log_prob[features], starts[present], axis=0
+            )
+        return [self.categories[index] for index in scores.argmax(axis=1)]
+
+
+def get_local_model() -> Optional[LocalSpamModel]:
+    return _active_model
+
+
+def load_latest_model(model_dir: Optional[Path] = None) -> Optional[LocalSpamModel]:
+    """Memory-map the newest saved version and make it the active model."""
+
+    global _active_model
+    model_dir = model_dir or get_settings().local_model_dir
+    versions = _saved_versions(model_dir)
+    if not versions:
+        return None
+    _active_model = _load(model_dir / f"v{versions[-1]}")
+    logger.info("Loaded local spam model v%d", _active_model.version)
+    return _active_model
+
+
+async def train_from_messages(
+    session: AsyncSession,
+    model_dir: Optional[Path] = None,
+) -> LocalSpamModel:
+    """Fit a new version from labelled ``messages`` rows, save it and activate it."""
+
+    global _active_model
+    model_dir = model_dir or get_settings().local_model_dir
+    await catch_up_dictionaries(session)
+    rows = (
+        await session.execute(
+            select(
+                MessageBody.content.label("body"),
+                Message.is_spam,
+                Category.name.label("category"),
+            )
+            .join_from(Message, MessageBody)
+            .join(Category, Category.id == Message.category_id)
+        )
+    ).all()
+    if not rows:
+        raise ValueError("No labelled messages available for training")
+
+    versions = _saved_versions(model_dir)
+    version = (versions[-1] + 1) if versions else 1
+    model = await asyncio.to_thread(_fit, rows, version)
+    await asyncio.to_thread(_save, model, model_dir / f"v{version}")
+    _active_model = _load(model_dir / f"v{version}")
+    return _active_model
+
+
+def _fit(rows: Sequence, version: int) -> LocalSpamModel:
+    texts = [row.body for row in rows]
+    labels = np.array([1.0 if row.is_spam else 0.0 for row in rows])
+    categories = sorted({row.category for row in rows})
+    category_index = {category: index for index, category in enumerate(categories)}
+    targets = np.array([category_index[row.category] for row in rows], dtype=np.int64)
+
+    doc_index, features, values = hashed_features(texts, FEATURE_DIMENSION)
+    samples = len(texts)
+
+    # Logistic regression by full-batch gradient descent on the sparse design
+    # matrix; both X·w and Xᵀ·g reduce to a single bincount.
+    weights = np.zeros(FEATURE_DIMENSION)
+    bias = 0.0
+    for _ in range(_EPOCHS):
+        scores = bias + np.bincount(
+            doc_index, weights=weights[features] * values, minlength=samples
+        )
+        gradient = 1.0 / (1.0 + np.exp(-scores)) - labels
+        weights -= _LEARNING_RATE * (
+            np.bincount(
+                features, weights=gradient[doc_index] * values, minlength=FEATURE_DIMENSION
+            ) / samples
+            + _L2 * weights
+        )
+        bias -= _LEARNING_RATE * gradient.mean()
+
+    # Multinomial naive Bayes over the same hashed counts for the category.
+    counts = np.bincount(
+        features * len(categories) + targets[doc_index],
+        minlength=FEATURE_DIMENSION * len(categories),
+    ).reshape(FEATURE_DIMENSION, len(categories)).astype(np.float64)
+    totals = counts.sum(axis=0) + _NB_ALPHA * FEATURE_DIMENSION
+    log_prob = np.log(counts + _NB_ALPHA) - np.log(totals)
+    log_prior = np.log(np.bincount(targets, minlength=len(categories)) / samples)
+
+    return LocalSpamModel(
+        version=version,
+        trained_at=datetime.now(timezone.utc).isoformat(),
+        samples=samples,
+        categories=categories,
+        spam_weights=weights.astype(np.float32),
+        spam_bias=float(bias),
+        category_log_prob=log_prob.astype(np.float32),
+        category_log_prior=log_prior.astype(np.float32),
+    )
+
+
+def _save(model: LocalSpamModel, path: Path) -> None:
+    path.mkdir(parents=True, exist_ok=False)
+    np.save(path / "spam_weights.npy", model.spam_weights)
+    np.save(path / "category_log_prob.npy", model.category_log_prob)
+    np.save(path / "category_log_prior.npy", model.category_log_prior)
+    (path / "meta.json").write_text(
+        json.dumps(
+            {
+                "version": model.version,
+                "trained_at": model.trained_at,
+                "samples": model.samples,
+                "categories": model.categories,
+                "spam_bias": model.spam_bias,
+                "feature_dimension": FEATURE_DIMENSION,
+            }
+        )
+    )
+
+
+def _load(path: Path) -> LocalSpamModel:
+    meta = json.loads((path / "meta.json").read_text())
+    if meta["feature_dimension"] != FEATURE_DIMENSION:
+        raise ValueError(f"Model at {path} uses an incompatible feature dimension")
+    return LocalSpamModel(
+        version=meta["version"],
+        trained_at=meta["trained_at"],
+        samples=meta["samples"],
+        categories=meta["categories"],
+        spam_weights=np.load(path / "spam_weights.npy", mmap_mode="r"),
+        spam_bias=meta["spam_bias"],
+        category_log_prob=np.load(path / "category_log_prob.npy", mmap_mode="r"),
+        category_log_prior=np.load(path / "category_log_prior.npy"),
+    )
+
+
+def _saved_versions(model_dir: Path) -> list[int]:
+    if not model_dir.is_dir():
+        return []
+    return sorted(
+        int(entry.name[1:])
+        for entry in model_dir.iterdir()
+        if entry.is_dir() and entry.name.startswith("v") and entry.name[1:].isdigit()
+    )
@@ -0,0 +1,424 @@
+"""On-demand profiles of single API requests.
+
+Profiling is off unless ``PROFILING_TOKEN`` is set. Without it, neither the
+middleware nor the engine listeners are installed, so requests run exactly as
+before. With it, a request carrying ``X-Profile: <token>`` is profiled, one at a
+time. Requests that arrive while a profile is running are served normally. A
+thread samples the event-loop thread's stack every
+``PROFILE_SAMPLE_INTERVAL_MS``. Engine events time every SQL statement the
+request issues. Each sample is weighted by the time since the previous one and
+filed under a phase:
+
+* ``sql``: the loop is idle while one of the request's statements executes;
+* ``orm``: SQLAlchemy code (statement compilation, row and ORM hydration);
+* ``validation``: Pydantic validation;
+* ``serialization``: JSON encoding and response rendering;
+* ``app``: any other Python code of the request, framework included;
+* ``wait``: the loop is idle and no statement of the request is executing;
+* ``other_tasks``: the loop is running other requests or background jobs.
+
+The phases are returned in a ``Server-Timing`` header, and the profile id in
+``X-Profile-Id``. The profile ends when the response headers are sent, so a
+streamed body is not covered. Finished profiles are kept in a bounded store
+(``PROFILE_STORE_SIZE``) with the top functions and statements. They can be
+downloaded as collapsed stacks, the input format of ``flamegraph.pl``,
+speedscope and inferno, with weights in microseconds.
+
+Samples count as the request's own when the stack runs through the middleware.
+Also counted are SQLAlchemy greenlets and tasks that issued a statement on the
+request's behalf, such as the fan-out partials of ``app.services.scatter``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import inspect
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+PHASES = ("sql", "orm", "validation", "serialization", "app", "wait", "other_tasks")
+PROFILE_HEADER = b"x-profile"
+# Requests to the profile endpoints are never profiled themselves.
+_EXCLUDED_PREFIX = "/api/profiles"
+_TOP_N = 20
+_STATEMENT_CHARS = 200
+_COROUTINE_FLAGS = (
+    inspect.CO_COROUTINE | inspect.CO_ITERABLE_COROUTINE | inspect.CO_ASYNC_GENERATOR
+)
+_SERIALIZING_PYDANTIC = {
+    "model_dump",
+    "model_dump_json",
+    "dump_python",
+    "dump_json",
+    "to_json",
+    "to_jsonable_python",
+}
+_SERIALIZATION_FILES = (
+    "fastapi/encoders.py",
+    "fastapi/responses.py",
+    "starlette/responses.py",
+    "app/api/responses.py",
+    "/json/",
+)
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+
+@dataclass
+class _QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+class Profile:
+    def __init__(self, method: str, path: str, query: str) -> None:
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.query = query
+        self.status: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = 0.0
+        self.samples = 0
+        self.phases: Counter[str] = Counter()
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.self_time: Counter[str] = Counter()
+        self.total_time: Counter[str] = Counter()
+        self.queries: dict[str, _QueryStats] = {}
+        self.sql_inflight = 0
+        self._started = time.perf_counter()
+        # Frames whose stacks belong to this request, by id. Holding the frames
+        # keeps their ids from being reused while the profile runs.
+        self._roots: dict[int, FrameType] = {}
+        self._base: Optional[CodeType] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.method} {self.path}"
+
+    def finish(self, status: Optional[int] = None) -> None:
+        if not self.duration:
+            self.duration = time.perf_counter() - self._started
+            self.status = status
+            self._roots.clear()
+
+    def adopt(self, frame: FrameType) -> None:
+        """Count samples under ``frame``'s greenlet, and under the running task, as ours."""
+
+        while frame.f_back is not None:
+            frame = frame.f_back
+        self._roots.setdefault(id(frame), frame)
+        task = asyncio.current_task()
+        if task is not None:
+            coroutine_frame = getattr(task.get_coro(), "cr_frame", None)
+            if coroutine_frame is not None:
+                self._roots.setdefault(id(coroutine_frame), coroutine_frame)
+
+    def record(self, frame: FrameType, seconds: float, marker: CodeType) -> None:
+        """File one sample of the event-loop thread; runs on the sampler thread."""
+
+        codes: list[CodeType] = []
+        root: Optional[CodeType] = None
+        own = in_task = False
+        while frame is not None:
+            code = frame.f_code
+            if code is marker:
+                own = True
+                break
+            codes.append(code)
+            if self._roots.get(id(frame)) is frame:
+                own = True
+                break
+            in_task = in_task or bool(code.co_flags & _COROUTINE_FLAGS)
+            root = code
+            frame = frame.f_back
+
+        if own:
+            phase = next(
+                (phase for phase in map(_phase, codes) if phase is not None), "app"
+            )
+            stack = (self.label, *(_label(code) for code in reversed(codes)))
+        elif in_task or root is not self._base:
+            phase = "other_tasks"
+            stack = (self.label, "[other tasks]")
+        elif self.sql_inflight:
+            phase = "sql"
+            stack = (self.label, "[sql]")
+        else:
+            phase = "wait"
+            stack = (self.label, "[wait]")
+
+        self.samples += 1
+        self.phases[phase] += seconds
+        self.stacks[stack] += seconds
+        self.self_time[stack[-1]] += seconds
+        for label in set(stack[1:]):
+            self.total_time[label] += seconds
+
+    def set_base(self, frame: FrameType) -> None:
+        # The bottom of the loop thread's stack; a sample with only the frames
+        # beneath the loop and no coroutine on it means the loop is idle.
+        while frame.f_back is not None:
+            frame = frame.f_back
+        self._base = frame.f_code
+
+    def statement_started(self) -> None:
+        self.sql_inflight += 1
+
+    def statement_finished(self, statement: str, seconds: float) -> None:
+        self.sql_inflight = max(self.sql_inflight - 1, 0)
+        key = re.sub(r"\s+", " ", statement).strip()[:_STATEMENT_CHARS]
+        stats = self.queries.setdefault(key, _QueryStats())
+        stats.count += 1
+        stats.seconds += seconds
+
+    def server_timing(self) -> str:
+        entries = [f"total;dur={self.duration * 1000:.1f}"]
+        entries += [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self._phase_times()]
+        return ", ".join(entries)
+
+    def _phase_times(self) -> list[tuple[str, float]]:
+        return [(phase, self.phases[phase]) for phase in PHASES if phase in self.phases]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "phases_ms": {
+                phase: round(seconds * 1000, 3) for phase, seconds in self._phase_times()
+            },
+        }
+
+    def details(self) -> dict[str, Any]:
+        queries = sorted(self.queries.items(), key=lambda item: item[1].seconds, reverse=True)
+        return {
+            **self.summary(),
+            "samples": self.samples,
+            "sql_statements": sum(stats.count for stats in self.queries.values()),
+            "sql_ms": round(sum(stats.seconds for stats in self.queries.values()) * 1000, 3),
+            "top_functions": [
+                {
+                    "function": label,
+                    "self_ms": round(seconds * 1000, 3),
+                    "total_ms": round(self.total_time[label] * 1000, 3),
+                }
+                for label, seconds in self.self_time.most_common(_TOP_N)
+            ],
+            "top_queries": [
+                {
+                    "statement": statement,
+                    "count": stats.count,
+                    "total_ms": round(stats.seconds * 1000, 3),
+                }
+                for statement, stats in queries[:_TOP_N]
+            ],
+        }
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{';'.join(stack)} {max(round(seconds * 1_000_000), 1)}\n"
+            for stack, seconds in self.stacks.items()
+        )
+
+
+class ProfileStore:
+    """The most recent ``capacity`` profiles, oldest evicted first."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+
+    def add(self, profile: Profile) -> None:
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.capacity:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def recent(self) -> list[Profile]:
+        return list(reversed(self._profiles.values()))
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile, interval: float, marker: CodeType) -> None:
+        super().__init__(name=f"profiler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.marker = marker
+        self.target = threading.get_ident()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            now = time.perf_counter()
+            if frame is not None:
+                self.profile.record(frame, now - last, self.marker)
+            last = now
+            del frame
+
+    def stop(self) -> None:
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self.join()
+
+
+class ProfilingMiddleware:
+    """Profile requests that carry the profiling token in ``X-Profile``."""
+
+    def __init__(self, app: ASGIApp, token: str, store: ProfileStore, interval: float) -> None:
+        self.app = app
+        self.token = token.encode()
+        self.store = store
+        self.interval = interval
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or self._active
+            or scope["path"].startswith(_EXCLUDED_PREFIX)
+            or not self._authorised(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        self._active = True
+        try:
+            await self._profiled(scope, receive, send)
+        finally:
+            self._active = False
+
+    def _authorised(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile = Profile(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1")
+        )
+        profile.set_base(sys._getframe())
+        sampler = _Sampler(profile, self.interval, ProfilingMiddleware._profiled.__code__)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                sampler.stop()
+                profile.finish(message["status"])
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-Profile-Id", profile.id)
+            await send(message)
+
+        # The sampler needs the GIL to take a sample; by default a busy loop
+        # thread only hands it over every 5 ms.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval))
+        context = _current.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            sampler.stop()
+            sys.setswitchinterval(switch_interval)
+            profile.finish()
+            _current.reset(context)
+            self.store.add(profile)
+
+
+def install_sql_hooks() -> None:
+    """Time statements and adopt SQLAlchemy greenlets for the running profile."""
+
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Session, "do_orm_execute", _adopt_orm_execute)
+    event.listen(Engine, "before_execute", _adopt_execute)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+def _adopt_orm_execute(orm_execute_state: Any) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.adopt(sys._getframe())
+
+
+def _adopt_execute(conn: Any, *args: Any) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.adopt(sys._getframe())
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.statement_started()
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    profile = _current.get()
+    started = conn.info.get("profile_started")
+    if profile is not None and started:
+        profile.statement_finished(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(context: Any) -> None:
+    profile = _current.get()
+    started = context.connection.info.get("profile_started") if context.connection else None
+    if profile is not None and started:
+        profile.statement_finished(context.statement or "", time.perf_counter() - started.pop())
+
+
+@lru_cache(maxsize=8192)
+def _label(code: CodeType) -> str:
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+@lru_cache(maxsize=8192)
+def _phase(code: CodeType) -> Optional[str]:
+    path = code.co_filename.replace("\\", "/")
+    if "/pydantic/" in path or "/pydantic_core/" in path:
+        return "serialization" if code.co_name in _SERIALIZING_PYDANTIC else "validation"
+    if any(marker in path for marker in _SERIALIZATION_FILES):
+        return "serialization"
+    if "/sqlalchemy/" in path:
+        return "orm"
+    return None
+
+
+def _short_path(filename: str) -> str:
+    for root in sorted((path for path in sys.path if path), key=len, reverse=True):
+        if filename.startswith(root.rstrip("/") + "/"):
+            return filename[len(root.rstrip("/")) + 1 :]
+    return filename
+
+
+profiles = ProfileStore(get_settings().profile_store_size)
@@ -0,0 +1,225 @@
+"""Background worker that re-scores stored messages through the LLM classifier."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.db.session import ReadSessionLocal
+from app.models.body import MessageBody
+from app.models.message import Message
+from app.schemas.classification import ClassificationResponse
+from app.services.admission import AdmissionRejected, AdmissionTimeout, classification_admission
+from app.services.bodies import catch_up_dictionaries
+from app.services.categories import categories
+from app.services.classifier import classify_with_llm
+from app.services.live_events import live_messages
+from app.services.snapshots import dashboard_snapshots
+from app.services.write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures and stays open for ``cooldown`` seconds.
+
+    Once the cooldown elapses a single trial call is let through (half-open); its
+    outcome either closes the breaker or re-opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def remaining_cooldown(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_in_flight or self.remaining_cooldown() > 0:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give back a trial that ended without an outcome (e.g. cancelled)."""
+
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._failures >= self.threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    "Reclassification circuit opened after %d consecutive failures", self._failures
+                )
+            self._opened_at = time.monotonic()
+
+
+class ReclassificationWorker:
+    """Drains unclassified or uncertain messages through the LLM (``classify_with_llm``).
+
+    Candidates are messages never scored by the worker (``classified_at`` is null)
+    whose category or confidence is missing, or whose confidence sits within
+    ``reclassify_uncertainty_band`` of 0.5; stored confidence is a spam score,
+    so values near 0.5 are the ones the original verdict was least sure about.
+    Only LLM verdicts are written back and stamp ``classified_at``. Local-model
+    answers would mark a message as reclassified without the LLM having seen
+    it, and failures must reach the circuit breaker.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None) -> None:
+        self.settings = settings or get_settings()
+        rate = self.settings.reclassify_requests_per_minute / 60
+        self.bucket = TokenBucket(
+            rate=rate, capacity=max(1.0, float(self.settings.reclassify_concurrency))
+        )
+        self.breaker = CircuitBreaker(
+            threshold=self.settings.reclassify_breaker_threshold,
+            cooldown=self.settings.reclassify_breaker_cooldown_seconds,
+        )
+        self._slots = asyncio.Semaphore(self.settings.reclassify_concurrency)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("Reclassification batch failed")
+                processed = 0
+            if self.breaker.is_open:
+                await asyncio.sleep(max(self.breaker.remaining_cooldown(), 1.0))
+            elif not processed:
+                await asyncio.sleep(self.settings.reclassify_poll_seconds)
+
+    async def run_once(self) -> int:
+        """Classify one batch of candidates and write the verdicts back; return the count."""
+
+        async with ReadSessionLocal() as session:
+            await catch_up_dictionaries(session)
+            candidates = (await session.execute(self._candidates_query())).all()
+        if not candidates:
+            return 0
+
+        results = await asyncio.gather(*(self._classify(row.body) for row in candidates))
+        classified_at = datetime.now(timezone.utc)
+        updates = [
+            {
+                "id": row.id,
+                "is_spam": result.is_spam,
+                "confidence": result.confidence,
+                "category_id": categories.category_id(result.category),
+                "classified_at": classified_at,
+            }
+            for row, result in zip(candidates, results)
+            if result is not None
+        ]
+        if updates:
+            async def apply(session: AsyncSession) -> list[dict]:
+                # Bulk UPDATE by primary key: one executemany round trip per batch.
+                await session.execute(update(Message), updates)
+                return updates
+
+            # Committed with ingest and block/unblock on the single writer.
+            await write_queue.submit(apply, publish=_publish_reclassified, wait=True)
+        return len(updates)
+
+    def _candidates_query(self):
+        band = self.settings.reclassify_uncertainty_band
+        return (
+            select(Message.id, MessageBody.content.label("body"))
+            .join_from(Message, MessageBody)
+            .where(
+                Message.classified_at.is_(None),
+                or_(
+                    Message.category_id.is_(None),
+                    Message.confidence.is_(None),
+                    Message.confidence.between(0.5 - band, 0.5 + band),
+                ),
+            )
+            .order_by(Message.received_at.desc())
+            .limit(self.settings.reclassify_batch_size)
+        )
+
+    async def _classify(self, text: str) -> Optional[ClassificationResponse]:
+        async with self._slots:
+            await self.bucket.acquire()
+            # The breaker is consulted only once admitted: a request shed by admission
+            # control never holds the half-open trial, and one admitted but timed out
+            # is a downstream failure like any other.
+            allowed = False
+
+            async def attempt() -> Optional[ClassificationResponse]:
+                nonlocal allowed
+                allowed = self.breaker.allow_request()
+                return await classify_with_llm(text) if allowed else None
+
+            try:
+                result = await classification_admission.run("batch", attempt)
+            except AdmissionRejected:
+                # Shed in favour of interactive/realtime traffic; retried next batch.
+                return None
+            except (AdmissionTimeout, RuntimeError):
+                # classify_with_llm logs the underlying OpenAIError and surfaces it as
+                # RuntimeError; AdmissionTimeout means the call hung past the deadline.
+                if allowed:
+                    self.breaker.record_failure()
+                return None
+            except BaseException:
+                if allowed:
+                    self.breaker.release_trial()
+                raise
+            if not allowed:
+                return None
+            self.breaker.record_success()
+            return result
+
+
+def _publish_reclassified(updates: list[dict]) -> None:
+    live_messages.reclassify(updates)
+    dashboard_snapshots.invalidate()
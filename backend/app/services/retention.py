@@ -0,0 +1,246 @@
+"""Retention: events older than ``RETENTION_DAYS`` move to monthly archive files.
+
+The hot ``messages``/``calls`` tables are not partitioned. Native partitions
+would need the timestamp in every primary and unique key, and ingest relies on
+``id`` and ``event_key`` alone. Instead the tables only hold the retention
+window, and every range query goes through the timestamp indexes. Older rows
+are moved, in timestamp order, into one gzip-compressed JSON-lines file per
+table and calendar month (``<archive_dir>/<kind>/<YYYY-MM>.jsonl.gz``). Those
+files are the partitions: exports over old ranges only open the months that
+overlap the request.
+
+Each batch is read, then appended to the archive and fsynced, and only then
+deleted. A crash in between can duplicate archived rows but never lose them,
+and the writer connection is not held while the batch is compressed. The delete
+transaction also takes the rows out of everything derived from them: hourly
+rollups, the leaderboard's daily counters, the caller fan-out sketches,
+extracted entities, and bodies no message refers to any more. After the
+commit, the in-memory similarity index and live rings drop them too.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, Optional
+
+import orjson
+from sqlalchemy import Select, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.timeutils import as_utc
+from app.db.queries import call_rows_query, message_rows_query
+from app.db.session import ReadSessionLocal, SessionLocal
+from app.models.call import Call
+from app.models.entity import MessageEntity
+from app.models.message import Message
+from app.services.bodies import catch_up_dictionaries, purge_orphan_bodies
+from app.services.fanout import retract_calls
+from app.services.leaderboard import retract_spam_events
+from app.services.live_events import live_calls, live_messages
+from app.services.similarity import message_index
+from app.services.snapshots import dashboard_snapshots
+from app.services.timeseries import retract_events
+from app.services.write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 5000
+_JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+@dataclass(frozen=True)
+class _Deleted:
+    ids: list[int]
+    bodies: int = 0
+
+
+async def _delete_messages(session: AsyncSession, ids: list[int]) -> _Deleted:
+    rows = (
+        await session.execute(
+            select(
+                Message.id,
+                Message.sender_id,
+                Message.received_at,
+                Message.is_spam,
+                Message.blocked,
+                Message.body_id,
+            ).where(Message.id.in_(ids))
+        )
+    ).all()
+    # Rows another worker archived meanwhile are gone already; retract only the rest.
+    found = [row.id for row in rows]
+    if not found:
+        return _Deleted(found)
+    await session.execute(delete(MessageEntity).where(MessageEntity.message_id.in_(found)))
+    await session.execute(delete(Message).where(Message.id.in_(found)))
+    await retract_events(session, "sms", ((row.received_at, row.blocked) for row in rows))
+    await retract_spam_events(
+        session, "sms", ((row.sender_id, row.received_at) for row in rows if row.is_spam)
+    )
+    bodies = await purge_orphan_bodies(session, sorted({row.body_id for row in rows}))
+    return _Deleted(found, bodies)
+
+
+async def _delete_calls(session: AsyncSession, ids: list[int]) -> _Deleted:
+    rows = (
+        await session.execute(
+            select(Call.id, Call.caller_id, Call.started_at, Call.is_spam, Call.blocked).where(
+                Call.id.in_(ids)
+            )
+        )
+    ).all()
+    found = [row.id for row in rows]
+    if not found:
+        return _Deleted(found)
+    await session.execute(delete(Call).where(Call.id.in_(found)))
+    await retract_events(session, "calls", ((row.started_at, row.blocked) for row in rows))
+    await retract_spam_events(
+        session, "calls", ((row.caller_id, row.started_at) for row in rows if row.is_spam)
+    )
+    await retract_calls(session, ((row.caller_id, row.started_at) for row in rows))
+    return _Deleted(found)
+
+
+@dataclass(frozen=True)
+class _ArchiveSpec:
+    model: type
+    timestamp_field: str
+    query: Callable[[], Select]
+    delete: Callable[[AsyncSession, list[int]], Awaitable[_Deleted]]
+
+
+ARCHIVE_KINDS: dict[str, _ArchiveSpec] = {
+    "sms": _ArchiveSpec(Message, "received_at", message_rows_query, _delete_messages),
+    "calls": _ArchiveSpec(Call, "started_at", call_rows_query, _delete_calls),
+}
+
+
+def partition_key(moment: datetime) -> str:
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def partition_path(archive_dir: Path, kind: str, key: str) -> Path:
+    return archive_dir / kind / f"{key}.jsonl.gz"
+
+
+async def archive_expired(
+    retention_days: int,
+    archive_dir: Optional[Path] = None,
+    now: Optional[datetime] = None,
+) -> dict[str, int]:
+    """Move rows older than ``retention_days`` into the archive; return counts per kind."""
+
+    archive_dir = archive_dir or get_settings().archive_dir
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+
+    archived: dict[str, int] = {}
+    for kind, spec in ARCHIVE_KINDS.items():
+        column = getattr(spec.model, spec.timestamp_field)
+        archived[kind] = 0
+        removed: list[int] = []
+        while True:
+            batch = spec.query().where(column < cutoff).order_by(column.asc()).limit(_BATCH_SIZE)
+            async with _reader()() as session:
+                await catch_up_dictionaries(session)
+                rows = (await session.execute(batch)).all()
+            if not rows:
+                break
+
+            partitions: dict[str, list[bytes]] = defaultdict(list)
+            for row in rows:
+                key = partition_key(getattr(row, spec.timestamp_field))
+                partitions[key].append(orjson.dumps(row._asdict(), option=_JSON_OPTIONS))
+            await asyncio.to_thread(_append_partitions, archive_dir, kind, partitions)
+
+            ids = [row.id for row in rows]
+            deleted = await write_queue.submit(
+                lambda session: spec.delete(session, ids),
+                publish=_publish_deleted,
+                wait=True,
+            )
+            removed += deleted.ids
+            archived[kind] += len(deleted.ids)
+            if not deleted.ids:
+                # Read rows that were already gone; try again on the next run.
+                break
+        if spec.model is Message:
+            # Once per run: every removal re-sorts the whole index.
+            message_index.remove(removed)
+        (live_messages if spec.model is Message else live_calls).forget_before(cutoff)
+
+    return archived
+
+
+def iter_archive(
+    kind: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    archive_dir: Optional[Path] = None,
+) -> Iterator[bytes]:
+    """Yield archived rows as JSON lines, opening only partitions overlapping the range."""
+
+    archive_dir = archive_dir or get_settings().archive_dir
+    spec = ARCHIVE_KINDS[kind]
+    lower = as_utc(start_date) if start_date else None
+    upper = as_utc(end_date) if end_date else None
+
+    for path in sorted((archive_dir / kind).glob("*.jsonl.gz")):
+        key = path.name.split(".", 1)[0]
+        if lower and key < partition_key(lower):
+            continue
+        if upper and key > partition_key(upper):
+            break
+        with gzip.open(path, "rb") as handle:
+            for line in handle:
+                line = line.rstrip(b"\n")
+                if not line:
+                    continue
+                if lower or upper:
+                    moment = as_utc(
+                        datetime.fromisoformat(orjson.loads(line)[spec.timestamp_field])
+                    )
+                    if (lower and moment < lower) or (upper and moment > upper):
+                        continue
+                yield line
+
+
+async def run_retention_loop(retention_days: int, interval_seconds: int) -> None:
+    while True:
+        try:
+            archived = await archive_expired(retention_days)
+            if any(archived.values()):
+                logger.info("Archived expired events: %s", archived)
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("Retention job failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def _publish_deleted(_: _Deleted) -> None:
+    dashboard_snapshots.invalidate()
+
+
+def _reader() -> async_sessionmaker:
+    # A replica can lag and hand back rows that are archived already, so read
+    # the primary then. On SQLite the read pool is the same file and keeps the
+    # single writer connection free.
+    return SessionLocal if get_settings().database_replica_url else ReadSessionLocal
+
+
+def _append_partitions(archive_dir: Path, kind: str, partitions: dict[str, list[bytes]]) -> None:
+    for key, lines in partitions.items():
+        path = partition_path(archive_dir, kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Each append is a separate gzip member; readers see one continuous stream.
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab", compresslevel=9) as handle:
+                handle.write(b"\n".join(lines) + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
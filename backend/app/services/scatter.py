@@ -0,0 +1,266 @@
+"""Scatter-gather aggregation over id-range partitions of the event tables.
+
+The dashboard aggregates (totals, distinct senders, top sender, distinct spam
+and blocked keys) are one SQL statement each. SQLite runs one statement on one
+core. With ``QUERY_FANOUT_PARTITIONS`` above 1, ``event_totals`` instead does
+the following:
+
+1. it splits the id span of the matching rows into that many ranges;
+2. it runs a partial aggregate per range concurrently, each on its own
+   connection from the fan-out pool. aiosqlite runs every connection on its own
+   thread, and sqlite3 releases the GIL while a statement runs, so the
+   partitions use separate cores;
+3. it merges the partials. Each partial is fixed-size, whatever the number of
+   senders in its range: the counts and sums, which add up exactly; its
+   ``_TOP_K`` busiest senders; and HyperLogLog sketches (``app.services.hll``)
+   of its distinct senders and distinct spam/blocked keys, which are unioned.
+
+Fan-out distinct counts are therefore estimates: exact up to ``hll.SPARSE_LIMIT``
+distinct values, within a few percent above. The top sender is the highest
+summed count among the partitions' top-K lists, so a sender that is just outside
+every partition's top-K but first overall can be missed.
+
+Ranges are on the integer primary key, so each partial is a rowid range scan
+over its share of the table, whatever the time filter. The distinct values
+are streamed into the sketch in batches rather than returned to the merge.
+Partials see the database as of their own statements, so under concurrent
+ingest the merged totals may straddle a commit. With 1 partition (the
+default), ``event_totals`` runs the exact single-statement aggregate on the
+request's session.
+
+Storage stays one database file. Bodies, entities, rollups, leaderboard and
+block-rule counters are written in the same transaction as each event, and the
+API exposes row ids. So the rows are partitioned when queried, not split into
+separate files.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import Integer, case, cast, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import FanoutSessionLocal
+from app.models.call import Call
+from app.models.message import Message
+from app.models.sender import Sender
+from app.services.hll import HyperLogLog
+
+# Busiest senders each partial reports for the top-sender merge.
+_TOP_K = 16
+# Distinct values fetched per round trip while building a partial's sketches.
+_SKETCH_BATCH = 5000
+
+
+@dataclass(frozen=True)
+class EventTable:
+    model: type
+    # Sender (or caller) column, and the column whose distinct spam/blocked
+    # values the summary counts.
+    party: Any
+    key: Any
+
+
+MESSAGES = EventTable(Message, Message.sender_id, Message.body_id)
+CALLS = EventTable(Call, Call.caller_id, Call.caller_id)
+
+
+@dataclass
+class EventTotals:
+    total: int
+    blocked: int
+    unique_parties: int
+    top_party_number: Optional[str]
+    avg_confidence: Optional[float]
+    # Only computed when asked for with ``distinct_keys``.
+    unique_spam: int = 0
+    unique_blocked: int = 0
+
+
+@dataclass
+class _Partial:
+    total: int = 0
+    blocked: int = 0
+    confidence_sum: float = 0.0
+    confidence_count: int = 0
+    top_parties: Counter = field(default_factory=Counter)
+    parties: HyperLogLog = field(default_factory=HyperLogLog)
+    spam_keys: HyperLogLog = field(default_factory=HyperLogLog)
+    blocked_keys: HyperLogLog = field(default_factory=HyperLogLog)
+
+    def merge(self, other: "_Partial") -> None:
+        self.total += other.total
+        self.blocked += other.blocked
+        self.confidence_sum += other.confidence_sum
+        self.confidence_count += other.confidence_count
+        self.top_parties.update(other.top_parties)
+        self.parties.update(other.parties.to_bytes())
+        self.spam_keys.update(other.spam_keys.to_bytes())
+        self.blocked_keys.update(other.blocked_keys.to_bytes())
+
+
+def fanout_partitions() -> int:
+    return max(get_settings().query_fanout_partitions, 1)
+
+
+async def event_totals(
+    session: AsyncSession,
+    table: EventTable,
+    filters: tuple,
+    distinct_keys: bool = False,
+) -> EventTotals:
+    partitions = fanout_partitions()
+    if partitions == 1:
+        return await _single_totals(session, table, filters, distinct_keys)
+
+    ranges = await id_ranges(session, table, filters, partitions)
+    merged = _Partial()
+    for partial in await asyncio.gather(
+        *(_partial_totals(table, filters, low, high, distinct_keys) for low, high in ranges)
+    ):
+        merged.merge(partial)
+
+    # Ties go to the lowest id, as in the single-statement query.
+    top = max(
+        merged.top_parties,
+        key=lambda party: (merged.top_parties[party], -party),
+        default=None,
+    )
+    return EventTotals(
+        total=merged.total,
+        blocked=merged.blocked,
+        unique_parties=merged.parties.estimate(),
+        top_party_number=(
+            await session.scalar(select(Sender.phone_number).where(Sender.id == top))
+            if top is not None
+            else None
+        ),
+        avg_confidence=(
+            merged.confidence_sum / merged.confidence_count if merged.confidence_count else None
+        ),
+        unique_spam=merged.spam_keys.estimate(),
+        unique_blocked=merged.blocked_keys.estimate(),
+    )
+
+
+async def id_ranges(
+    session: AsyncSession,
+    table: EventTable,
+    filters: tuple,
+    partitions: int,
+) -> list[tuple[int, int]]:
+    """Split the ids of the matching rows into at most ``partitions`` inclusive ranges."""
+
+    model = table.model
+    low, high = (
+        await session.execute(select(func.min(model.id), func.max(model.id)).where(*filters))
+    ).one()
+    if low is None:
+        return []
+    step = max(-(-(high - low + 1) // partitions), 1)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+async def _single_totals(
+    session: AsyncSession,
+    table: EventTable,
+    filters: tuple,
+    distinct_keys: bool,
+) -> EventTotals:
+    model = table.model
+    columns = [
+        func.count(model.id).label("total"),
+        func.coalesce(func.sum(cast(model.blocked, Integer)), 0).label("blocked"),
+        func.count(func.distinct(table.party)).label("unique_parties"),
+        func.avg(model.confidence).label("avg_confidence"),
+    ]
+    if distinct_keys:
+        columns += [
+            func.count(func.distinct(case((model.is_spam.is_(True), table.key)))).label(
+                "unique_spam"
+            ),
+            func.count(func.distinct(case((model.blocked.is_(True), table.key)))).label(
+                "unique_blocked"
+            ),
+        ]
+    totals = (await session.execute(select(*columns).where(*filters))).one()
+
+    top_party_number = (
+        await session.execute(
+            select(Sender.phone_number)
+            .join(model, Sender.id == table.party)
+            .where(*filters)
+            .group_by(Sender.id)
+            .order_by(func.count(model.id).desc(), Sender.id)
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    return EventTotals(
+        total=totals.total,
+        blocked=totals.blocked,
+        unique_parties=totals.unique_parties,
+        top_party_number=top_party_number,
+        avg_confidence=totals.avg_confidence,
+        unique_spam=totals.unique_spam if distinct_keys else 0,
+        unique_blocked=totals.unique_blocked if distinct_keys else 0,
+    )
+
+
+async def _partial_totals(
+    table: EventTable,
+    filters: tuple,
+    low: int,
+    high: int,
+    distinct_keys: bool,
+) -> _Partial:
+    model = table.model
+    conditions = (model.id.between(low, high), *filters)
+    async with FanoutSessionLocal() as session:
+        totals = (
+            await session.execute(
+                select(
+                    func.count(model.id).label("total"),
+                    func.coalesce(func.sum(cast(model.blocked, Integer)), 0).label("blocked"),
+                    func.coalesce(func.sum(model.confidence), 0.0).label("confidence_sum"),
+                    func.count(model.confidence).label("confidence_count"),
+                ).where(*conditions)
+            )
+        ).one()
+        partial = _Partial(
+            total=totals.total,
+            blocked=totals.blocked,
+            confidence_sum=totals.confidence_sum,
+            confidence_count=totals.confidence_count,
+        )
+        top = await session.execute(
+            select(table.party, func.count(model.id))
+            .where(*conditions, table.party.is_not(None))
+            .group_by(table.party)
+            .order_by(func.count(model.id).desc(), table.party)
+            .limit(_TOP_K)
+        )
+        partial.top_parties.update(dict(top.tuples().all()))
+
+        await _sketch(session, partial.parties, table.party, conditions)
+        if distinct_keys:
+            spam = (*conditions, model.is_spam.is_(True))
+            blocked = (*conditions, model.blocked.is_(True))
+            await _sketch(session, partial.spam_keys, table.key, spam)
+            await _sketch(session, partial.blocked_keys, table.key, blocked)
+    return partial
+
+
+async def _sketch(session: AsyncSession, sketch: HyperLogLog, column, conditions: tuple) -> None:
+    """Add the distinct non-null values of ``column`` among matching rows to ``sketch``."""
+
+    result = await session.stream_scalars(
+        select(distinct(column)).where(*conditions, column.is_not(None))
+    )
+    async for values in result.partitions(_SKETCH_BATCH):
+        for value in values:
+            sketch.add(str(value))
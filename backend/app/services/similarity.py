@@ -0,0 +1,186 @@
+"""Near-duplicate index over message bodies using SimHash signatures and banded LSH.
+
+Each body is reduced to a 64-bit SimHash of its hashed character n-grams.
+Signatures are split into four 16-bit bands; two bodies whose signatures
+differ in at most three bits are guaranteed to share a band value. Every band
+keeps a sorted key array over all indexed rows, so candidate lookup is a
+``searchsorted`` per band, plus a linear scan of the small unsorted tail of
+rows added since the last merge.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.body import MessageBody
+from app.models.message import Message
+from app.services.text_features import ngram_hashes, segment_starts
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BITS = 64
+BANDS = 4
+_BAND_BITS = SIGNATURE_BITS // BANDS
+_BAND_MASK = np.uint64((1 << _BAND_BITS) - 1)
+_SIGNATURE_CHUNK = 2048
+_SIGNATURE_NGRAMS = (4,)
+_MIN_TAIL = 4096
+_FULL_SCAN_LIMIT = 1_000_000
+_REBUILD_CHUNK = 10_000
+_POPCOUNT8 = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def simhash(texts: Sequence[str]) -> np.ndarray:
+    """64-bit SimHash per text; texts too short for any n-gram hash to 0."""
+
+    signatures = np.zeros(len(texts), dtype=np.uint64)
+    for offset in range(0, len(texts), _SIGNATURE_CHUNK):
+        chunk = texts[offset:offset + _SIGNATURE_CHUNK]
+        doc_index, hashes = ngram_hashes(chunk, _SIGNATURE_NGRAMS)
+        if not doc_index.size:
+            continue
+        # Bit-major layout (64 x n-grams) keeps the per-document reduction contiguous.
+        bytes_major = np.ascontiguousarray(hashes.view(np.uint8).reshape(-1, 8).T)
+        bits = np.unpackbits(bytes_major, axis=0, bitorder="little")
+        starts, counts = segment_starts(doc_index, len(chunk))
+        present = counts > 0
+        ones = np.add.reduceat(bits, starts[present], axis=1, dtype=np.int32)
+        majority = (ones * 2 > counts[present]).astype(np.uint8)
+        packed = np.packbits(majority, axis=0, bitorder="little")
+        signatures[offset:offset + len(chunk)][present] = (
+            np.ascontiguousarray(packed.T).view(np.uint64).ravel()
+        )
+    return signatures
+
+
+def hamming(signatures: np.ndarray, target: np.uint64) -> np.ndarray:
+    xor = np.bitwise_xor(signatures, target)
+    return _POPCOUNT8[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class SimilarityIndex:
+    def __init__(self) -> None:
+        self._ids = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty(0, dtype=np.uint64)
+        self._size = 0
+        # Rows [0, _sorted_upto) are covered by the per-band sorted arrays.
+        self._sorted_upto = 0
+        self._band_keys: list[np.ndarray] = [np.empty(0, dtype=np.uint64)] * BANDS
+        self._band_positions: list[np.ndarray] = [np.empty(0, dtype=np.int64)] * BANDS
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def add(self, ids: Sequence[int], texts: Sequence[str]) -> None:
+        if not ids:
+            return
+        self._append(np.asarray(ids, dtype=np.int64), simhash(texts))
+        if self._size - self._sorted_upto > max(_MIN_TAIL, self._sorted_upto // 16):
+            self._merge_tail()
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """Drop deleted messages, e.g. after retention archived them."""
+
+        if not self._size or not len(ids):
+            return
+        keep = ~np.isin(self._ids[:self._size], np.asarray(ids, dtype=np.int64))
+        kept = int(np.count_nonzero(keep))
+        if kept == self._size:
+            return
+        self._ids[:kept] = self._ids[:self._size][keep]
+        self._signatures[:kept] = self._signatures[:self._size][keep]
+        self._size = kept
+        self._merge_tail()
+
+    def query(
+        self,
+        text: str,
+        k: int,
+        exclude_id: Optional[int] = None,
+    ) -> list[tuple[int, float]]:
+        """Top-``k`` ``(message_id, score)`` pairs, score being 1 - hamming / 64."""
+
+        if not self._size:
+            return []
+        target = simhash([text])[0]
+        positions = self._candidates(target)
+        if positions.size < k + 1 and self._size <= _FULL_SCAN_LIMIT:
+            positions = np.arange(self._size)
+
+        ids = self._ids[positions]
+        distances = hamming(self._signatures[positions], target)
+        if exclude_id is not None:
+            keep = ids != exclude_id
+            ids, distances = ids[keep], distances[keep]
+        if not ids.size:
+            return []
+
+        top = np.arange(ids.size)
+        if ids.size > k:
+            top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [
+            (int(ids[index]), round(1 - float(distances[index]) / SIGNATURE_BITS, 4))
+            for index in top
+        ]
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Re-index every stored message body."""
+
+        self.clear()
+        result = await session.stream(
+            select(Message.id, MessageBody.content.label("body"))
+            .join_from(Message, MessageBody)
+            .execution_options(yield_per=_REBUILD_CHUNK)
+        )
+        async for partition in result.partitions():
+            self._append(
+                np.fromiter((row.id for row in partition), dtype=np.int64, count=len(partition)),
+                simhash([row.body for row in partition]),
+            )
+        self._merge_tail()
+        logger.info("Similarity index built over %d messages", self._size)
+
+    def _append(self, ids: np.ndarray, signatures: np.ndarray) -> None:
+        needed = self._size + ids.size
+        if needed > self._ids.size:
+            capacity = max(needed, self._ids.size * 2, 1024)
+            self._ids = np.resize(self._ids, capacity)
+            self._signatures = np.resize(self._signatures, capacity)
+        self._ids[self._size:needed] = ids
+        self._signatures[self._size:needed] = signatures
+        self._size = needed
+
+    def _merge_tail(self) -> None:
+        signatures = self._signatures[:self._size]
+        for band in range(BANDS):
+            keys = (signatures >> np.uint64(band * _BAND_BITS)) & _BAND_MASK
+            order = np.argsort(keys, kind="stable")
+            self._band_keys[band] = keys[order]
+            self._band_positions[band] = order
+        self._sorted_upto = self._size
+
+    def _candidates(self, target: np.uint64) -> np.ndarray:
+        found: list[np.ndarray] = []
+        tail = self._signatures[self._sorted_upto:self._size]
+        for band in range(BANDS):
+            shift = np.uint64(band * _BAND_BITS)
+            key = (target >> shift) & _BAND_MASK
+            keys = self._band_keys[band]
+            left, right = np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right")
+            found.append(self._band_positions[band][left:right])
+            if tail.size:
+                matches = np.flatnonzero(((tail >> shift) & _BAND_MASK) == key)
+                found.append(matches + self._sorted_upto)
+        return np.unique(np.concatenate(found))
+
+
+message_index = SimilarityIndex()
@@ -0,0 +1,135 @@
+"""Pre-computed dashboard payloads for the standard time windows.
+
+Most dashboard hits ask for the same windows: the last 24 hours, 7 days, 30
+days, or all time. Routes register a builder per endpoint that renders the
+finished JSON body for a window. ``SnapshotStore.run`` re-renders every
+(endpoint, window) pair on a schedule (``PRECOMPUTE_INTERVAL_SECONDS``) and
+soon after writes invalidate them. Requests with ``?window=`` are then answered
+with the stored bytes without touching the database. Builders render aggregates
+and at most a bounded page of the newest rows (``PRECOMPUTE_PAGE_ROWS``), so
+memory stays bounded whatever the table size.
+
+Invalidation is debounced. A burst of writes triggers one refresh, no sooner
+than ``PRECOMPUTE_MIN_INTERVAL_SECONDS`` after the previous one. In between, the
+previous snapshot is served, marked stale. Responses carry ``Age`` (seconds since
+the snapshot was computed) and ``X-Snapshot-At``. ``X-Snapshot-Stale: 1`` means
+writes have landed since. A snapshot older than ``PRECOMPUTE_MAX_AGE_SECONDS``
+is never served, so the route computes the response live instead.
+
+Snapshots and their invalidation are per process. With several workers, a
+worker only learns of another worker's writes at its next scheduled refresh.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Literal, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.db.session import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+WINDOWS: dict[str, Optional[timedelta]] = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "all": None,
+}
+
+Window = Literal["24h", "7d", "30d", "all"]
+# Renders the finished JSON body of one endpoint for one window.
+Builder = Callable[[AsyncSession, str], Awaitable[bytes]]
+
+
+def window_start(window: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    span = WINDOWS[window]
+    if span is None:
+        return None
+    return (now or datetime.now(timezone.utc)) - span
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    body: bytes
+    computed_at: datetime
+    generation: int
+    _monotonic: float
+
+    def age_seconds(self) -> float:
+        return time.monotonic() - self._monotonic
+
+
+class SnapshotStore:
+    def __init__(self, settings: Settings) -> None:
+        self.interval = settings.precompute_interval_seconds
+        self.min_interval = settings.precompute_min_interval_seconds
+        self.max_age = settings.precompute_max_age_seconds
+        self._builders: dict[str, Builder] = {}
+        self._snapshots: dict[tuple[str, str], Snapshot] = {}
+        self._generation = 0
+        self._dirty: Optional[asyncio.Event] = None
+
+    def register(self, endpoint: str, builder: Builder) -> None:
+        self._builders[endpoint] = builder
+
+    def get(self, endpoint: str, window: str) -> Optional[Snapshot]:
+        snapshot = self._snapshots.get((endpoint, window))
+        if snapshot is None or snapshot.age_seconds() > self.max_age:
+            return None
+        return snapshot
+
+    def headers(self, snapshot: Snapshot) -> dict[str, str]:
+        headers = {
+            "Age": str(int(snapshot.age_seconds())),
+            "X-Snapshot-At": snapshot.computed_at.isoformat(),
+        }
+        if snapshot.generation < self._generation:
+            headers["X-Snapshot-Stale"] = "1"
+        return headers
+
+    def invalidate(self) -> None:
+        """Note that committed writes may have changed every window."""
+
+        self._generation += 1
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+    async def refresh(self) -> None:
+        generation = self._generation
+        async with ReadSessionLocal() as session:
+            for endpoint, builder in self._builders.items():
+                for window in WINDOWS:
+                    computed_at, started = datetime.now(timezone.utc), time.monotonic()
+                    body = await builder(session, window)
+                    self._snapshots[(endpoint, window)] = Snapshot(
+                        body, computed_at, generation, started
+                    )
+
+    async def run(self) -> None:
+        self._dirty = asyncio.Event()
+        while True:
+            self._dirty.clear()
+            started = time.monotonic()
+            try:
+                await self.refresh()
+            except Exception:  # pragma: no cover - keep the refresher alive
+                logger.exception("Dashboard snapshot refresh failed")
+            try:
+                await asyncio.wait_for(self._dirty.wait(), self.interval)
+            except asyncio.TimeoutError:
+                continue
+            # Writes arrived: coalesce the burst, then refresh.
+            await asyncio.sleep(max(0.0, started + self.min_interval - time.monotonic()))
+
+
+dashboard_snapshots = SnapshotStore(get_settings())
@@ -0,0 +1,88 @@
+"""Vectorised hashed character n-gram features, shared by the local model and similarity index."""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+NGRAM_SIZES: tuple[int, ...] = (3, 4, 5)
+
+_PRIME = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def ngram_hashes(
+    texts: Sequence[str],
+    sizes: Sequence[int] = NGRAM_SIZES,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(doc_index, hashes)`` for every character n-gram of every text.
+
+    All texts are concatenated into a single byte buffer and each n-gram size is
+    hashed with one polynomial pass over shifted views of that buffer, so the
+    cost is a handful of NumPy ops per batch rather than Python work per n-gram.
+    N-grams spanning two texts are dropped. Output is ordered by ``doc_index``.
+    """
+
+    encoded = [text.lower().encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(chunk) for chunk in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    doc_of_byte = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+
+    doc_parts: list[np.ndarray] = []
+    hash_parts: list[np.ndarray] = []
+    for size in sizes:
+        count = buffer.size - size + 1
+        if count <= 0:
+            continue
+        hashes = np.full(count, size, dtype=np.uint64)
+        for offset in range(size):
+            hashes = hashes * _PRIME + buffer[offset:offset + count]
+        same_doc = doc_of_byte[:count] == doc_of_byte[size - 1:]
+        doc_parts.append(doc_of_byte[:count][same_doc])
+        hash_parts.append(hashes[same_doc])
+
+    if not doc_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+
+    doc_index = np.concatenate(doc_parts)
+    hashes = _mix(np.concatenate(hash_parts))
+    order = np.argsort(doc_index, kind="stable")
+    return doc_index[order], hashes[order]
+
+
+def hashed_features(
+    texts: Sequence[str],
+    dimension: int,
+    sizes: Sequence[int] = NGRAM_SIZES,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sparse L2-normalised bag of hashed n-grams as ``(doc_index, feature, value)``.
+
+    ``dimension`` must be a power of two. Duplicate features within a document are
+    left as repeated entries and are summed when reduced per document.
+    """
+
+    doc_index, hashes = ngram_hashes(texts, sizes)
+    features = (hashes & np.uint64(dimension - 1)).astype(np.int64)
+    per_doc = np.bincount(doc_index, minlength=len(texts)).astype(np.float64)
+    values = 1.0 / np.sqrt(per_doc[doc_index]) if doc_index.size else np.empty(0)
+    return doc_index, features, values
+
+
+def segment_starts(doc_index: np.ndarray, documents: int) -> tuple[np.ndarray, np.ndarray]:
+    """Start offset and length of each document's run in a ``doc_index``-sorted array."""
+
+    counts = np.bincount(doc_index, minlength=documents)
+    starts = np.zeros(documents, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return starts, counts
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    # splitmix64 finaliser: spreads the polynomial hash over all 64 bits.
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * _MIX_1
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * _MIX_2
+    return hashes ^ (hashes >> np.uint64(31))
@@ -0,0 +1,351 @@
+"""Gap-filled event series bucketed by minute, hour, day or week in an operator timezone.
+
+Timestamps are bucketed as integer epoch seconds: each row's UTC epoch is
+shifted by the zone's UTC offset (a ``CASE`` over the DST transitions inside
+the window, resolved in Python so SQLite needs no tz database) and truncated
+to the bucket width on the local wall clock. Bucket expressions only appear in
+the select list and ``GROUP BY``, so the range filter stays on the raw indexed
+timestamp column. A recursive CTE generates every bucket in the window and the
+aggregate is outer-joined onto it, so empty buckets come back as zeros.
+
+Hour and coarser series whose zone only uses whole-hour offsets read the
+hourly rollups in ``event_rollups_hourly`` (maintained at ingest) for every
+complete hour of the window, and only scan raw rows for the partial hours at
+its edges.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from typing import Iterable, Optional
+
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    and_,
+    case,
+    cast,
+    delete,
+    extract,
+    func,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timeutils import as_utc
+from app.models.call import Call
+from app.models.message import Message
+from app.models.rollup import EventRollupHour
+from app.services.aggregates import time_filters
+
+GRANULARITY_SECONDS = {"minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+HOUR = 3600
+# 1970-01-01 was a Thursday; shifting by three days makes weeks start on Monday.
+_WEEK_SHIFT = 3 * 86400
+
+
+@dataclass(frozen=True)
+class _SeriesSource:
+    timestamp: object
+    blocked: object
+
+
+SOURCES: dict[str, _SeriesSource] = {
+    "sms": _SeriesSource(Message.received_at, Message.blocked),
+    "calls": _SeriesSource(Call.started_at, Call.blocked),
+}
+
+
+@dataclass(frozen=True)
+class Bucket:
+    start: datetime
+    detected: int
+    blocked: int
+
+
+async def bucket_series(
+    session: AsyncSession,
+    channel: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    granularity: str,
+    zone: tzinfo,
+    max_buckets: int,
+) -> list[Bucket]:
+    """Return one bucket per ``granularity`` step over the window, including empty ones.
+
+    Missing bounds default to the first/last event in the table. Raises
+    ``ValueError`` when the window would need more than ``max_buckets`` buckets.
+    """
+
+    source = SOURCES[channel]
+    width = GRANULARITY_SECONDS[granularity]
+    # Every bound below, raw or rollup, is compared in UTC like the stored times.
+    start = as_utc(start) if start else None
+    end = as_utc(end) if end else None
+    filters = time_filters(source.timestamp, start, end)
+
+    lower, upper = start, end
+    if lower is None or upper is None:
+        first_seen, last_seen = (
+            await session.execute(
+                select(func.min(source.timestamp), func.max(source.timestamp)).where(*filters)
+            )
+        ).one()
+        lower = lower or first_seen or upper
+        upper = upper or last_seen or lower
+        if lower is None:
+            return []
+    lower_epoch = int(as_utc(lower).timestamp())
+    upper_epoch = int(as_utc(upper).timestamp())
+    if upper_epoch < lower_epoch:
+        return []
+    if (upper_epoch - lower_epoch) // width + 1 > max_buckets + 1:
+        raise ValueError(_too_many_buckets(max_buckets))
+
+    offsets = utc_offsets(zone, lower_epoch, upper_epoch)
+    first = _local_bucket(lower_epoch, offsets, width)
+    last = _local_bucket(upper_epoch, offsets, width)
+    if (last - first) // width + 1 > max_buckets:
+        raise ValueError(_too_many_buckets(max_buckets))
+
+    dialect = session.get_bind().dialect.name
+    epoch = epoch_seconds(source.timestamp, dialect)
+    bucket = _bucket_expression(epoch, offsets, width).label("bucket")
+    detected = func.count().label("detected")
+    blocked = func.coalesce(func.sum(cast(source.blocked, Integer)), 0).label("blocked")
+
+    use_rollups = width >= HOUR and all(offset % HOUR == 0 for _, offset in offsets)
+    if use_rollups:
+        aggregate = _rollup_aggregate(channel, source, start, end, offsets, width, bucket, blocked)
+    else:
+        aggregate = (
+            select(bucket, detected, blocked).where(*filters).group_by(bucket).subquery()
+        )
+
+    series = select(literal(first, BigInteger).label("bucket")).cte("series", recursive=True)
+    series = series.union_all(
+        select((series.c.bucket + width).label("bucket")).where(series.c.bucket < last)
+    )
+    rows = await session.execute(
+        select(
+            series.c.bucket,
+            func.coalesce(aggregate.c.detected, 0),
+            func.coalesce(aggregate.c.blocked, 0),
+        )
+        .select_from(series.outerjoin(aggregate, aggregate.c.bucket == series.c.bucket))
+        .order_by(series.c.bucket)
+    )
+    return [
+        Bucket(
+            start=datetime.fromtimestamp(local_start, timezone.utc).replace(tzinfo=zone),
+            detected=int(event_count),
+            blocked=int(blocked_count),
+        )
+        for local_start, event_count, blocked_count in rows
+    ]
+
+
+def utc_offsets(zone: tzinfo, start: int, end: int) -> list[tuple[int, int]]:
+    """Return ``(from_epoch, offset_seconds)`` for each UTC offset in effect over ``[start, end]``."""
+
+    def offset_at(moment: int) -> int:
+        return int(datetime.fromtimestamp(moment, zone).utcoffset().total_seconds())
+
+    offsets = [(start, offset_at(start))]
+    probe = start
+    while probe < end:
+        step = min(probe + 86400, end)
+        if offset_at(step) != offsets[-1][1]:
+            low, high = probe, step
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == offsets[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            offsets.append((high, offset_at(high)))
+        probe = step
+    return offsets
+
+
+def epoch_seconds(column, dialect: str):
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), BigInteger)
+    return cast(func.floor(extract("epoch", column)), BigInteger)
+
+
+async def record_event(
+    session: AsyncSession,
+    channel: str,
+    occurred_at: datetime,
+    blocked: bool,
+) -> None:
+    """Count one event in its hourly rollup (staged on the caller's transaction)."""
+
+    hour_start = int(as_utc(occurred_at).timestamp()) // HOUR * HOUR
+    query = (
+        select(EventRollupHour)
+        .where(EventRollupHour.channel == channel, EventRollupHour.hour_start == hour_start)
+        .with_for_update()
+    )
+    row = await session.scalar(query)
+    if row is None:
+        try:
+            async with session.begin_nested():
+                row = EventRollupHour(
+                    channel=channel, hour_start=hour_start, detected=0, blocked=0
+                )
+                session.add(row)
+        except IntegrityError:
+            row = await session.scalar(query)
+    row.detected += 1
+    if blocked:
+        row.blocked += 1
+
+
+async def retract_events(
+    session: AsyncSession,
+    channel: str,
+    events: Iterable[tuple[datetime, bool]],
+) -> None:
+    """Remove ``(occurred_at, blocked)`` events from the rollups, e.g. after archiving them."""
+
+    detected: Counter = Counter()
+    blocked: Counter = Counter()
+    for occurred_at, was_blocked in events:
+        hour_start = int(as_utc(occurred_at).timestamp()) // HOUR * HOUR
+        detected[hour_start] += 1
+        blocked[hour_start] += int(bool(was_blocked))
+    for hour_start, count in detected.items():
+        await session.execute(
+            update(EventRollupHour)
+            .where(EventRollupHour.channel == channel, EventRollupHour.hour_start == hour_start)
+            .values(
+                detected=EventRollupHour.detected - count,
+                blocked=EventRollupHour.blocked - blocked[hour_start],
+            )
+        )
+    await session.execute(
+        delete(EventRollupHour).where(
+            EventRollupHour.channel == channel, EventRollupHour.detected <= 0
+        )
+    )
+
+
+async def rebuild_rollups(session: AsyncSession) -> None:
+    """Recompute every hourly rollup from the raw ``messages`` and ``calls`` tables."""
+
+    await session.execute(delete(EventRollupHour))
+    dialect = session.get_bind().dialect.name
+    for channel, source in SOURCES.items():
+        epoch = epoch_seconds(source.timestamp, dialect)
+        hour_start = (epoch - epoch % HOUR).label("hour_start")
+        rows = await session.execute(
+            select(
+                hour_start,
+                func.count(),
+                func.coalesce(func.sum(cast(source.blocked, Integer)), 0),
+            ).group_by(hour_start)
+        )
+        session.add_all(
+            EventRollupHour(
+                channel=channel, hour_start=start, detected=count, blocked=int(blocked)
+            )
+            for start, count, blocked in rows
+        )
+    await session.flush()
+
+
+def _rollup_aggregate(channel, source, start, end, offsets, width, bucket, blocked):
+    """Union complete hours from the rollups with raw rows from the partial edge hours.
+
+    ``start`` and ``end`` are aware UTC (``bucket_series`` normalises them).
+    """
+
+    first_hour = -(-int(start.timestamp()) // HOUR) * HOUR if start else None
+    end_hour = int(end.timestamp()) // HOUR * HOUR if end else None
+
+    hour_filters = [EventRollupHour.channel == channel]
+    edge_filters = []
+    if first_hour is not None and end_hour is not None and first_hour >= end_hour:
+        # Shorter than one complete hour: everything comes from the raw rows.
+        hour_filters.append(literal(False))
+        edge_filters.append(and_(*time_filters(source.timestamp, start, end)))
+    else:
+        if first_hour is not None:
+            hour_filters.append(EventRollupHour.hour_start >= first_hour)
+            edge_filters.append(
+                and_(source.timestamp >= start, source.timestamp < _from_epoch(first_hour))
+            )
+        if end_hour is not None:
+            hour_filters.append(EventRollupHour.hour_start < end_hour)
+            edge_filters.append(
+                and_(source.timestamp >= _from_epoch(end_hour), source.timestamp <= end)
+            )
+
+    rollup_bucket = _bucket_expression(EventRollupHour.hour_start, offsets, width).label("bucket")
+    parts = [
+        select(
+            rollup_bucket,
+            func.sum(EventRollupHour.detected).label("detected"),
+            func.sum(EventRollupHour.blocked).label("blocked"),
+        )
+        .where(*hour_filters)
+        .group_by(rollup_bucket)
+    ]
+    if edge_filters:
+        parts.append(
+            select(bucket, func.count().label("detected"), blocked)
+            .where(or_(*edge_filters))
+            .group_by(bucket)
+        )
+    combined = union_all(*parts).subquery()
+    return (
+        select(
+            combined.c.bucket,
+            func.sum(combined.c.detected).label("detected"),
+            func.sum(combined.c.blocked).label("blocked"),
+        )
+        .group_by(combined.c.bucket)
+        .subquery()
+    )
+
+
+def _bucket_expression(epoch, offsets: list[tuple[int, int]], width: int):
+    if len(offsets) == 1:
+        local = epoch + offsets[0][1] if offsets[0][1] else epoch
+    else:
+        local = epoch + case(
+            *[(epoch >= since, offset) for since, offset in reversed(offsets[1:])],
+            else_=offsets[0][1],
+        )
+    if width == GRANULARITY_SECONDS["week"]:
+        return local - (local + _WEEK_SHIFT) % width
+    return local - local % width
+
+
+def _local_bucket(moment: int, offsets: list[tuple[int, int]], width: int) -> int:
+    offset = next(offset for since, offset in reversed(offsets) if moment >= since)
+    local = moment + offset
+    if width == GRANULARITY_SECONDS["week"]:
+        return local - (local + _WEEK_SHIFT) % width
+    return local - local % width
+
+
+def _from_epoch(moment: int) -> datetime:
+    return datetime.fromtimestamp(moment, timezone.utc)
+
+
+def _too_many_buckets(max_buckets: int) -> str:
+    return (
+        f"Window needs more than {max_buckets} buckets; "
+        "narrow the date range or use a coarser granularity"
+    )
@@ -0,0 +1,211 @@
+"""In-process write-behind queue that group-commits event and sender writes.
+
+Committing once per request caps write throughput at the database's fsync
+rate. Instead, producers (the ingest and block/unblock routes) submit a write
+as a coroutine function taking a session. A single writer task drains the
+queue in batches, closing a batch at ``WRITE_QUEUE_BATCH_ROWS`` writes or
+``WRITE_QUEUE_MAX_DELAY_MS`` after its first write, whichever comes first.
+It applies every write of the batch on one session and commits once. Each write
+runs in its own savepoint, so a failing write (a duplicate event, a missing
+sender) is rolled back and reported to its producer without failing the rest
+of the batch. ``publish`` callbacks, which update in-process indexes, run only
+after the commit. They get what ``apply`` returned, so ``apply`` returns plain
+values rather than ORM instances: a later write's savepoint rollback in the
+same batch can expire or detach instances loaded by earlier ones.
+
+Durability (``WRITE_QUEUE_DURABILITY``):
+
+* ``commit``: ``submit`` returns once the batch holding the write has
+  committed, so an acknowledged write is durable;
+* ``enqueue``: ``submit`` returns as soon as the write is queued. Latency is
+  lower, but queued writes are lost if the process dies before the next batch
+  commits.
+
+The queue is bounded (``WRITE_QUEUE_CAPACITY``). When it is full, producers
+wait, and after ``WRITE_QUEUE_ENQUEUE_TIMEOUT_SECONDS`` they get
+``WriteQueueFullError``. ``drain`` flushes everything already queued and stops
+the writer; the app calls it on shutdown. When the writer is not running,
+``submit`` applies and commits the write directly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import Settings, get_settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+Write = Callable[[AsyncSession], Awaitable[Any]]
+Publish = Callable[[Any], None]
+
+
+class WriteQueueFullError(RuntimeError):
+    """The write queue stayed full for longer than the enqueue timeout."""
+
+
+@dataclass
+class _QueuedWrite:
+    apply: Write
+    publish: Optional[Publish]
+    future: Optional[asyncio.Future]
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        settings: Settings,
+        session_factory: async_sessionmaker = SessionLocal,
+    ) -> None:
+        self.batch_rows = settings.write_queue_batch_rows
+        self.max_delay = settings.write_queue_max_delay_ms / 1000
+        self.capacity = settings.write_queue_capacity
+        self.durability = settings.write_queue_durability
+        self.enqueue_timeout = settings.write_queue_enqueue_timeout_seconds
+        self.stats: Counter = Counter()
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.capacity)
+        self._writer = asyncio.create_task(self._run())
+
+    async def drain(self) -> None:
+        """Commit every queued write, then stop the writer."""
+
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._writer
+        self._writer = None
+
+    async def submit(
+        self,
+        apply: Write,
+        publish: Optional[Publish] = None,
+        wait: Optional[bool] = None,
+    ) -> Any:
+        """Queue ``apply`` and return its result, or ``None`` if not waiting for the commit.
+
+        ``wait`` overrides the durability mode, for callers that need the result.
+        Exceptions raised by ``apply`` are re-raised here when waiting.
+        """
+
+        if not self.running:
+            return await self._apply_now(apply, publish)
+
+        if wait is None:
+            wait = self.durability == "commit"
+        future = asyncio.get_running_loop().create_future() if wait else None
+        try:
+            await asyncio.wait_for(
+                self._queue.put(_QueuedWrite(apply, publish, future)), self.enqueue_timeout
+            )
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise WriteQueueFullError("Write queue is full") from None
+        self.stats["enqueued"] += 1
+        return await future if future is not None else None
+
+    async def _apply_now(self, apply: Write, publish: Optional[Publish]) -> Any:
+        async with self._session_factory() as session:
+            result = await apply(session)
+            await session.commit()
+        if publish is not None:
+            publish(result)
+        return result
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: list[_QueuedWrite]) -> None:
+        outcomes: list[tuple[_QueuedWrite, Any, Optional[BaseException]]] = []
+        try:
+            async with self._session_factory() as session:
+                for item in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await item.apply(session)
+                    except Exception as exc:
+                        outcomes.append((item, None, exc))
+                    else:
+                        outcomes.append((item, result, None))
+                await session.commit()
+        except Exception as exc:
+            logger.exception("Write batch of %d failed to commit", len(batch))
+            self.stats["failed"] += len(batch)
+            for item in batch:
+                _resolve(item, None, exc)
+            return
+
+        self.stats["batches"] += 1
+        for item, result, error in outcomes:
+            if error is None:
+                self.stats["committed"] += 1
+                if item.publish is not None:
+                    try:
+                        item.publish(result)
+                    except Exception:
+                        logger.exception("Publishing a committed write failed")
+            else:
+                self.stats["failed"] += 1
+            _resolve(item, result, error)
+
+
+def _resolve(item: _QueuedWrite, result: Any, error: Optional[BaseException]) -> None:
+    if item.future is None:
+        if error is not None:
+            # Nobody is waiting for this write. Rejections (ValueError, e.g. a
+            # redelivered event) are routine; anything else deserves a warning.
+            level = logging.DEBUG if isinstance(error, ValueError) else logging.WARNING
+            logger.log(level, "Queued write failed: %r", error)
+        return
+    if item.future.done():
+        return
+    if error is None:
+        item.future.set_result(result)
+    else:
+        item.future.set_exception(error)
+
+
+write_queue = WriteBehindQueue(get_settings())
@@ -0,0 +1,114 @@
+"""Load-test ``classify_message`` against the bundled fake OpenAI server, fully offline.
+
+Run from ``backend/``::
+
+    python -m benchmarks.classification --requests 500 --concurrency 32 \\
+        --latency lognormal --latency-ms 300 --latency-sigma 0.8 \\
+        --error-rate 0.01 --rate-limit-rate 0.02 --max-retries 2
+
+The fake server (``app.fakes.openai_server``) runs in this process on a free
+port and the classifier reaches it over real HTTP through ``OPENAI_BASE_URL``,
+so client pooling, SDK retries and 429 back-off behave as in production. The
+report gives throughput, latency percentiles, how many calls ended without a
+verdict, and what the server saw (requests, injected errors, 429s).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+os.environ["DEBUG"] = "false"
+os.environ["LOCAL_MODEL_DIR"] = tempfile.mkdtemp(prefix="antispam-bench-models-")
+
+TEXTS = [
+    "Congratulations! You've won a cruise. Click the link to claim.",
+    "Last chance to refinance at 0.9%. Reply YES.",
+    "Two-factor code 123456. Do not share this code.",
+    "Limited time promo: upgrade to premium data today!",
+    "Claim your complimentary gift card at reward-zone.biz",
+    "Reminder: Your package delivery requires action. Pay customs fee now.",
+    "Payroll processed successfully. Reply HELP for support.",
+    "Are we still on for dinner at 7?",
+]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from app.fakes.openai_server import config_from_arguments, create_fake_openai_app
+
+    port = _free_port()
+    fake = create_fake_openai_app(config_from_arguments(args))
+    server = uvicorn.Server(
+        uvicorn.Config(fake, host="127.0.0.1", port=port, log_level="error", lifespan="off")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    os.environ.update(
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{port}/v1",
+        OPENAI_MAX_RETRIES=str(args.max_retries),
+        OPENAI_TIMEOUT_SECONDS=str(args.timeout),
+    )
+    from app.services.classifier import classify_message
+
+    latencies: list[float] = []
+    failures = 0
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> None:
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await classify_message(TEXTS[index % len(TEXTS)])
+            except RuntimeError:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await server_task
+
+    latencies.sort()
+    print(f"requests      {args.requests} at concurrency {args.concurrency}")
+    print(f"throughput    {args.requests / elapsed:8.1f} req/s over {elapsed:.2f}s")
+    for label, quantile in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        value = latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+        print(f"{label:<13} {value * 1000:8.1f} ms")
+    print(f"mean          {statistics.fmean(latencies) * 1000:8.1f} ms")
+    print(f"no verdict    {failures}")
+    print(f"server        {dict(fake.state.stats)}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main() -> None:
+    from app.fakes.openai_server import add_config_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    add_config_arguments(parser)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Compare list-route serialization throughput before and after the orjson fast path.
+
+Run from ``backend/``::
+
+    python -m benchmarks.serialization --rows 20000
+
+"Before" rebuilds the legacy pipeline on the same rows: one ``MessageRead``/
+``CallRead`` per row, a second ``response_model`` validation pass and stdlib
+``json``. "After" is what the routes now do: plain row dicts encoded once by
+``FastJSONResponse``. The live routes are also timed end to end over ASGI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+_DB_DIR = tempfile.mkdtemp(prefix="antispam-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(_DB_DIR) / 'bench.db'}"
+os.environ["DEBUG"] = "false"
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.api.responses import FastJSONResponse  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.call import Call  # noqa: E402
+from app.models.message import Message  # noqa: E402
+from app.models.sender import Sender  # noqa: E402
+from app.schemas.call import CallListResponse, CallRead  # noqa: E402
+from app.schemas.message import MessageRead, SmsListResponse  # noqa: E402
+
+CATEGORIES = ["lottery", "financial", "phishing", "promotional", "security", "logistics"]
+
+
+async def _seed(rows: int) -> None:
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as session:
+        senders = [
+            Sender(phone_number=f"+1555{index:07d}", spam_count=0, is_blocked=index % 5 == 0)
+            for index in range(max(rows // 50, 1))
+        ]
+        session.add_all(senders)
+        await session.flush()
+        for index in range(rows):
+            sender = rng.choice(senders)
+            category = rng.choice(CATEGORIES)
+            session.add(
+                Message(
+                    sender=sender,
+                    receiver_number=f"+1666{index:07d}",
+                    body=f"{category.title()} notice #{index % 200}: click the link to claim your reward.",
+                    category=category,
+                    received_at=now - timedelta(minutes=index),
+                    is_spam=True,
+                    confidence=rng.random(),
+                    blocked=rng.random() < 0.5,
+                )
+            )
+            session.add(
+                Call(
+                    caller=sender,
+                    callee_number=f"+1777{index:07d}",
+                    started_at=now - timedelta(minutes=index),
+                    duration_seconds=rng.randint(5, 600),
+                    category=category,
+                    is_spam=True,
+                    confidence=rng.random(),
+                    blocked=rng.random() < 0.5,
+                )
+            )
+        await session.commit()
+
+
+def _legacy_encode(payload: dict, row_model, response_model, rows_key: str) -> bytes:
+    typed_rows = [row_model(**row) for row in payload[rows_key]]
+    response = response_model(
+        stats=payload["stats"], categories=payload["categories"], **{rows_key: typed_rows}
+    )
+    validated = response_model.model_validate(response.model_dump())
+    return json.dumps(
+        validated.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _fast_encode(payload: dict) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def _throughput(fn: Callable[[], bytes], repeat: int) -> tuple[int, float]:
+    size = len(fn())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - started
+    return size, size * repeat / elapsed
+
+
+async def _route_throughput(client: AsyncClient, path: str, repeat: int) -> tuple[int, float]:
+    size = len((await client.get(path)).content)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = await client.get(path)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return size, size * repeat / elapsed
+
+
+def _report(label: str, size: int, rate: float) -> None:
+    print(f"{label:<34} {size / 1024:>10.1f} KiB {rate / 1_048_576:>10.1f} MiB/s")
+
+
+async def main(rows: int, repeat: int) -> None:
+    await _seed(rows)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for path, rows_key, row_model, response_model in (
+            ("/api/sms", "recent_messages", MessageRead, SmsListResponse),
+            ("/api/calls", "recent_calls", CallRead, CallListResponse),
+        ):
+            payload = json.loads((await client.get(path)).content)
+            _report(f"{path} encode before", *_throughput(
+                lambda: _legacy_encode(payload, row_model, response_model, rows_key), repeat
+            ))
+            _report(f"{path} encode after", *_throughput(lambda: _fast_encode(payload), repeat))
+            _report(f"{path} route end-to-end", *await _route_throughput(client, path, repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="messages and calls to seed")
+    parser.add_argument("--repeat", type=int, default=5, help="iterations per measurement")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,195 @@
+"""Check that dashboard reads and writes make progress together on SQLite.
+
+Run from ``backend/``::
+
+    python -m benchmarks.sqlite_concurrency --rows 100000 --readers 2 --seconds 5
+    python -m benchmarks.sqlite_concurrency --journal-mode delete   # for comparison
+
+A throwaway SQLite file is seeded with ``--rows`` extra messages. For
+``--seconds``, ``--readers`` clients then loop on ``GET /api/summary`` (full
+scans on the read pool). At the same time one client alternates
+``POST /api/senders/{id}/block`` and ``/unblock`` on the writer connection, and
+another ingests SMS events. Everything goes through the app in this process.
+The report gives per-client throughput and latency percentiles, and the longest
+stall between two completed writes. The process exits with status 1 when readers
+or writers completed nothing, or when the write p95 is over ``--write-p95-budget-ms``.
+
+With the default WAL journal, writes proceed while the scans run. With
+``delete``, every commit waits for the readers' shared locks to clear. On a
+machine with fewer cores than clients, the readers' CPU time slows writes too,
+so keep ``--readers`` below the core count when comparing journal modes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_SAMPLE_TEXTS = (
+    "Congratulations! You've won a cruise. Click the link to claim.",
+    "Your package delivery requires action. Pay customs fee now.",
+    "Two-factor code {n}. Do not share this code.",
+    "Limited time promo {n}: upgrade to premium data today!",
+)
+
+
+def _configure(args: argparse.Namespace, db_dir: str) -> None:
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{Path(db_dir) / 'concurrency.db'}",
+        DEBUG="false",
+        SEED_DEMO_DATA="true",
+        SQLITE_JOURNAL_MODE=args.journal_mode,
+        SQLITE_READER_POOL_SIZE=str(args.readers),
+        LOCAL_MODEL_DIR=str(Path(db_dir) / "models"),
+    )
+
+
+async def _bulk_load(rows: int) -> None:
+    from sqlalchemy import insert, select
+
+    from app.db.session import SessionLocal
+    from app.models.message import Message
+    from app.models.sender import Sender
+    from app.services.bodies import intern_body
+
+    async with SessionLocal() as session:
+        sender_ids = list(await session.scalars(select(Sender.id)))
+        texts = {text.format(n=n) for n in range(50) for text in _SAMPLE_TEXTS}
+        bodies = [await intern_body(session, text) for text in sorted(texts)]
+        await session.flush()
+        now = time.time()
+        await session.execute(
+            insert(Message),
+            [
+                {
+                    "sender_id": sender_ids[index % len(sender_ids)],
+                    "receiver_number": f"+1555{index % 10_000:07d}",
+                    "body_id": bodies[index % len(bodies)].id,
+                    "received_at": _timestamp(now - index * 37),
+                    "is_spam": index % 3 != 0,
+                    "blocked": index % 5 == 0,
+                }
+                for index in range(rows)
+            ],
+        )
+        await session.commit()
+
+
+def _timestamp(epoch: float):
+    from datetime import datetime, timezone
+
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+async def _client_loop(name: str, request, deadline: float, results: dict) -> None:
+    latencies: list[float] = []
+    completions: list[float] = []
+    errors = 0
+    index = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        status = await request(index)
+        finished = time.perf_counter()
+        index += 1
+        if status >= 400:
+            errors += 1
+            continue
+        latencies.append(finished - started)
+        completions.append(finished)
+    results[name] = (latencies, completions, errors)
+
+
+async def _run(args: argparse.Namespace) -> bool:
+    import httpx
+
+    from app.main import create_app
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        await _bulk_load(args.rows)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def read_summary(_: int) -> int:
+                return (await client.get("/api/summary")).status_code
+
+            async def toggle_block(index: int) -> int:
+                action = "block" if index % 2 == 0 else "unblock"
+                return (await client.post(f"/api/senders/1/{action}")).status_code
+
+            async def ingest(index: int) -> int:
+                payload = {
+                    "sender_number": f"+1777{index % 50:04d}",
+                    "receiver_number": "+15550000000",
+                    "body": _SAMPLE_TEXTS[index % len(_SAMPLE_TEXTS)].format(n=index),
+                    "is_spam": True,
+                }
+                return (await client.post("/api/ingest/sms", json=payload)).status_code
+
+            results: dict = {}
+            deadline = time.perf_counter() + args.seconds
+            clients = [
+                (f"reader-{n}", read_summary) for n in range(args.readers)
+            ] + [("block/unblock", toggle_block), ("ingest", ingest)]
+            await asyncio.gather(
+                *(_client_loop(name, request, deadline, results) for name, request in clients)
+            )
+
+    print(f"journal_mode {args.journal_mode}, {args.rows} extra rows, {args.seconds:g}s")
+    reads = writes = 0
+    write_latencies: list[float] = []
+    write_completions: list[float] = []
+    for name, _ in clients:
+        latencies, completions, errors = results[name]
+        if name.startswith("reader"):
+            reads += len(latencies)
+        else:
+            writes += len(latencies)
+            write_latencies += latencies
+            write_completions += completions
+        print(
+            f"{name:<14} {len(latencies) / args.seconds:8.1f} req/s"
+            f"  p50 {_quantile(latencies, 0.50):8.1f} ms  p95 {_quantile(latencies, 0.95):8.1f} ms"
+            f"  errors {errors}"
+        )
+
+    write_completions.sort()
+    stall = max(
+        (later - earlier for earlier, later in zip(write_completions, write_completions[1:])),
+        default=0.0,
+    )
+    write_p95 = _quantile(write_latencies, 0.95)
+    print(f"longest gap between writes {stall * 1000:8.1f} ms")
+    print(f"write p95 {write_p95:8.1f} ms (budget {args.write_p95_budget_ms:g} ms)")
+    return reads > 0 and writes > 0 and write_p95 <= args.write_p95_budget_ms
+
+
+def _quantile(samples: list[float], quantile: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(quantile * len(ordered)), len(ordered) - 1)] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--journal-mode", default="wal")
+    parser.add_argument("--write-p95-budget-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="antispam-sqlite-") as db_dir:
+        _configure(args, db_dir)
+        passed = asyncio.run(_run(args))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measure API cold start and fail when it exceeds a budget.
+
+Run from ``backend/``::
+
+    python -m benchmarks.startup --import-budget 1.5 --ready-budget 3.0
+
+Two numbers are taken in fresh interpreters, each the median of ``--repeat`` runs:
+
+* import time: ``import app.main`` (what a pre-forking server pays once);
+* ready time: from spawning ``uvicorn app.main:create_app --factory`` to the
+  first ``200`` from ``/health`` (what the autoscaler waits for).
+
+The process exits with status 1 if either median is over its budget. The
+server runs against a throwaway SQLite file so the local database is untouched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+_IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _environment(db_dir: str, seed: bool) -> dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{Path(db_dir) / 'startup.db'}",
+        DEBUG="false",
+        SEED_DEMO_DATA="true" if seed else "false",
+        PYTHONPATH=str(BACKEND_DIR),
+    )
+    return env
+
+
+def measure_import(env: dict[str, str]) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_ready(env: dict[str, str], timeout: float) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:create_app",
+            "--factory",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        while True:
+            elapsed = time.perf_counter() - started
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            if elapsed > timeout:
+                raise RuntimeError(f"/health did not answer within {timeout:.0f}s")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds")
+    parser.add_argument("--ready-budget", type=float, default=3.0, help="seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", action="store_true", help="seed demo data on startup")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="antispam-startup-") as db_dir:
+        env = _environment(db_dir, args.seed)
+        imports = [measure_import(env) for _ in range(args.repeat)]
+        readies = [measure_ready(env, args.timeout) for _ in range(args.repeat)]
+
+    failed = False
+    for label, samples, budget in (
+        ("import app.main", imports, args.import_budget),
+        ("first 200 /health", readies, args.ready_budget),
+    ):
+        median = statistics.median(samples)
+        verdict = "ok" if median <= budget else "OVER BUDGET"
+        failed = failed or median > budget
+        print(f"{label:<18} median {median * 1000:8.1f} ms  budget {budget * 1000:8.1f} ms  {verdict}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
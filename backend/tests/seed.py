@@ -0,0 +1,66 @@
+"""The dataset every backend is seeded with, shared by the fixtures and the expectations."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+BASE_TIME = datetime(2026, 3, 6, 22, 10, tzinfo=timezone.utc)
+SENDERS = ("+15550000001", "+15550000002", "+15550000003", "+15550000004")
+BODIES = (
+    "You've won a cruise. Click the link to claim.",
+    "URGENT: Verify your bank account immediately to avoid closure.",
+    "Two-factor code 654321. Do not share this code.",
+    "Limited time promo: upgrade to premium data today!",
+    "Reminder: Call us back to extend your car warranty.",
+)
+CATEGORIES = ("lottery", "financial", "security", "promotional", None)
+
+
+@dataclass(frozen=True)
+class MessageSpec:
+    sender: str
+    body: str
+    category: Optional[str]
+    received_at: datetime
+    is_spam: bool
+    blocked: bool
+    confidence: float
+
+
+@dataclass(frozen=True)
+class CallSpec:
+    caller: Optional[str]
+    callee: str
+    category: Optional[str]
+    started_at: datetime
+    is_spam: bool
+    blocked: bool
+
+
+# Spread over several days and a month boundary, at minute offsets that do not
+# line up with hours, so edge hours, rollups and daily/monthly sketches all matter.
+MESSAGES = [
+    MessageSpec(
+        sender=SENDERS[(i * 7) % 5 % 4],
+        body=BODIES[i % 5],
+        category=CATEGORIES[i % 5],
+        received_at=BASE_TIME + timedelta(minutes=37 * i),
+        is_spam=i % 2 == 0,
+        blocked=i % 3 == 0,
+        confidence=round((i % 10) / 10, 1),
+    )
+    for i in range(120)
+]
+CALLS = [
+    CallSpec(
+        caller=None if i % 9 == 0 else SENDERS[i % 4],
+        callee=f"+1555100{(i * i) % 11:04d}",
+        category=("scam", "marketing", None)[i % 3],
+        started_at=BASE_TIME + timedelta(minutes=131 * i),
+        is_spam=i % 4 != 1,
+        blocked=i % 5 == 0,
+    )
+    for i in range(80)
+]
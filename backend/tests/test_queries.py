@@ -0,0 +1,226 @@
+"""The dashboard queries give the same answers on SQLite and Postgres.
+
+Expected values are computed in Python from the seeded specs, so a dialect
+difference (epoch extraction, the recursive series CTE, row-value keyset
+comparisons, grouped aggregates) shows up as a mismatch on one backend.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.db.session import _create_engine
+from app.models.body import MessageBody
+from app.models.message import Message
+from app.models.sender import Sender
+from app.services import scatter
+from app.services.aggregates import (
+    UNCATEGORISED,
+    call_category_summaries,
+    message_category_summaries,
+    time_filters,
+)
+from app.services.drilldown import encode_cursor, template_messages
+from app.services.fanout import caller_leaderboard
+from app.services.leaderboard import top_from_counters
+from app.services.scatter import CALLS as CALL_TABLE
+from app.services.scatter import MESSAGES as MESSAGE_TABLE
+from app.services.scatter import event_totals
+from app.services.timeseries import bucket_series
+
+from tests.seed import BASE_TIME, BODIES, CALLS, MESSAGES
+
+pytestmark = pytest.mark.anyio
+
+WINDOW_START = BASE_TIME + timedelta(hours=5, minutes=20)
+WINDOW_END = BASE_TIME + timedelta(days=2, hours=3, minutes=5)
+
+
+def _in_window(moment: datetime) -> bool:
+    return WINDOW_START <= moment <= WINDOW_END
+
+
+async def test_time_filters_compare_offset_bounds_in_utc(session):
+    india = timezone(timedelta(hours=5, minutes=30))
+    count = await session.scalar(
+        select(func.count(Message.id)).where(
+            *time_filters(
+                Message.received_at, WINDOW_START.astimezone(india), WINDOW_END.astimezone(india)
+            )
+        )
+    )
+    assert count == sum(_in_window(spec.received_at) for spec in MESSAGES)
+
+
+@pytest.fixture(params=[1, 3])
+async def partitions(request, engine, monkeypatch) -> int:
+    """Run ``event_totals`` single-statement, or fanned out over the test database."""
+
+    fanout = _create_engine(
+        engine.url.render_as_string(hide_password=False),
+        get_settings(),
+        read_only=True,
+        pool_size=request.param,
+    )
+    monkeypatch.setattr(
+        scatter,
+        "FanoutSessionLocal",
+        async_sessionmaker(fanout, expire_on_commit=False, class_=AsyncSession),
+    )
+    monkeypatch.setattr(get_settings(), "query_fanout_partitions", request.param)
+    yield request.param
+    await fanout.dispose()
+
+
+async def test_event_totals(session, partitions):
+    # The seeded sets are far below hll.SPARSE_LIMIT, so the sketches count exactly.
+    totals = await event_totals(
+        session,
+        MESSAGE_TABLE,
+        time_filters(Message.received_at, WINDOW_START, WINDOW_END),
+        distinct_keys=True,
+    )
+    window = [spec for spec in MESSAGES if _in_window(spec.received_at)]
+    per_sender = Counter(spec.sender for spec in window)
+    top_count = max(per_sender.values())
+
+    assert totals.total == len(window)
+    assert totals.blocked == sum(spec.blocked for spec in window)
+    assert totals.unique_parties == len(per_sender)
+    assert per_sender[totals.top_party_number] == top_count
+    assert totals.unique_spam == len({spec.body for spec in window if spec.is_spam})
+    assert totals.unique_blocked == len({spec.body for spec in window if spec.blocked})
+    assert totals.avg_confidence == pytest.approx(
+        sum(spec.confidence for spec in window) / len(window)
+    )
+
+    call_totals = await event_totals(session, CALL_TABLE, ())
+    assert call_totals.total == len(CALLS)
+    assert call_totals.unique_parties == len({spec.caller for spec in CALLS if spec.caller})
+
+
+async def test_category_summaries(session):
+    filters = time_filters(Message.received_at, WINDOW_START, WINDOW_END)
+    summaries = {row.category: row for row in await message_category_summaries(session, filters)}
+    window = [spec for spec in MESSAGES if _in_window(spec.received_at)]
+    expected = Counter(spec.category or UNCATEGORISED for spec in window)
+    assert {name: row.total_messages for name, row in summaries.items()} == expected
+    for name, row in summaries.items():
+        rows = [spec for spec in window if (spec.category or UNCATEGORISED) == name]
+        assert row.blocked == sum(spec.blocked for spec in rows)
+        assert row.unique_messages == len({spec.body for spec in rows})
+        assert row.sample_preview in BODIES
+
+    calls = {row.category: row.total_calls for row in await call_category_summaries(session, ())}
+    assert calls == Counter(spec.category or UNCATEGORISED for spec in CALLS)
+
+
+@pytest.mark.parametrize(
+    ("granularity", "zone"),
+    [
+        ("hour", timezone.utc),
+        # Whole-hour offsets with a DST change: complete hours come from the rollups.
+        ("hour", ZoneInfo("America/New_York")),
+        ("day", ZoneInfo("America/New_York")),
+        # A half-hour offset cannot use the hourly rollups, so every row is bucketed raw.
+        ("hour", ZoneInfo("Asia/Kolkata")),
+        ("minute", timezone.utc),
+    ],
+)
+async def test_bucket_series(session, granularity, zone):
+    buckets = await bucket_series(
+        session, "sms", WINDOW_START, WINDOW_END, granularity, zone, max_buckets=5000
+    )
+    truncate = {
+        "minute": dict(second=0, microsecond=0),
+        "hour": dict(minute=0, second=0, microsecond=0),
+        "day": dict(hour=0, minute=0, second=0, microsecond=0),
+    }[granularity]
+    expected_detected: Counter = Counter()
+    expected_blocked: Counter = Counter()
+    for spec in MESSAGES:
+        if _in_window(spec.received_at):
+            wall = spec.received_at.astimezone(zone).replace(tzinfo=None, **truncate)
+            expected_detected[wall] += 1
+            expected_blocked[wall] += spec.blocked
+
+    starts = [bucket.start.replace(tzinfo=None) for bucket in buckets]
+    assert starts == sorted(set(starts))
+    assert starts[0] == WINDOW_START.astimezone(zone).replace(tzinfo=None, **truncate)
+    detected = {start: bucket.detected for start, bucket in zip(starts, buckets) if bucket.detected}
+    assert detected == dict(expected_detected)
+    assert sum(bucket.blocked for bucket in buckets) == sum(expected_blocked.values())
+
+
+async def test_template_messages_keyset_pages(session):
+    body_id = await session.scalar(select(MessageBody.id).where(MessageBody.content == BODIES[0]))
+    seen = []
+    cursor = None
+    while True:
+        page = await template_messages(session, body_id, None, (), 4, cursor)
+        seen.extend(item.id for item in page.items)
+        if page.next_cursor is None:
+            break
+        timestamp, _, message_id = page.next_cursor.rpartition("~")
+        cursor = (datetime.fromisoformat(timestamp), int(message_id))
+
+    rows = (
+        await session.execute(
+            select(Message.id, Message.received_at).where(Message.body_id == body_id)
+        )
+    ).all()
+    expected = [row.id for row in sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)]
+    assert seen == expected
+    assert len(seen) == sum(spec.body == BODIES[0] for spec in MESSAGES)
+    assert encode_cursor(rows[0].received_at, rows[0].id).endswith(f"~{rows[0].id}")
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "estimated"),
+    [
+        # Up to FANOUT_EXACT_DAYS: counted exactly from calls.
+        (BASE_TIME, BASE_TIME + timedelta(days=3), False),
+        # All of March from the monthly sketches, the February edge days from the daily ones.
+        (
+            datetime(2026, 2, 20, tzinfo=timezone.utc),
+            datetime(2026, 3, 31, 23, 59, tzinfo=timezone.utc),
+            True,
+        ),
+        # Only daily sketches: no complete month inside.
+        (BASE_TIME + timedelta(days=1), BASE_TIME + timedelta(days=20), True),
+    ],
+)
+async def test_caller_fanout(session, start, end, estimated):
+    page = await caller_leaderboard(session, start, end, limit=10, offset=0)
+    # Sketched windows are whole UTC days.
+    if estimated:
+        start = start.replace(hour=0, minute=0)
+        end = end.replace(hour=23, minute=59, second=59)
+    callees = defaultdict(set)
+    for spec in CALLS:
+        if spec.caller and start <= spec.started_at <= end:
+            callees[spec.caller].add(spec.callee)
+
+    assert page.estimated is estimated
+    assert page.total_callers == len(callees)
+    # Every caller dials fewer than 64 numbers, so even the sketches are exact.
+    assert {item.caller_number: item.distinct_callees for item in page.items} == {
+        caller: len(numbers) for caller, numbers in callees.items()
+    }
+
+
+async def test_top_from_counters(session):
+    ranking = await top_from_counters(
+        session, "sms", BASE_TIME.date(), (BASE_TIME + timedelta(days=30)).date(), 10
+    )
+    numbers = dict((await session.execute(select(Sender.id, Sender.phone_number))).all())
+    expected = Counter(spec.sender for spec in MESSAGES if spec.is_spam)
+    assert {numbers[sender_id]: events for sender_id, events in ranking} == expected
+    assert [events for _, events in ranking] == sorted(expected.values(), reverse=True)
@@ -0,0 +1,103 @@
+"""Archiving expired events leaves every derived table as a rebuild would.
+
+Retention retracts the rollups, the leaderboard's daily counters, the caller
+fan-out sketches and orphaned bodies in the delete transaction. Each is
+compared with a fresh rebuild from the remaining rows.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.body import MessageBody
+from app.models.call import Call
+from app.models.fanout import CallerFanoutDay, CallerFanoutMonth
+from app.models.message import Message
+from app.models.rollup import EventRollupHour
+from app.models.sender_count import SenderDailyCount
+from app.core.config import get_settings
+from app.services import hll, retention
+from app.services.bodies import new_body
+from app.services.fanout import rebuild_fanout
+from app.services.leaderboard import rebuild_sender_counts
+from app.services.timeseries import rebuild_rollups
+from app.services.write_queue import WriteBehindQueue
+
+from tests.seed import BASE_TIME, BODIES, CALLS, MESSAGES
+
+pytestmark = pytest.mark.anyio
+
+CUTOFF = BASE_TIME + timedelta(days=1, hours=6)
+
+
+async def _derived(session: AsyncSession) -> dict[str, set]:
+    rollups = await session.execute(
+        select(
+            EventRollupHour.channel,
+            EventRollupHour.hour_start,
+            EventRollupHour.detected,
+            EventRollupHour.blocked,
+        )
+    )
+    counters = await session.execute(
+        select(
+            SenderDailyCount.sender_id,
+            SenderDailyCount.channel,
+            SenderDailyCount.day,
+            SenderDailyCount.events,
+        ).where(SenderDailyCount.events > 0)
+    )
+    derived = {"rollups": set(rollups), "counters": set(counters)}
+    for model, period in ((CallerFanoutDay, "day"), (CallerFanoutMonth, "month")):
+        rows = await session.execute(
+            select(model.caller_id, getattr(model, period), model.calls, model.callee_sketch)
+        )
+        derived[model.__tablename__] = {
+            (caller_id, start, calls, hll.HyperLogLog(sketch).estimate())
+            for caller_id, start, calls, sketch in rows
+        }
+    return derived
+
+
+async def test_archive_retracts_derived_tables(session, engine, tmp_path, monkeypatch):
+    factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(retention, "ReadSessionLocal", factory)
+    # Not started: each delete is applied and committed directly.
+    monkeypatch.setattr(retention, "write_queue", WriteBehindQueue(get_settings(), factory))
+    # A text only sent before the cutoff: its body must go with its message.
+    session.add(
+        Message(
+            receiver_number="+15559990000",
+            body_record=new_body("Only ever sent once, long ago."),
+            received_at=BASE_TIME,
+        )
+    )
+    await session.commit()
+
+    archived = await retention.archive_expired(1, tmp_path, now=CUTOFF + timedelta(days=1))
+
+    assert archived == {
+        "sms": sum(spec.received_at < CUTOFF for spec in MESSAGES) + 1,
+        "calls": sum(spec.started_at < CUTOFF for spec in CALLS),
+    }
+    for kind, count in archived.items():
+        assert sum(1 for _ in retention.iter_archive(kind, None, None, tmp_path)) == count
+
+    async with factory() as check:
+        remaining = await check.scalar(select(func.count(Message.id)))
+        assert remaining == len(MESSAGES) + 1 - archived["sms"]
+        assert await check.scalar(select(func.count(Call.id))) == len(CALLS) - archived["calls"]
+        bodies = set(await check.scalars(select(MessageBody.content)))
+        assert bodies == set(BODIES)
+
+        retracted = await _derived(check)
+        await rebuild_fanout(check)
+        await rebuild_sender_counts(check)
+        await rebuild_rollups(check)
+        await check.flush()
+        assert retracted == await _derived(check)
+        await check.rollback()
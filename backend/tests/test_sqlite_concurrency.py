@@ -0,0 +1,98 @@
+"""Block/unblock writes commit while a dashboard read transaction is open.
+
+With SQLite's WAL journal a reader works on the snapshot it started with and
+the writer connection commits next to it. Under a rollback journal the same
+commits would wait for the reader's shared lock until ``busy_timeout``. The
+reader here holds its transaction open until the writes are done, so that
+case fails the test instead of passing slowly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.routes import senders as sender_routes
+from app.api.routes.summary import _summary
+from app.core.config import get_settings
+from app.db.base import Base
+from app.db.session import _create_engine
+from app.models.sender import Sender
+from app.services.write_queue import WriteBehindQueue
+
+from tests.conftest import seed_database
+from tests.seed import MESSAGES
+
+pytestmark = pytest.mark.anyio
+
+TOGGLES = 20
+WRITE_BUDGET_SECONDS = 2.0
+
+
+@pytest.fixture
+async def factories(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'antispam.db'}"
+    settings = get_settings().model_copy(update={"sqlite_journal_mode": "wal"})
+    writer = _create_engine(url, settings)
+    reader = _create_engine(url, settings, read_only=True)
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    write_factory = async_sessionmaker(writer, expire_on_commit=False, class_=AsyncSession)
+    async with write_factory() as session:
+        await seed_database(session)
+    yield write_factory, async_sessionmaker(reader, expire_on_commit=False, class_=AsyncSession)
+    await reader.dispose()
+    await writer.dispose()
+
+
+async def test_block_writes_commit_during_summary_read(factories, monkeypatch):
+    write_factory, read_factory = factories
+    async with write_factory() as session:
+        assert await session.scalar(text("PRAGMA journal_mode")) == "wal"
+        sender_id = await session.scalar(select(Sender.id).order_by(Sender.id).limit(1))
+
+    queue = WriteBehindQueue(get_settings(), write_factory)
+    monkeypatch.setattr(sender_routes, "write_queue", queue)
+    queue.start()
+
+    reading = asyncio.Event()
+    writes_done = asyncio.Event()
+
+    async def reader() -> tuple[bool, bool, int]:
+        async with read_factory() as session, session.begin():
+            summary = await _summary(session, None, None, "day", "UTC")
+            before = await session.scalar(select(Sender.is_blocked).where(Sender.id == sender_id))
+            reading.set()
+            await asyncio.wait_for(writes_done.wait(), WRITE_BUDGET_SECONDS * 2)
+            # Same transaction: still the snapshot taken before the writes.
+            after = await session.scalar(select(Sender.is_blocked).where(Sender.id == sender_id))
+            return before, after, summary.sms.total_messages
+
+    async def writer() -> list[bool]:
+        await reading.wait()
+        states = []
+        for index in range(TOGGLES):
+            sender = await sender_routes._set_blocked(sender_id, index % 2 == 0)
+            states.append(sender.is_blocked)
+        writes_done.set()
+        return states
+
+    try:
+        read_task = asyncio.create_task(reader())
+        states = await asyncio.wait_for(writer(), WRITE_BUDGET_SECONDS)
+        # The writes finished while the read transaction was still open.
+        assert not read_task.done()
+        before, after, total_messages = await read_task
+    finally:
+        await queue.drain()
+
+    assert states == [index % 2 == 0 for index in range(TOGGLES)]
+    assert total_messages == len(MESSAGES)
+    assert before is after is False
+    assert queue.stats["committed"] == TOGGLES
+    async with read_factory() as session:
+        final = await session.scalar(select(Sender.is_blocked).where(Sender.id == sender_id))
+    assert final is states[-1]